@@ -6,6 +6,7 @@ import matplotlib.pyplot as plt
 import math
 import time
 from natnet_client import DataDescriptions, DataFrame, NatNetClient
+from motive_csv import load_take
 
 def receive_new_frame(data_frame: DataFrame):
     global num_frames
@@ -14,15 +15,39 @@ def receive_new_frame(data_frame: DataFrame):
 def receive_new_desc(desc: DataDescriptions):
     print("Received data descriptions.")
 
-def find_checkpoint(Axis, limit, start = 0):
+def limit_band(limit, tolerance = None):
+#Numeric band [low, high) of a checkpoint limit. A string limit such as '1.' or '-1.75' covers the values
+#whose printed form starts with it, '1.' is [1, 2) and '-1.75' is (-1.76, -1.75]. tolerance gives target +- tolerance instead
+    target = float(limit)
+    if tolerance is not None:
+        return target - tolerance, target + tolerance
+    limit = str(limit)
+    decimals = len(limit.partition('.')[2])
+    step = 10.0 ** -decimals
+    if limit.startswith('-'):
+        return np.nextafter(target - step, np.inf), np.nextafter(target, np.inf)
+    return target, target + step
+
+def find_checkpoint(Axis, limit, start = 0, tolerance = None, hysteresis = 0.0):
 #Compare field data against ideal flying scenario
-    Axis = Axis[start:]
-    for index, value in enumerate(Axis):
-        value = str(value)
-        if value.startswith(limit):
-            checkpoint = int(index) + start
-            print(checkpoint)
-            return checkpoint
+#First index from start where the axis enters the band of limit. With hysteresis the axis has to be at least
+#hysteresis outside the band first, so a take starting inside the band does not trigger right away
+    Axis = np.asarray(Axis, dtype = float)[start:]
+    low, high = limit_band(limit, tolerance)
+    if hysteresis > 0:
+        armed = np.flatnonzero((Axis < low - hysteresis) | (Axis >= high + hysteresis))
+        if len(armed) == 0:
+            return None
+        first = armed[0]
+    else:
+        first = 0
+    inside = (Axis[first:] >= low) & (Axis[first:] < high)
+    index = int(np.argmax(inside))
+    if not inside[index]:
+        return None
+    checkpoint = first + index + start
+    print(checkpoint)
+    return checkpoint
 
 def calculate_tolerance(ideal, data, tolerance, point):
     accuracy = np.zeros(shape=(3,3), dtype = float)
@@ -183,21 +208,9 @@ class Window(Frame):
         evaluate_fly.place(x=120, y=0)
     	
     def clean_data(self, title, fileName, track, drone_radius):     #Function to clean the .csv Excell data
-        data = []
-        with open(fileName, 'r') as f_excell:                               	#Select csv file
-            for line in f_excell:                                           	#Iterate the document
-                line = line.split(sep=",")					#Separate the line in rows and columns
-                data.append(line)                                          	#Append the data to array
-            data = np.array(data[7:])                                       	#Eliminate first 7 rows
-            #Drop all data besides positional information and convert array into a pandas dataframe
-            quaternions = False
-            if quaternions == True:
-                df = pd.DataFrame(data[:,[1,6,7,8]], columns=['Time','X','Y','Z'])
-            else:
-                df = pd.DataFrame(data[:,[1,5,6,7]], columns=['Time','X','Y','Z'])
-            df = df.replace(r'^\s*$', np.nan, regex=True).astype(float)    	#Replace blanks with Nan
-            df = df.interpolate()                       			#Fill the Nan's with the closest known values
-            #return df
+        #Time and position of the first rigid body, blanks become NaN. Parsed takes are cached next to the .csv
+        df = load_take(fileName)[['Time','X','Y','Z']]
+        df = df.interpolate()                       			#Fill the Nan's with the closest known values
         #Tolerance is replaced by user input which should be equal to the longest side of the drone
         path = np.zeros((0, 4))
         real = np.zeros((0, 4))
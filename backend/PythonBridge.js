@@ -0,0 +1,256 @@
+// PythonBridge.js - Keeps one resident Python process for streaming, Motive commands and KML generation
+const { spawn } = require('child_process');
+const constants = require('./constants');
+
+// Binary stdout layout, see python_scripts/rigid_body_stream.py
+const MESSAGE_HEADER_SIZE = 8;
+const KIND_RIGID_BODY_FRAME = 1;
+const KIND_JSON = 2;
+const RIGID_BODY_RECORD_SIZE = 48;
+
+class PythonBridge {
+	constructor() {
+		this.process = null;
+		this.requests = new Map(); // Pending requests by id
+		this.nextRequestId = 1;
+		this.stdoutBuffer = '';
+		this.stderrBuffer = '';
+		this.binaryBuffer = Buffer.alloc(0);
+		this.messageListeners = []; // Functions that receive non-response stdout messages (e.g. frames)
+		this.statusListeners = []; // Functions that receive stderr status messages
+	}
+
+	// Add a listener for stream messages
+	addMessageListener(callback) {
+		this.messageListeners.push(callback);
+	}
+
+	// Add a listener for status messages
+	addStatusListener(callback) {
+		this.statusListeners.push(callback);
+	}
+
+	// Remove a stream message listener
+	removeMessageListener(callback) {
+		this.messageListeners = this.messageListeners.filter(listener => listener !== callback);
+	}
+
+	// Remove a status listener
+	removeStatusListener(callback) {
+		this.statusListeners = this.statusListeners.filter(listener => listener !== callback);
+	}
+
+	// Start the bridge process if it is not running
+	start() {
+		if (this.process) {
+			return this.process;
+		}
+
+		const config = {
+			server_ip: constants.OPTITRACK.SERVER_IP,
+			use_multicast: constants.OPTITRACK.USE_MULTICAST,
+			output_format: constants.PYTHON_BRIDGE.OUTPUT_FORMAT,
+			shared_memory_name: constants.PYTHON_BRIDGE.SHARED_MEMORY_NAME,
+			max_rate_hz: constants.OPTITRACK.MAX_RATE_HZ,
+			min_position_delta: constants.OPTITRACK.MIN_POSITION_DELTA,
+			frame_queue_size: constants.OPTITRACK.FRAME_QUEUE_SIZE,
+			stats_interval: constants.OPTITRACK.STATS_INTERVAL_S
+		};
+
+		const bridgeProcess = spawn('python', ['-u', constants.PYTHON_BRIDGE.SCRIPT_PATH], {
+			cwd: __dirname // Run from the backend directory
+		});
+		this.process = bridgeProcess;
+
+		// The first line is the configuration, every later line is a request
+		bridgeProcess.stdin.write(JSON.stringify(config) + '\n');
+
+		this.stdoutBuffer = '';
+		this.stderrBuffer = '';
+		this.binaryBuffer = Buffer.alloc(0);
+		if (config.output_format === 'binary') {
+			bridgeProcess.stdout.on('data', (data) => this.handleBinaryOutput(data));
+		} else {
+			bridgeProcess.stdout.on('data', (data) => this.handleJsonOutput(data));
+		}
+
+		// Status and stats messages from the bridge (stderr)
+		bridgeProcess.stderr.on('data', (data) => {
+			this.stderrBuffer += data.toString();
+			const lines = this.stderrBuffer.split('\n');
+			this.stderrBuffer = lines.pop(); // Keep the partial line for the next chunk
+			lines.filter(line => line.trim().startsWith('{')).forEach(line => {
+				try {
+					const statusMessage = JSON.parse(line);
+					// Stats arrive every few seconds, don't flood the log with them
+					if (statusMessage.type !== 'stats') {
+						console.log('Python Bridge Status:', statusMessage);
+					}
+					this.statusListeners.forEach(callback => callback(statusMessage));
+				} catch (jsonError) {
+					// Ignore non-JSON diagnostics
+				}
+			});
+		});
+
+		// Fail whatever is still pending; the next request respawns the bridge
+		const onExit = (error) => {
+			if (this.process !== bridgeProcess) {
+				return;
+			}
+			this.process = null;
+			this.requests.forEach(request => request.reject(error));
+			this.requests.clear();
+			this.statusListeners.forEach(callback =>
+				callback({ type: 'status', message: 'Disconnected', code: bridgeProcess.exitCode })
+			);
+		};
+		bridgeProcess.on('close', (code) => {
+			console.log(`Python bridge exited with code ${code}`);
+			onExit(new Error(`Python bridge exited with code ${code}`));
+		});
+		bridgeProcess.on('error', (error) => {
+			console.error('Failed to start Python bridge:', error);
+			onExit(error);
+		});
+
+		return bridgeProcess;
+	}
+
+	// Parse JSON lines from the bridge stdout
+	handleJsonOutput(data) {
+		this.stdoutBuffer += data.toString();
+		const lines = this.stdoutBuffer.split('\n');
+		this.stdoutBuffer = lines.pop();
+		lines.forEach(line => {
+			if (!line.trim().startsWith('{')) {
+				return;
+			}
+			try {
+				this.handleMessage(JSON.parse(line));
+			} catch (jsonError) {
+				console.log('Non-JSON bridge output:', line);
+			}
+		});
+	}
+
+	// Parse length-prefixed binary messages from the bridge stdout
+	handleBinaryOutput(data) {
+		let buffer = this.binaryBuffer.length ? Buffer.concat([this.binaryBuffer, data]) : data;
+		let offset = 0;
+		while (buffer.length - offset >= MESSAGE_HEADER_SIZE) {
+			const length = buffer.readUInt32LE(offset);
+			const end = offset + MESSAGE_HEADER_SIZE + length;
+			if (buffer.length < end) {
+				break;
+			}
+			const kind = buffer.readUInt16LE(offset + 4);
+			const count = buffer.readUInt16LE(offset + 6);
+			const payload = offset + MESSAGE_HEADER_SIZE;
+			if (kind === KIND_RIGID_BODY_FRAME) {
+				this.handleMessage(this.readRigidBodyFrame(buffer, payload, count));
+			} else if (kind === KIND_JSON) {
+				try {
+					this.handleMessage(JSON.parse(buffer.toString('utf8', payload, end)));
+				} catch (jsonError) {
+					console.log('Invalid JSON bridge message');
+				}
+			}
+			offset = end;
+		}
+		// Keep the partial message for the next chunk
+		this.binaryBuffer = buffer.subarray(offset);
+	}
+
+	// Decode a rigid body frame into the same shape as a JSON frame record
+	readRigidBodyFrame(buffer, offset, count) {
+		const rigidBodies = [];
+		for (let i = 0; i < count; i++) {
+			rigidBodies.push(this.readRigidBodyRecord(buffer, offset + i * RIGID_BODY_RECORD_SIZE));
+		}
+		return {
+			type: 'frame',
+			frame_number: buffer.readUInt32LE(offset),
+			ts: buffer.readDoubleLE(offset + 36),
+			rigid_bodies: rigidBodies
+		};
+	}
+
+	// Decode one 48 byte rigid body record
+	readRigidBodyRecord(buffer, offset) {
+		return {
+			id: buffer.readInt32LE(offset + 4),
+			pos: {
+				x: buffer.readFloatLE(offset + 8),
+				y: buffer.readFloatLE(offset + 12),
+				z: buffer.readFloatLE(offset + 16)
+			},
+			rot: {
+				x: buffer.readFloatLE(offset + 20),
+				y: buffer.readFloatLE(offset + 24),
+				z: buffer.readFloatLE(offset + 28),
+				w: buffer.readFloatLE(offset + 32)
+			},
+			valid: buffer.readUInt8(offset + 44) === 1
+		};
+	}
+
+	// Resolve responses by id; everything else is stream data
+	handleMessage(message) {
+		if (message.type === 'response') {
+			const request = this.requests.get(message.id);
+			if (request) {
+				this.requests.delete(message.id);
+				request.resolve(message);
+			}
+		} else {
+			this.messageListeners.forEach(callback => callback(message));
+		}
+	}
+
+	// Send a request ({ type: 'command', command: 'StartRecording' }, etc.)
+	// and resolve with its result
+	request(type, payload = {}, timeoutMs = constants.PYTHON_BRIDGE.REQUEST_TIMEOUT_MS) {
+		return new Promise((resolve, reject) => {
+			const bridgeProcess = this.start();
+			const id = this.nextRequestId++;
+
+			const timeout = setTimeout(() => {
+				this.requests.delete(id);
+				reject(new Error(`Python bridge request ${type} timed out`));
+			}, timeoutMs);
+
+			this.requests.set(id, {
+				resolve: (response) => {
+					clearTimeout(timeout);
+					if (response.ok) {
+						resolve(response.result);
+					} else {
+						reject(new Error(response.error));
+					}
+				},
+				reject: (error) => {
+					clearTimeout(timeout);
+					reject(error);
+				}
+			});
+
+			bridgeProcess.stdin.write(JSON.stringify({ ...payload, id, type }) + '\n');
+		});
+	}
+
+	// Get the bridge process id
+	getProcessId() {
+		return this.process ? this.process.pid : null;
+	}
+
+	// Stop the bridge process
+	stop() {
+		if (this.process) {
+			// Closing stdin ends the bridge
+			this.process.stdin.end();
+		}
+	}
+}
+
+module.exports = PythonBridge;
@@ -24,7 +24,25 @@ module.exports = {
 	OPTITRACK: {
 		SERVER_IP: "169.254.228.35", // Change this to your Optitrack server IP
 		USE_MULTICAST: true,
-		PYTHON_SCRIPT_PATH: "./python_scripts/optitrack_wrapper.py"
+		MAX_RATE_HZ: 60, // Per rigid body, limited in Python before serializing (0 = every frame)
+		MIN_POSITION_DELTA: 0, // Meters a rigid body must move before it is sent again (0 = off)
+		FRAME_QUEUE_SIZE: 4, // Frames buffered in Python while the Node side is busy (0 = off)
+		STATS_INTERVAL_S: 5, // Seconds between frame loss/jitter/latency stats from Python (0 = off)
+		COMMAND_TIMEOUT_MS: 5000
+	},
+	
+	// Python Bridge Configuration (streaming, Motive commands and KML generation)
+	PYTHON_BRIDGE: {
+		SCRIPT_PATH: "./python_scripts/optitrack_bridge.py",
+		REQUEST_TIMEOUT_MS: 10000,
+		OUTPUT_FORMAT: "json", // "json" lines or "binary" rigid body frames ("shared_memory" sends none to Node)
+		SHARED_MEMORY_NAME: "" // Also write every frame to this shared memory ring for local readers ("" = off)
+	},
+	
+	// Flight Recorder Configuration (binary log of the live stream next to each Motive take)
+	FLIGHT_RECORDER: {
+		ENABLED: true,
+		DIRECTORY: "./recordings" // Relative to the backend directory
 	},
 	
 	// API Endpoints
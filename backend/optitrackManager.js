@@ -1,15 +1,53 @@
-// OptitrackManager.js - Handles starting, stopping, and managing the Python Optitrack script
-const { spawn } = require('child_process');
+// OptitrackManager.js - Handles starting, stopping, and managing Optitrack streaming over the Python bridge
 const constants = require('./constants');
+const PythonBridge = require('./PythonBridge');
 
 class OptitrackManager {
-	constructor() {
-		this.pythonProcess = null;
+	constructor(pythonBridge = null) {
+		this.pythonBridge = pythonBridge || new PythonBridge(); // Resident Python process
 		this.isRunning = false;
+		this.autoRestart = true; // Restart streaming if the bridge crashes
 		this.dataListeners = []; // Array to store functions that want to receive data
 		this.statusListeners = []; // Array to store functions that want to receive status updates
-		this.lastDataSent = 0; // Add this
-		this.dataThrottleMs = 16; // ~60fps (1000ms/60 = 16ms)
+		this.lastStats = null; // Latest frame loss/jitter/latency stats from the bridge
+		this.flightRecordingPath = null; // Flight log being written during a recording
+
+		// Frame records from the bridge (stdout = tracking data), one per mocap frame.
+		// The bridge already limits each rigid body to OPTITRACK.MAX_RATE_HZ.
+		this.pythonBridge.addMessageListener((message) => {
+			if (!this.isRunning || message.type !== 'frame') {
+				return;
+			}
+			message.rigid_bodies.forEach(rigidBody => {
+				const trackingData = { id: rigidBody.id, pos: rigidBody.pos, rot: rigidBody.rot, ts: message.ts };
+				this.dataListeners.forEach(callback => callback(trackingData));
+			});
+		});
+
+		// Status messages from the bridge (stderr = status messages)
+		this.pythonBridge.addStatusListener((statusMessage) => {
+			if (statusMessage.type === 'stats') {
+				this.lastStats = statusMessage;
+			}
+			this.statusListeners.forEach(callback => callback(statusMessage));
+
+			// The bridge exited while streaming
+			if (statusMessage.type === 'status' && statusMessage.message === 'Disconnected' && statusMessage.code !== undefined) {
+				const wasRunning = this.isRunning;
+				this.isRunning = false;
+				this.flightRecordingPath = null; // The bridge closed the flight log on exit
+				if (wasRunning && this.autoRestart && statusMessage.code !== 0) {
+					console.log('Process crashed, attempting restart in 2 seconds...');
+					setTimeout(() => {
+						if (!this.isRunning && this.autoRestart) {
+							this.startOptitrack().catch(err =>
+								console.error('Auto-restart failed:', err)
+							);
+						}
+					}, 2000);
+				}
+			}
+		});
 	}
 
 	// Add a listener for data updates
@@ -32,241 +70,90 @@ class OptitrackManager {
 		this.statusListeners = this.statusListeners.filter(listener => listener !== callback);
 	}
 
-	// Start the Optitrack Python script
+	// Stop restarting the stream after a bridge crash
+	disableAutoRestart() {
+		this.autoRestart = false;
+	}
+
+	// Start streaming rigid bodies from the bridge
 	async startOptitrack() {
 		if (this.isRunning) {
 			throw new Error("Optitrack is already running");
 		}
 
-		return new Promise((resolve, reject) => {
-			try {
-				// Configuration to send to Python script
-				const config = {
-					server_ip: constants.OPTITRACK.SERVER_IP,
-					use_multicast: constants.OPTITRACK.USE_MULTICAST
-				};
-
-				// Spawn the Python process
-				this.pythonProcess = spawn('python', ['-u', constants.OPTITRACK.PYTHON_SCRIPT_PATH], {
-					cwd: __dirname // Run from the backend directory
-				});
-
-				// Send configuration to Python script via stdin
-				this.pythonProcess.stdin.write(JSON.stringify(config));
-				this.pythonProcess.stdin.end();
-
-				// Handle data from Python script (stdout = tracking data)
-				this.pythonProcess.stdout.on('data', (data) => {
-					try {
-						const lines = data.toString().split('\n').filter(line => line.trim());
-						lines.forEach(line => {
-							// Only try to parse lines that look like JSON (start with {)
-							if (line.trim().startsWith('{')) {
-								try {
-									const trackingData = JSON.parse(line);
-									
-									// Throttle data to prevent overwhelming frontend
-									const now = Date.now();
-									if (now - this.lastDataSent >= this.dataThrottleMs) {
-										this.dataListeners.forEach(callback => callback(trackingData));
-										this.lastDataSent = now;
-									}
-								} catch (jsonError) {
-									console.log('Non-JSON stdout:', line);
-								}
-							} else {
-								// Log non-JSON stdout output (debug messages, etc.)
-								// console.log('Python stdout:', line);  // Comment this out
-							}
-						});
-					} catch (error) {
-						console.error('Error handling stdout:', error);
-					}
-				});
-
-				// Handle status messages from Python script (stderr = status messages)
-				this.pythonProcess.stderr.on('data', (data) => {
-					try {
-						const lines = data.toString().split('\n').filter(line => line.trim());
-						lines.forEach(line => {
-							// Only try to parse lines that look like JSON (start with {)
-							if (line.trim().startsWith('{')) {
-								try {
-									const statusMessage = JSON.parse(line);
-									console.log('Optitrack Status:', statusMessage);
-									
-									// Send status to all listeners
-									this.statusListeners.forEach(callback => callback(statusMessage));
-
-									// If we get a "Connected" status, resolve the promise
-									if (statusMessage.type === 'status' && statusMessage.message === 'Connected') {
-										this.isRunning = true;
-										resolve();
-									}
-								} catch (jsonError) {
-									// console.log('Non-JSON stderr:', line); // Silenced
-								}
-							} else {
-								// Log non-JSON stderr output (Python errors, debug info, etc.)
-								// console.log('Python stderr:', line); // Comment out this line to silence Python stderr
-							}
-						});
-					} catch (error) {
-						console.error('Error handling stderr:', error);
-					}
-				});
-
-				// Handle process exit
-				this.pythonProcess.on('close', (code) => {
-					console.log(`Optitrack process exited with code ${code}`);
-					this.isRunning = false;
-					this.pythonProcess = null;
-					
-					// Notify status listeners
-					this.statusListeners.forEach(callback => 
-						callback({ type: 'status', message: 'Disconnected', code })
-					);
-					
-					// Auto-restart if it was running (crashed)
-					if (code === null || code !== 0) {
-						console.log('Process crashed, attempting restart in 2 seconds...');
-						setTimeout(() => {
-							if (!this.isRunning) {
-								this.startOptitrack().catch(err => 
-									console.error('Auto-restart failed:', err)
-								);
-							}
-						}, 2000);
-					}
-				});
-
-				// Handle process errors
-				this.pythonProcess.on('error', (error) => {
-					console.error('Failed to start Optitrack process:', error);
-					this.isRunning = false;
-					this.pythonProcess = null;
-					reject(error);
-				});
-
-				// Set a timeout in case connection takes too long
-				setTimeout(() => {
-					if (!this.isRunning) {
-						this.stopOptitrack();
-						reject(new Error("Connection timeout - failed to connect to Optitrack server"));
-					}
-				}, 10000); // 10 second timeout
-
-			} catch (error) {
-				reject(error);
-			}
-		});
+		this.autoRestart = true;
+		try {
+			await this.pythonBridge.request('start_stream', {}, 10000); // 10 second timeout
+		} catch (error) {
+			throw new Error(`Connection failed - failed to connect to Optitrack server: ${error.message}`);
+		}
+		this.isRunning = true;
 	}
 
-	// Stop the Optitrack Python script
+	// Stop streaming rigid bodies; the bridge keeps running for commands and KML generation
 	stopOptitrack() {
-		if (!this.isRunning || !this.pythonProcess) {
+		if (!this.isRunning) {
 			return false;
 		}
 
-		try {
-			// Send SIGTERM to gracefully stop the process
-			this.pythonProcess.kill('SIGTERM');
-			
-			// If it doesn't stop in 5 seconds, force kill it
-			setTimeout(() => {
-				if (this.pythonProcess && !this.pythonProcess.killed) {
-					this.pythonProcess.kill('SIGKILL');
-				}
-			}, 5000);
-
-			this.isRunning = false;
-			return true;
-		} catch (error) {
-			console.error('Error stopping Optitrack process:', error);
-			return false;
-		}
+		this.isRunning = false;
+		this.pythonBridge.request('stop_stream').catch(error =>
+			console.error('Error stopping Optitrack stream:', error)
+		);
+		return true;
 	}
 
 	// Get current status
 	getStatus() {
 		return {
 			isRunning: this.isRunning,
-			processId: this.pythonProcess ? this.pythonProcess.pid : null
+			processId: this.pythonBridge.getProcessId(),
+			stats: this.lastStats
 		};
 	}
 
-	// ONLY ADD THESE RECORDING METHODS - Don't change anything else above
-	
-	// Start recording
-	async startRecording() {
-		return new Promise((resolve, reject) => {
-			try {
-				const config = {
-					server_ip: constants.OPTITRACK.SERVER_IP,
-					use_multicast: constants.OPTITRACK.USE_MULTICAST
-				};
-
-				const recordingProcess = spawn('python', ['-u', './python_scripts/optitrack_start_recording.py'], {
-					cwd: __dirname
-				});
-
-				recordingProcess.stdin.write(JSON.stringify(config));
-				recordingProcess.stdin.end();
-
-				recordingProcess.stdout.on('data', (data) => {
-					const output = data.toString().trim();
-					if (output.includes('Recording started')) {
-						resolve(true);
-					}
-				});
-
-				recordingProcess.on('close', (code) => {
-					if (code === 0) resolve(true);
-					else reject(new Error(`Start recording failed with code ${code}`));
-				});
-
-				recordingProcess.on('error', reject);
+	// Send a Motive command (e.g. "StartRecording" or "SetRecordTakeName" with
+	// args ["take_01"]) over the bridge. Resolves with the Motive response.
+	async sendMotiveCommand(command, args = []) {
+		try {
+			return await this.pythonBridge.request('command', { command, args }, constants.OPTITRACK.COMMAND_TIMEOUT_MS);
+		} catch (error) {
+			throw new Error(`Motive command ${command} failed: ${error.message}`);
+		}
+	}
 
+	// Start recording, optionally naming the take first
+	async startRecording(takeName = null) {
+		if (takeName) {
+			await this.sendMotiveCommand('SetRecordTakeName', [takeName]);
+		}
+		await this.sendMotiveCommand('StartRecording');
+		if (constants.FLIGHT_RECORDER.ENABLED && !this.flightRecordingPath) {
+			// Also log the live stream, so the flight can be evaluated without a CSV export
+			const name = (takeName || new Date().toISOString()).replace(/[^\w.-]/g, '_');
+			const path = `${constants.FLIGHT_RECORDER.DIRECTORY}/${name}.nnfl`;
+			try {
+				this.flightRecordingPath = await this.pythonBridge.request('start_flight_recording', { path });
 			} catch (error) {
-				reject(error);
+				console.error('Failed to start flight recording:', error.message);
 			}
-		});
+		}
+		return true;
 	}
 
 	// Stop recording
 	async stopRecording() {
-		return new Promise((resolve, reject) => {
+		await this.sendMotiveCommand('StopRecording');
+		if (this.flightRecordingPath) {
+			this.flightRecordingPath = null;
 			try {
-				const config = {
-					server_ip: constants.OPTITRACK.SERVER_IP,
-					use_multicast: constants.OPTITRACK.USE_MULTICAST
-				};
-
-				const recordingProcess = spawn('python', ['-u', './python_scripts/optitrack_stop_recording.py'], {
-					cwd: __dirname
-				});
-
-				recordingProcess.stdin.write(JSON.stringify(config));
-				recordingProcess.stdin.end();
-
-				recordingProcess.stdout.on('data', (data) => {
-					const output = data.toString().trim();
-					if (output.includes('Recording stopped')) {
-						resolve(true);
-					}
-				});
-
-				recordingProcess.on('close', (code) => {
-					if (code === 0) resolve(true);
-					else reject(new Error(`Stop recording failed with code ${code}`));
-				});
-
-				recordingProcess.on('error', reject);
-
+				const counts = await this.pythonBridge.request('stop_flight_recording');
+				console.log('Flight recording saved:', counts);
 			} catch (error) {
-				reject(error);
+				console.error('Failed to stop flight recording:', error.message);
 			}
-		});
+		}
+		return true;
 	}
 
 	// Add this method to link sessions with test starts
@@ -0,0 +1,216 @@
+# OptiTrack NatNet client for asyncio
+#
+# Runs a NatNetClient on an event loop instead of its command and data
+# threads.  Both channels are asyncio datagram endpoints, decoded frames are
+# read with an async iterator and Motive commands are awaited.
+#
+#   client = NatNetClient()
+#   client.set_server_address(server_ip)
+#   client.set_client_address(local_ip)
+#   client.set_use_multicast(True)
+#   async_client = AsyncNatNetClient(client)
+#   if await async_client.connect():
+#       response = await async_client.send_command("StartRecording")
+#       async for mocap_data in async_client:
+#           ...
+#   async_client.close()
+
+import asyncio
+import collections
+
+from NatNetClient import NatNetClient, get_message_id
+
+
+class NatNetDatagramProtocol(asyncio.DatagramProtocol):
+    """Passes every datagram received on one NatNet channel to a
+    callback"""
+
+    def __init__(self, datagram_callback):
+        self.datagram_callback = datagram_callback
+
+    def datagram_received(self, data, addr):
+        self.datagram_callback(data)
+
+    def error_received(self, exc):
+        print("ERROR: NatNet socket error occurred:\n  %s" % exc)
+
+
+class AsyncNatNetClient:
+    """NatNetClient driven by an asyncio event loop.
+
+    Frames are the MoCapData objects NatNetClient hands to
+    new_frame_with_data_listener, or MoCapData.ColumnarFrame when the client
+    uses columnar frames.  Every ``async for`` over the client (or over
+    frames()) gets its own queue of the frame_queue_size most recent frames,
+    so one loop can serve many consumers and a slow one only drops its own
+    oldest frames.  Frames outlive the decode callback here, so the client
+    must not use the object pool.
+
+    AsyncNatNetClient takes over the client's new_frame_with_data_listener,
+    columnar_frame_listener and command_response_listener.
+    rigid_body_listener and new_frame_listener are still called while
+    frames are decoded."""
+
+    def __init__(self, client=None, frame_queue_size=8):
+        if client is None:
+            client = NatNetClient()
+        self.client = client
+        # Frames kept per consumer before its oldest frames are dropped
+        self.frame_queue_size = frame_queue_size
+        # Seconds between keep alives on unicast connections
+        self.keep_alive_interval = 1.0
+
+        self.__data_transport = None
+        self.__command_transport = None
+        self.__frame_queues = []
+        # (future, send time) of each send_command in the order the
+        # commands were sent
+        self.__pending_responses = collections.deque()
+        self.__server_info_received = None
+        self.__keep_alive_task = None
+        self.__message_counts = {}
+
+        client.new_frame_with_data_listener = self.__on_frame_with_data
+        client.columnar_frame_listener = self.__on_frame
+        client.command_response_listener = self.__on_command_response
+
+    async def connect(self, timeout=2.0):
+        """Opens the data and command channels and sends NAT_CONNECT.
+        Returns True once the server info arrives and False, with both
+        channels closed again, if it does not arrive within timeout
+        seconds."""
+        client = self.client
+        if not client.open_sockets():
+            return False
+        loop = asyncio.get_running_loop()
+        self.__server_info_received = loop.create_future()
+        self.__data_transport, _ = await loop.create_datagram_endpoint(
+            lambda: NatNetDatagramProtocol(self.__on_datagram),
+            sock=client.data_socket)
+        self.__command_transport, _ = await loop.create_datagram_endpoint(
+            lambda: NatNetDatagramProtocol(self.__on_datagram),
+            sock=client.command_socket)
+        if not client.use_multicast:
+            self.__keep_alive_task = loop.create_task(self.__keep_alive())
+
+        # Required for setup
+        # Get NatNet and server versions
+        self.__send_request(client.NAT_CONNECT, "")
+        try:
+            await asyncio.wait_for(asyncio.shield(self.__server_info_received), timeout) #type: ignore  # noqa E501
+        except asyncio.TimeoutError:
+            print("ERROR: No server info received. Server not responding")
+            # closing the transports also closes the sockets they wrap
+            self.close()
+            return False
+        return True
+
+    def connected(self):
+        return (self.__server_info_received is not None) and \
+            self.__server_info_received.done()
+
+    async def send_command(self, command_str, timeout=2.0):
+        """Sends a Motive command and returns its NAT_RESPONSE, an int for 4
+        byte responses and a str otherwise.  NatNet responses carry no
+        request id, so they are matched to commands in the order the
+        commands were sent, and a response arriving after its command timed
+        out is dropped.  Raises asyncio.TimeoutError when no response
+        arrives within timeout seconds."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.__pending_responses.append((future, loop.time()))
+        self.__send_request(self.client.NAT_REQUEST, command_str)
+        return await asyncio.wait_for(future, timeout)
+
+    async def send_commands(self, commands, timeout=2.0):
+        """Sends each command in turn and returns their responses"""
+        responses = []
+        for command_str in commands:
+            responses.append(await self.send_command(command_str, timeout))
+        return responses
+
+    async def frames(self):
+        """Yields decoded frames until close is called"""
+        queue = asyncio.Queue(self.frame_queue_size)
+        self.__frame_queues.append(queue)
+        try:
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    break
+                yield frame
+        finally:
+            self.__frame_queues.remove(queue)
+
+    def __aiter__(self):
+        return self.frames()
+
+    def close(self):
+        """Closes both channels and ends every frames() iterator"""
+        if self.__keep_alive_task is not None:
+            self.__keep_alive_task.cancel()
+            self.__keep_alive_task = None
+        if self.__data_transport is not None:
+            self.__data_transport.close()
+            self.__data_transport = None
+        if self.__command_transport is not None:
+            self.__command_transport.close()
+            self.__command_transport = None
+        for queue in self.__frame_queues:
+            self.__put_latest(queue, None)
+        while self.__pending_responses:
+            self.__pending_responses.popleft()[0].cancel()
+
+    def __send_request(self, command, command_str):
+        address = (self.client.server_ip_address, self.client.command_port)
+        # datagram transports have the sendto of the socket they wrap
+        return self.client.send_request(self.__command_transport, command, command_str, address) #type: ignore  # noqa E501
+
+    async def __keep_alive(self):
+        while True:
+            self.__send_request(self.client.NAT_KEEPALIVE, "")
+            await asyncio.sleep(self.keep_alive_interval)
+
+    def __on_datagram(self, data):
+        client = self.client
+        message_id = get_message_id(data)
+        message_count = self.__message_counts.get(message_id, 0) + 1
+        self.__message_counts[message_id] = message_count
+        # print every print_level-th frame like the client threads do
+        print_level = client.get_print_level()
+        if (message_id == client.NAT_FRAMEOFDATA) and (print_level > 0):
+            if (message_count % print_level) == 0:
+                print_level = 1
+            else:
+                print_level = 0
+        client.process_message(data, print_level)
+        if (message_id == client.NAT_SERVERINFO) and \
+                not self.__server_info_received.done():
+            self.__server_info_received.set_result(True)
+
+    def __on_frame_with_data(self, data_dict):
+        self.__on_frame(data_dict["mocap_data"])
+
+    def __on_frame(self, frame):
+        for queue in self.__frame_queues:
+            self.__put_latest(queue, frame)
+
+    def __on_command_response(self, response):
+        # A command that timed out keeps its place, so its late response is
+        # dropped instead of answering the next command.  The place expires
+        # in case the response was lost.
+        pending_responses = self.__pending_responses
+        expiry_time = asyncio.get_running_loop().time() - self.client.COMMAND_RESPONSE_EXPIRY #type: ignore  # noqa E501
+        while pending_responses and pending_responses[0][0].done() and \
+                (pending_responses[0][1] < expiry_time):
+            pending_responses.popleft()
+        if pending_responses:
+            future = pending_responses.popleft()[0]
+            if not future.done():
+                future.set_result(response)
+
+    def __put_latest(self, queue, item):
+        """Queues item, dropping the oldest frame of a full queue"""
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(item)
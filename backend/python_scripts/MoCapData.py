@@ -28,14 +28,24 @@
 
 # Utility functions
 
-import copy
 import hashlib
 import random
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 K_SKIP = [0, 0, 1]
 K_FAIL = [0, 1, 0]
 K_PASS = [1, 0, 0]
 
+# Record layout of LabeledMarkerArrayData.markers
+if np is not None:
+    LABELED_MARKER_DTYPE = np.dtype([('id', '<i4'), ('pos', '<f4', (3,)),
+                                     ('size', '<f4'), ('param', '<i2'),
+                                     ('residual', '<f8')])
+
 
 # get_tab_str
 # generate a string that takes the nesting level into account
@@ -148,6 +158,8 @@ def stringify_timecode(timecode, timecode_sub):
 
 # MoCap Frame Classes
 class FramePrefixData:
+    __slots__ = ('frame_number',)
+
     def __init__(self, frame_number):
         self.frame_number = frame_number
 
@@ -158,6 +170,8 @@ class FramePrefixData:
 
 
 class MarkerData:
+    __slots__ = ('model_name', 'marker_pos_list')
+
     def __init__(self):
         self.model_name = ""
         self.marker_pos_list = []
@@ -166,7 +180,7 @@ class MarkerData:
         self.model_name = model_name
 
     def add_pos(self, pos):
-        self.marker_pos_list.append(copy.deepcopy(pos))
+        self.marker_pos_list.append(pos)
         return len(self.marker_pos_list)
 
     def get_num_points(self):
@@ -191,13 +205,15 @@ class MarkerData:
 
 
 class MarkerSetData:
+    __slots__ = ('marker_data_list', 'unlabeled_markers')
+
     def __init__(self):
         self.marker_data_list = []
         self.unlabeled_markers = MarkerData()
         self.unlabeled_markers.set_model_name("")
 
     def add_marker_data(self, marker_data):
-        self.marker_data_list.append(copy.deepcopy(marker_data))
+        self.marker_data_list.append(marker_data)
         return len(self.marker_data_list)
 
     def add_unlabeled_marker(self, pos):
@@ -229,12 +245,72 @@ class MarkerSetData:
         return out_str
 
 
+class MarkerSetArrayData:
+    """Marker sets of one frame with every marker position in a single
+    (N, 3) float32 array.  The markers of model_names[i] are rows
+    marker_set_offsets[i] to marker_set_offsets[i] + marker_counts[i]."""
+    __slots__ = ('model_names', 'marker_counts', 'marker_set_offsets', 'pos')
+
+    def __init__(self, model_names, marker_counts, pos):
+        self.model_names = model_names
+        self.marker_counts = marker_counts
+        self.marker_set_offsets = []
+        row = 0
+        for marker_count in marker_counts:
+            self.marker_set_offsets.append(row)
+            row += marker_count
+        self.pos = pos
+
+    def get_marker_set_count(self):
+        return len(self.model_names)
+
+    def get_unlabeled_marker_count(self):
+        return 0
+
+    def get_marker_positions(self, model_name):
+        """Returns the (n, 3) view of one marker set, or None"""
+        for i in range(len(self.model_names)):
+            if self.model_names[i] == model_name:
+                start = self.marker_set_offsets[i]
+                return self.pos[start:start + self.marker_counts[i]]
+        return None
+
+    def to_marker_set_data(self):
+        """Returns the same marker sets as a MarkerSetData"""
+        marker_set_data = MarkerSetData()
+        pos_list = self.pos.tolist()
+        for i in range(len(self.model_names)):
+            marker_data = MarkerData()
+            marker_data.set_model_name(self.model_names[i])
+            start = self.marker_set_offsets[i]
+            for pos in pos_list[start:start + self.marker_counts[i]]:
+                marker_data.add_pos(tuple(pos))
+            marker_set_data.add_marker_data(marker_data)
+        return marker_set_data
+
+    def get_as_string(self, tab_str="  ", level=0):
+        out_tab_str = get_tab_str(tab_str, level)
+        out_tab_str2 = get_tab_str(tab_str, level+1)
+        out_str = ""
+        marker_data_count = len(self.model_names)
+        out_str += "%sMarkerset Count:%3.1d\n" % (out_tab_str,
+                                                  marker_data_count)
+        for i in range(marker_data_count):
+            out_str += "%sModel Name : %s\n" % (
+                out_tab_str2, get_as_string(self.model_names[i]))
+            out_str += "%sMarker Count :%3.1d\n" % (out_tab_str2,
+                                                    self.marker_counts[i])
+        return out_str
+
+
 class LegacyMarkerData:
+    __slots__ = ('marker_pos_list',)
+
     def __init__(self):
         self.marker_pos_list = []
 
     def add_pos(self, pos):
-        self.marker_pos_list.append(copy.deepcopy(pos))
+        self.marker_pos_list.append(pos)
         return len(self.marker_pos_list)
 
     def get_marker_count(self):
@@ -254,7 +330,33 @@ class LegacyMarkerData:
         return out_str
 
 
+class LegacyMarkerArrayData:
+    """Legacy markers of one frame as an (N, 3) float32 array"""
+    __slots__ = ('pos',)
+
+    def __init__(self, pos):
+        self.pos = pos
+
+    def get_marker_count(self):
+        return len(self.pos)
+
+    def to_legacy_marker_data(self):
+        """Returns the same markers as a LegacyMarkerData"""
+        legacy_marker_data = LegacyMarkerData()
+        for pos in self.pos.tolist():
+            legacy_marker_data.add_pos(tuple(pos))
+        return legacy_marker_data
+
+    def get_as_string(self, tab_str="  ", level=0):
+        out_tab_str = get_tab_str(tab_str, level)
+        out_str = "%sLegacy Marker Count :%3.1d\n" % (out_tab_str,
+                                                       len(self.pos))
+        return out_str
+
+
 class RigidBodyMarker:
+    __slots__ = ('pos', 'id_num', 'size', 'error', 'marker_num')
+
     def __init__(self):
         self.pos = [0.0, 0.0, 0.0]
         self.id_num = 0
@@ -278,6 +380,9 @@ class RigidBodyMarker:
 
 
 class RigidBody:
+    __slots__ = ('id_num', 'pos', 'rot', 'rb_marker_list', 'tracking_valid',
+                 'error', 'marker_num')
+
     def __init__(self, new_id, pos, rot):
         self.id_num = new_id
         self.pos = pos
@@ -287,8 +392,18 @@ class RigidBody:
         self.error = 0.0
         self.marker_num = -1
 
+    def reset(self, new_id, pos, rot):
+        """Reinitializes a pooled rigid body for a new frame"""
+        self.id_num = new_id
+        self.pos = pos
+        self.rot = rot
+        self.rb_marker_list.clear()
+        self.tracking_valid = False
+        self.error = 0.0
+        self.marker_num = -1
+
     def add_rigid_body_marker(self, rigid_body_marker):
-        self.rb_marker_list.append(copy.deepcopy(rigid_body_marker))
+        self.rb_marker_list.append(rigid_body_marker)
         return len(self.rb_marker_list)
 
     def get_as_string(self, tab_str=0, level=0):
@@ -333,11 +448,13 @@ class RigidBody:
 
 
 class RigidBodyData:
+    __slots__ = ('rigid_body_list',)
+
     def __init__(self):
         self.rigid_body_list = []
 
     def add_rigid_body(self, rigid_body):
-        self.rigid_body_list.append(copy.deepcopy(rigid_body))
+        self.rigid_body_list.append(rigid_body)
         return len(self.rigid_body_list)
 
     def get_rigid_body_count(self):
@@ -358,12 +475,14 @@ class RigidBodyData:
 
 
 class Skeleton:
+    __slots__ = ('id_num', 'rigid_body_list')
+
     def __init__(self, new_id=0):
         self.id_num = new_id
         self.rigid_body_list = []
 
     def add_rigid_body(self, rigid_body):
-        self.rigid_body_list.append(copy.deepcopy(rigid_body))
+        self.rigid_body_list.append(rigid_body)
         return len(self.rigid_body_list)
 
     def get_as_string(self, tab_str="  ", level=0):
@@ -381,11 +500,13 @@ class Skeleton:
 
 
 class SkeletonData:
+    __slots__ = ('skeleton_list',)
+
     def __init__(self):
         self.skeleton_list = []
 
     def add_skeleton(self, new_skeleton):
-        self.skeleton_list.append(copy.deepcopy(new_skeleton))
+        self.skeleton_list.append(new_skeleton)
 
     def get_skeleton_count(self):
         return len(self.skeleton_list)
@@ -405,6 +526,9 @@ class SkeletonData:
 
 
 class AssetMarkerData:
+    __slots__ = ('marker_id', 'pos', 'marker_size', 'marker_params',
+                 'residual', 'marker_num')
+
     def __init__(self, marker_id, pos, marker_size=0.0, marker_params=0,
                  residual=0.0, marker_num=-1):
         self.marker_id = marker_id
@@ -443,6 +567,8 @@ class AssetMarkerData:
 
 
 class AssetRigidBodyData:
+    __slots__ = ('id_num', 'pos', 'rot', 'mean_error', 'param', 'rb_num')
+
     def __init__(self, new_id, pos, rot, mean_error=0.0, param=0):
         self.id_num = new_id
         self.pos = pos
@@ -471,6 +597,8 @@ class AssetRigidBodyData:
 
 
 class Asset:
+    __slots__ = ('asset_id', 'rigid_body_list', 'marker_list')
+
     def __init__(self):
         self.asset_id = 0
         self.rigid_body_list = []
@@ -480,11 +608,11 @@ class Asset:
         self.asset_id = new_id
 
     def add_rigid_body(self, rigid_body):
-        self.rigid_body_list.append(copy.deepcopy(rigid_body))
+        self.rigid_body_list.append(rigid_body)
         return len(self.rigid_body_list)
 
     def add_marker(self, marker):
-        self.marker_list.append(copy.deepcopy(marker))
+        self.marker_list.append(marker)
         return len(self.marker_list)
 
     def get_rigid_body_count(self):
@@ -518,11 +646,13 @@ class Asset:
 
 
 class AssetData:
+    __slots__ = ('asset_list',)
+
     def __init__(self):
         self.asset_list = []
 
     def add_asset(self, new_asset):
-        self.asset_list.append(copy.deepcopy(new_asset))
+        self.asset_list.append(new_asset)
 
     def get_asset_count(self):
         return len(self.asset_list)
@@ -542,6 +672,8 @@ class AssetData:
 
 
 class LabeledMarker:
+    __slots__ = ('id_num', 'pos', 'size', 'param', 'residual', 'marker_num')
+
     def __init__(self, new_id, pos, size=0.0, param=0, residual=0.0):
         self.id_num = new_id
         self.pos = pos
@@ -552,6 +684,17 @@ class LabeledMarker:
         if str(type(size)) == "<class 'tuple'>":
             self.size = size[0]
 
+    def reset(self, new_id, pos, size=0.0, param=0, residual=0.0):
+        """Reinitializes a pooled labeled marker for a new frame"""
+        self.id_num = new_id
+        self.pos = pos
+        self.size = size
+        self.param = param
+        self.residual = residual
+        self.marker_num = -1
+        if str(type(size)) == "<class 'tuple'>":
+            self.size = size[0]
+
     def __decode_marker_id(self):
         model_id = self.id_num >> 16
         marker_id = self.id_num & 0x0000ffff
@@ -591,11 +734,13 @@ class LabeledMarker:
 
 
 class LabeledMarkerData:
+    __slots__ = ('labeled_marker_list',)
+
     def __init__(self):
         self.labeled_marker_list = []
 
     def add_labeled_marker(self, labeled_marker):
-        self.labeled_marker_list.append(copy.deepcopy(labeled_marker))
+        self.labeled_marker_list.append(labeled_marker)
         return len(self.labeled_marker_list)
 
     def get_labeled_marker_count(self):
@@ -615,13 +760,56 @@ class LabeledMarkerData:
         return out_str
 
 
+class LabeledMarkerArrayData:
+    """Labeled markers of one frame as one LABELED_MARKER_DTYPE record
+    array.  id, pos, size, param and residual are column views of it."""
+    __slots__ = ('markers', 'id_num', 'pos', 'size', 'param', 'residual')
+
+    def __init__(self, markers):
+        self.markers = markers
+        self.id_num = markers['id']
+        self.pos = markers['pos']
+        self.size = markers['size']
+        self.param = markers['param']
+        self.residual = markers['residual']
+
+    def get_labeled_marker_count(self):
+        return len(self.markers)
+
+    def get_model_ids(self):
+        return self.id_num >> 16
+
+    def get_marker_ids(self):
+        return self.id_num & 0x0000ffff
+
+    def to_labeled_marker_data(self):
+        """Returns the same markers as a LabeledMarkerData"""
+        labeled_marker_data = LabeledMarkerData()
+        rows = zip(self.id_num.tolist(), self.pos.tolist(),
+                   self.size.tolist(), self.param.tolist(),
+                   self.residual.tolist())
+        for new_id, pos, size, param, residual in rows:
+            labeled_marker = LabeledMarker(new_id, tuple(pos), size, param,
+                                           residual)
+            labeled_marker_data.add_labeled_marker(labeled_marker)
+        return labeled_marker_data
+
+    def get_as_string(self, tab_str="  ", level=0):
+        out_tab_str = get_tab_str(tab_str, level)
+        out_str = "%sLabeled Marker Count:%3.1d\n" % (out_tab_str,
+                                                       len(self.markers))
+        return out_str
+
+
 class ForcePlateChannelData:
+    __slots__ = ('frame_list',)
+
     def __init__(self):
         # list of floats
         self.frame_list = []
 
     def add_frame_entry(self, frame_entry):
-        self.frame_list.append(copy.deepcopy(frame_entry))
+        self.frame_list.append(frame_entry)
         return len(self.frame_list)
 
     def get_as_string(self, tab_str, level, channel_num=-1):
@@ -645,12 +833,14 @@ class ForcePlateChannelData:
 
 
 class ForcePlate:
+    __slots__ = ('id_num', 'channel_data_list')
+
     def __init__(self, new_id=0):
         self.id_num = new_id
         self.channel_data_list = []
 
     def add_channel_data(self, channel_data):
-        self.channel_data_list.append(copy.deepcopy(channel_data))
+        self.channel_data_list.append(channel_data)
         return len(self.channel_data_list)
 
     def get_as_string(self, tab_str, level):
@@ -667,11 +857,13 @@ class ForcePlate:
 
 
 class ForcePlateData:
+    __slots__ = ('force_plate_list',)
+
     def __init__(self):
         self.force_plate_list = []
 
     def add_force_plate(self, force_plate):
-        self.force_plate_list.append(copy.deepcopy(force_plate))
+        self.force_plate_list.append(force_plate)
         return len(self.force_plate_list)
 
     def get_force_plate_count(self):
@@ -693,12 +885,14 @@ class ForcePlateData:
 
 
 class DeviceChannelData:
+    __slots__ = ('frame_list',)
+
     def __init__(self):
         # list of floats
         self.frame_list = []
 
     def add_frame_entry(self, frame_entry):
-        self.frame_list.append(copy.deepcopy(frame_entry))
+        self.frame_list.append(frame_entry)
         return len(self.frame_list)
 
     def get_as_string(self, tab_str, level, channel_num=-1):
@@ -722,12 +916,14 @@ class DeviceChannelData:
 
 
 class Device:
+    __slots__ = ('id_num', 'channel_data_list')
+
     def __init__(self, new_id):
         self.id_num = new_id
         self.channel_data_list = []
 
     def add_channel_data(self, channel_data):
-        self.channel_data_list.append(copy.deepcopy(channel_data))
+        self.channel_data_list.append(channel_data)
         return len(self.channel_data_list)
 
     def get_as_string(self, tab_str, level, device_num):
@@ -746,11 +942,13 @@ class Device:
 
 
 class DeviceData:
+    __slots__ = ('device_list',)
+
     def __init__(self):
         self.device_list = []
 
     def add_device(self, device):
-        self.device_list.append(copy.deepcopy(device))
+        self.device_list.append(device)
         return len(self.device_list)
 
     def get_device_count(self):
@@ -769,6 +967,12 @@ class DeviceData:
 
 
 class FrameSuffixData:
+    __slots__ = ('timecode', 'timecode_sub', 'timestamp',
+                 'stamp_camera_mid_exposure', 'stamp_data_received',
+                 'stamp_transmit', 'prec_timestamp_secs',
+                 'prec_timestamp_frac_secs', 'param', 'is_recording',
+                 'tracked_models_changed')
+
     def __init__(self):
         self.timecode = -1
         self.timecode_sub = -1
@@ -822,6 +1026,11 @@ class FrameSuffixData:
 
 
 class MoCapData:
+    __slots__ = ('prefix_data', 'marker_set_data', 'legacy_other_markers',
+                 'rigid_body_data', 'asset_data', 'skeleton_data',
+                 'labeled_marker_data', 'force_plate_data', 'device_data',
+                 'suffix_data')
+
     def __init__(self):
         # Packet Parts
         self.prefix_data = None
@@ -921,6 +1130,151 @@ class MoCapData:
 
         return out_str
 
+
+class ColumnarFrame:
+    """One frame of data with the rigid bodies held as fixed width numpy
+    arrays, where row i of every rigid_body_* array is one rigid body.
+    The marker sections are MarkerSetArrayData, LegacyMarkerArrayData and
+    LabeledMarkerArrayData.  Skeletons, assets, force plates and devices
+    keep the object model.  Sections that were not decoded are None.
+    to_mocap_data() builds the MoCapData object tree on demand."""
+    __slots__ = ('prefix_data', 'frame_number', 'rigid_body_ids',
+                 'rigid_body_pos', 'rigid_body_rot', 'rigid_body_error',
+                 'rigid_body_valid', 'marker_set_data', 'legacy_other_markers',
+                 'skeleton_data', 'asset_data', 'labeled_marker_data',
+                 'force_plate_data', 'device_data', 'suffix_data', 'timecode',
+                 'timecode_sub', 'timestamp', 'is_recording',
+                 'tracked_models_changed')
+
+    def __init__(self, prefix_data):
+        self.prefix_data = prefix_data
+        self.frame_number = prefix_data.frame_number
+        # int32[N], float32[N, 3], float32[N, 4], float32[N], bool[N]
+        self.rigid_body_ids = None
+        self.rigid_body_pos = None
+        self.rigid_body_rot = None
+        self.rigid_body_error = None
+        self.rigid_body_valid = None
+        self.marker_set_data = None
+        self.legacy_other_markers = None
+        self.skeleton_data = None
+        self.asset_data = None
+        self.labeled_marker_data = None
+        self.force_plate_data = None
+        self.device_data = None
+        self.suffix_data = None
+        self.timecode = -1
+        self.timecode_sub = -1
+        self.timestamp = -1
+        self.is_recording = False
+        self.tracked_models_changed = True
+
+    def set_rigid_bodies(self, ids, pos, rot, error, valid):
+        self.rigid_body_ids = ids
+        self.rigid_body_pos = pos
+        self.rigid_body_rot = rot
+        self.rigid_body_error = error
+        self.rigid_body_valid = valid
+
+    def set_suffix_data(self, new_suffix_data):
+        self.suffix_data = new_suffix_data
+        self.timecode = new_suffix_data.timecode
+        self.timecode_sub = new_suffix_data.timecode_sub
+        self.timestamp = new_suffix_data.timestamp
+        self.is_recording = new_suffix_data.is_recording
+        self.tracked_models_changed = new_suffix_data.tracked_models_changed
+
+    def get_rigid_body_count(self):
+        if self.rigid_body_ids is None:
+            return 0
+        return len(self.rigid_body_ids)
+
+    def get_rigid_body_index(self, rigid_body_id):
+        """Returns the row of a rigid body id, or -1"""
+        if self.rigid_body_ids is not None:
+            rows = np.flatnonzero(self.rigid_body_ids == rigid_body_id)
+            if len(rows) > 0:
+                return int(rows[0])
+        return -1
+
+    def to_mocap_data(self):
+        """Returns the frame as a MoCapData object tree"""
+        mocap_data = MoCapData()
+        mocap_data.set_prefix_data(self.prefix_data)
+        if self.marker_set_data is not None:
+            mocap_data.set_marker_set_data(
+                self.marker_set_data.to_marker_set_data())
+        if self.legacy_other_markers is not None:
+            mocap_data.set_legacy_other_markers(
+                self.legacy_other_markers.to_legacy_marker_data())
+        if self.rigid_body_ids is not None:
+            rigid_body_data = RigidBodyData()
+            rows = zip(self.rigid_body_ids.tolist(),
+                       self.rigid_body_pos.tolist(),
+                       self.rigid_body_rot.tolist(),
+                       self.rigid_body_error.tolist(),
+                       self.rigid_body_valid.tolist())
+            for new_id, pos, rot, error, valid in rows:
+                rigid_body = RigidBody(new_id, tuple(pos), tuple(rot))
+                rigid_body.error = error
+                rigid_body.tracking_valid = valid
+                rigid_body_data.add_rigid_body(rigid_body)
+            mocap_data.set_rigid_body_data(rigid_body_data)
+        mocap_data.set_skeleton_data(self.skeleton_data)
+        mocap_data.set_asset_data(self.asset_data)
+        if self.labeled_marker_data is not None:
+            mocap_data.set_labeled_marker_data(
+                self.labeled_marker_data.to_labeled_marker_data())
+        mocap_data.set_force_plate_data(self.force_plate_data)
+        mocap_data.set_device_data(self.device_data)
+        mocap_data.set_suffix_data(self.suffix_data)
+        return mocap_data
+
+    def get_as_string(self, tab_str="  ", level=0):
+        return self.to_mocap_data().get_as_string(tab_str, level)
+
+
+class FramePool:
+    """Hands the rigid bodies and labeled markers of a recycled frame out
+    again for the next frame, so steady streams stop allocating them.
+    Only safe when nothing keeps a reference to a frame after its
+    listeners return."""
+    __slots__ = ('rigid_body_list', 'labeled_marker_list')
+
+    def __init__(self):
+        self.rigid_body_list = []
+        self.labeled_marker_list = []
+
+    def new_rigid_body(self, new_id, pos, rot):
+        if self.rigid_body_list:
+            rigid_body = self.rigid_body_list.pop()
+            rigid_body.reset(new_id, pos, rot)
+            return rigid_body
+        return RigidBody(new_id, pos, rot)
+
+    def new_labeled_marker(self, new_id, pos, size=0.0, param=0,
+                           residual=0.0):
+        if self.labeled_marker_list:
+            labeled_marker = self.labeled_marker_list.pop()
+            labeled_marker.reset(new_id, pos, size, param, residual)
+            return labeled_marker
+        return LabeledMarker(new_id, pos, size, param, residual)
+
+    def recycle(self, mocap_data):
+        """Takes back the rigid bodies and labeled markers of a MoCapData
+        that is no longer referenced"""
+        # Only the object containers hold pooled objects; array containers
+        # (set_use_marker_arrays) have nothing to take back
+        if isinstance(mocap_data.rigid_body_data, RigidBodyData):
+            self.rigid_body_list.extend(
+                mocap_data.rigid_body_data.rigid_body_list)
+        if isinstance(mocap_data.skeleton_data, SkeletonData):
+            for skeleton in mocap_data.skeleton_data.skeleton_list:
+                self.rigid_body_list.extend(skeleton.rigid_body_list)
+        if isinstance(mocap_data.labeled_marker_data, LabeledMarkerData):
+            self.labeled_marker_list.extend(
+                mocap_data.labeled_marker_data.labeled_marker_list)
+
 # test program
 
 
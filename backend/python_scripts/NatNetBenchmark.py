@@ -0,0 +1,278 @@
+# OptiTrack NatNet decoder benchmark
+#
+# Times the NAT_FRAMEOFDATA and NAT_MODELDEF decoders of NatNetClient on
+# golden packets: SyntheticFrameGenerator packets for each supported NatNet
+# version (2.x, 3.x, 4.0, 4.1 and 4.2) with small, medium and large body
+# and marker counts.  The packets are the same on every run, so a case's
+# decoded get_as_string() hashes, as in MoCapData.test_hash, only change
+# when the decoder does.
+#
+#   python NatNetBenchmark.py --save-baseline natnet_baseline.json
+#   ... change the decoder ...
+#   python NatNetBenchmark.py --baseline natnet_baseline.json
+#
+# prints frames/s and allocations per case, and with a baseline exits with
+# status 1 when a case decodes differently, decodes more than --threshold
+# slower, or allocates more than --threshold more than in the baseline.
+# Baselines only compare on the machine and Python they were saved with.
+# --object-pool recycles each frame through MoCapData.FramePool, so running
+# with and without it shows the allocations the pool saves.
+
+import contextlib
+import gc
+import hashlib
+import io
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+from NatNetClient import NatNetClient
+from NatNetSyntheticServer import SyntheticFrameGenerator, build_server_info
+
+VERSIONS = [(2, 11), (3, 1), (4, 0), (4, 1), (4, 2)]
+
+# SyntheticFrameGenerator options of each size
+SIZES = {
+    "small": {"rigid_body_count": 4, "marker_set_count": 1,
+              "markers_per_set": 5, "labeled_marker_count": 6},
+    "medium": {"rigid_body_count": 16, "marker_set_count": 4,
+               "markers_per_set": 8, "labeled_marker_count": 48,
+               "skeleton_count": 1, "bones_per_skeleton": 21,
+               "asset_count": 1, "force_plate_count": 1, "device_count": 1},
+    "large": {"rigid_body_count": 64, "marker_set_count": 16,
+              "markers_per_set": 10, "legacy_marker_count": 4,
+              "labeled_marker_count": 256, "skeleton_count": 2,
+              "bones_per_skeleton": 21, "asset_count": 2,
+              "force_plate_count": 2, "device_count": 2},
+}
+
+
+def get_case_name(version, size):
+    return "%d.%d/%s" % (version[0], version[1], size)
+
+
+def get_hash(data_object):
+    # get_as_string of some vendor objects prints
+    with contextlib.redirect_stdout(io.StringIO()):
+        out_str = data_object.get_as_string()
+    return hashlib.sha1(out_str.encode()).hexdigest()
+
+
+class DecoderCase:
+    """One decoder of one golden packet.  The client is switched to the
+    packet's NatNet version through a NAT_SERVERINFO message, as a live
+    connection would be."""
+
+    def __init__(self, name, kind, version, packet, decode_sections=None,
+                 use_object_pool=False):
+        self.name = name
+        self.kind = kind
+        self.version = version
+        self.packet = packet
+        self.client = NatNetClient()
+        self.client.set_print_level(0)
+        self.client.set_decode_sections(decode_sections)
+        self.client.set_use_object_pool(use_object_pool)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.client.process_message(build_server_info(version))
+        # frames go back to the object pool after each decode, as after
+        # their listeners in NatNetClient
+        self.__recycle = None
+        if kind == "frame":
+            self.__unpack = self.client._NatNetClient__unpack_mocap_data #type: ignore  # noqa E501
+            if use_object_pool:
+                self.__recycle = self.client._NatNetClient__recycle_frame #type: ignore  # noqa E501
+        else:
+            self.__unpack = self.client._NatNetClient__unpack_data_descriptions #type: ignore  # noqa E501
+        self.__data = memoryview(packet)[4:]
+        self.__packet_size = len(packet) - 4
+
+    def decode(self):
+        result = self.__unpack(self.__data, self.__packet_size, self.version[0], self.version[1]) #type: ignore  # noqa E501
+        if self.__recycle is not None:
+            self.__recycle(result[1])
+        return result
+
+    def check(self):
+        """Decodes the packet once and returns (error or None, hash of the
+        decoded object)"""
+        offset, data_object = self.decode()
+        if offset != self.__packet_size:
+            return "decoded %d of %d bytes" % (offset, self.__packet_size), None #type: ignore  # noqa E501
+        return None, get_hash(data_object)
+
+    def time_decode(self, min_time=0.2, repeat=5):
+        """Returns the seconds per decode of each of repeat runs of at least
+        min_time seconds, with the garbage collector off as in timeit"""
+        decode = self.decode
+        number = 1
+        while True:
+            start_time = time.perf_counter()
+            for _ in range(number):
+                decode()
+            elapsed = time.perf_counter() - start_time
+            if elapsed >= min_time / 10:
+                break
+            number *= 10
+        number = max(int(number * min_time / elapsed), 1) if elapsed > 0 else number #type: ignore  # noqa E501
+        times = []
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                start_time = time.perf_counter()
+                for _ in range(number):
+                    decode()
+                times.append((time.perf_counter() - start_time) / number)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return times
+
+    def measure_allocations(self):
+        """Returns (peak bytes allocated while decoding, bytes and memory
+        blocks still held by the decoded object) of one decode, after a first
+        decode that fills the object pool"""
+        self.decode()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            start_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            start_blocks = sys.getallocatedblocks()
+            result = self.decode()
+            blocks = sys.getallocatedblocks() - start_blocks
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del result
+        return peak_bytes - start_bytes, current_bytes - start_bytes, blocks
+
+
+def build_cases(versions=None, sizes=None, decode_sections=None,
+                use_object_pool=False):
+    """Returns the DecoderCases of versions and sizes, default all"""
+    if versions is None:
+        versions = VERSIONS
+    if sizes is None:
+        sizes = list(SIZES)
+    cases = []
+    for version in versions:
+        for size in sizes:
+            generator = SyntheticFrameGenerator(version, **SIZES[size])
+            name = get_case_name(version, size)
+            cases.append(DecoderCase(name + "/frame", "frame", version, generator.build(1), decode_sections, use_object_pool)) #type: ignore  # noqa E501
+            cases.append(DecoderCase(name + "/modeldef", "modeldef", version, generator.build_model_def(), decode_sections, use_object_pool)) #type: ignore  # noqa E501
+    return cases
+
+
+def run_cases(cases, min_time=0.2, repeat=5):
+    """Checks and times every case.  Returns {case name: result}"""
+    results = {}
+    for case in cases:
+        error, sha1 = case.check()
+        result = {"kind": case.kind,
+                  "version": "%d.%d" % case.version,
+                  "packet_bytes": len(case.packet),
+                  "sha1": sha1}
+        if error is not None:
+            result["error"] = error
+            results[case.name] = result
+            continue
+        times = case.time_decode(min_time, repeat)
+        best = min(times)
+        peak_bytes, retained_bytes, retained_blocks = case.measure_allocations()
+        result["us_per_frame"] = best * 1000000.0
+        result["median_us_per_frame"] = statistics.median(times) * 1000000.0
+        result["frames_per_s"] = 1.0 / best if best > 0 else 0.0
+        result["alloc_peak_bytes"] = peak_bytes
+        result["alloc_retained_bytes"] = retained_bytes
+        result["alloc_retained_blocks"] = retained_blocks
+        results[case.name] = result
+    return results
+
+
+def compare(results, baseline, threshold=0.1):
+    """Returns the regressions of results against baseline as strings.
+    Cases missing from either side are not compared."""
+    regressions = []
+    for name, result in results.items():
+        if "error" in result:
+            regressions.append("%s: %s" % (name, result["error"]))
+            continue
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["sha1"] != base["sha1"]:
+            regressions.append("%s: decoded hash %s != baseline %s" % (name, result["sha1"], base["sha1"])) #type: ignore  # noqa E501
+        if result["frames_per_s"] < base["frames_per_s"] * (1.0 - threshold):
+            regressions.append("%s: %.0f frames/s < baseline %.0f" % (name, result["frames_per_s"], base["frames_per_s"])) #type: ignore  # noqa E501
+        if result["alloc_peak_bytes"] > base["alloc_peak_bytes"] * (1.0 + threshold): #type: ignore  # noqa E501
+            regressions.append("%s: %d peak bytes > baseline %d" % (name, result["alloc_peak_bytes"], base["alloc_peak_bytes"])) #type: ignore  # noqa E501
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print("%-22s %7s %10s %12s %10s %10s %8s" % ("case", "bytes", "us/frame", "frames/s", "peak B", "held B", "change")) #type: ignore  # noqa E501
+    for name, result in results.items():
+        if "error" in result:
+            print("%-22s %7d ERROR: %s" % (name, result["packet_bytes"], result["error"])) #type: ignore  # noqa E501
+            continue
+        change = ""
+        if (baseline is not None) and (name in baseline):
+            change = "%+.1f%%" % ((result["frames_per_s"] / baseline[name]["frames_per_s"] - 1.0) * 100.0) #type: ignore  # noqa E501
+        print("%-22s %7d %10.2f %12.0f %10d %10d %8s" % (name, result["packet_bytes"], result["us_per_frame"], result["frames_per_s"], result["alloc_peak_bytes"], result["alloc_retained_bytes"], change)) #type: ignore  # noqa E501
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark the NatNetClient frame and model definition decoders") #type: ignore  # noqa E501
+    parser.add_argument("--versions", nargs="*", default=None, help="NatNet versions, e.g. 3.1 4.1, default all") #type: ignore  # noqa E501
+    parser.add_argument("--sizes", nargs="*", default=None, choices=list(SIZES), help="packet sizes, default all") #type: ignore  # noqa E501
+    parser.add_argument("--decode-sections", nargs="*", default=None, help="NatNetClient.set_decode_sections, default all") #type: ignore  # noqa E501
+    parser.add_argument("--object-pool", action="store_true", help="decode with NatNetClient.set_use_object_pool") #type: ignore  # noqa E501
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing run") #type: ignore  # noqa E501
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per case, the fastest counts") #type: ignore  # noqa E501
+    parser.add_argument("--baseline", default=None, help="results of --save-baseline to compare with") #type: ignore  # noqa E501
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown and allocation growth, 0.1 is 10%%") #type: ignore  # noqa E501
+    parser.add_argument("--save-baseline", default=None, help="write the results as a baseline") #type: ignore  # noqa E501
+    parser.add_argument("--json", action="store_true", help="print the results as JSON") #type: ignore  # noqa E501
+    args = parser.parse_args()
+
+    versions = None
+    if args.versions is not None:
+        versions = [tuple(int(part) for part in version.split(".")[:2]) for version in args.versions] #type: ignore  # noqa E501
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+
+    cases = build_cases(versions, args.sizes, args.decode_sections, args.object_pool) #type: ignore  # noqa E501
+    results = run_cases(cases, args.min_time, max(args.repeat, 1))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results, baseline)
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump({"python": sys.version.split()[0],
+                       "decode_sections": args.decode_sections,
+                       "object_pool": args.object_pool,
+                       "results": results}, baseline_file, indent=2)
+
+    regressions = []
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+    else:
+        regressions = ["%s: %s" % (name, result["error"]) for name, result in results.items() if "error" in result] #type: ignore  # noqa E501
+    for regression in regressions:
+        print("REGRESSION: %s" % regression, file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
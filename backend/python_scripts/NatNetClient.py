@@ -21,34 +21,47 @@
 
 import sys #type: ignore  # noqa F401
 import socket
+import select
 import threading #type: ignore  # noqa F401
 import struct
 from threading import Thread
+import collections
 import copy
 import time
 import DataDescriptions
 import MoCapData
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Trace switches.  They are module globals read at call time: the trace
+# functions and the frame of data decoders test them on every call, before
+# building any trace text, so setting e.g. NatNetClient.TRACE_MF = True
+# takes effect from the next frame, and with the defaults decoding a frame
+# does no string formatting at all.
+TRACE = False
+TRACE_DD = False
+TRACE_MF = False
+
 
 def trace(*args):
-    # uncomment the one you want to use
-    # print("".join(map(str,args)))
-    pass
+    if TRACE:
+        print("".join(map(str, args)))
 
 
 # Used for Data Description functions
 def trace_dd(*args):
-    # uncomment the one you want to use
-
-    # print("".join(map(str,args)))
-    pass
+    if TRACE_DD:
+        print("".join(map(str, args)))
 
 
 # Used for MoCap Frame Data functions
 def trace_mf(*args):
-    # uncomment the one you want to use
-    # print("".join(map(str,args)))
-    pass
+    if TRACE_MF:
+        print("".join(map(str, args)))
 
 
 def get_message_id(data):
@@ -63,9 +76,375 @@ Quaternion = struct.Struct('<ffff')
 FloatValue = struct.Struct('<f')
 DoubleValue = struct.Struct('<d')
 NNIntValue = struct.Struct('<I')
+IntValue = struct.Struct('<i')
+LongValue = struct.Struct('<q')
+ShortValue = struct.Struct('<h')
 FPCalMatrixRow = struct.Struct('<ffffffffffff')
 FPCorners = struct.Struct('<ffffffffffff')
 
+# Fixed size frame of data records, read with a single unpack_from
+# id, pos, rot, mean marker error, param
+RigidBodyValues_3 = struct.Struct('<iffffffffh')
+# id, pos, size [, param [, residual]]
+LabeledMarkerValues_2_4 = struct.Struct('<iffff')
+LabeledMarkerValues_2_6 = struct.Struct('<iffffh')
+LabeledMarkerValues_3 = struct.Struct('<iffffhf')
+# timestamp, mid-exposure, data received and transmit stamps
+# [, precision timestamp secs and frac secs], param
+FrameSuffixValues_3 = struct.Struct('<dqqqh')
+FrameSuffixValues_4_1 = struct.Struct('<dqqqiih')
+
+# numpy layouts used when marker arrays are enabled (set_use_marker_arrays)
+if np is not None:
+    MarkerPosArray = np.dtype('<f4')
+    LabeledMarkerRecord_2_4 = np.dtype([('id', '<i4'), ('pos', '<f4', (3,)),
+                                        ('size', '<f4')])
+    LabeledMarkerRecord_2_6 = np.dtype([('id', '<i4'), ('pos', '<f4', (3,)),
+                                        ('size', '<f4'), ('param', '<i2')])
+    LabeledMarkerRecord_3 = np.dtype([('id', '<i4'), ('pos', '<f4', (3,)),
+                                      ('size', '<f4'), ('param', '<i2'),
+                                      ('residual', '<f4')])
+    RigidBodyRecord_3 = np.dtype([('id', '<i4'), ('pos', '<f4', (3,)),
+                                  ('rot', '<f4', (4,)), ('error', '<f4'),
+                                  ('param', '<i2')])
+
+
+def unpack_string(data, offset):
+    """Returns the null terminated string starting at offset and the offset
+    just past its terminator.  Only a short window is copied out of the
+    buffer at a time so long packets are not duplicated to find a name."""
+    end = len(data)
+    start = offset
+    while offset < end:
+        chunk = bytes(data[offset:min(offset + 256, end)])
+        index = chunk.find(b'\0')
+        if index >= 0:
+            offset += index
+            return bytes(data[start:offset]), offset + 1
+        offset += len(chunk)
+    return bytes(data[start:end]), end
+
+
+class FrameDecodePlan:
+    """Frame of data decoders and layouts for one NatNet bitstream version
+    and set of decode options.  NatNetClient builds it once when the version
+    is known so the decoders do not re-test the version for every packet."""
+    __slots__ = ('major', 'minor', 'has_byte_counts', 'has_skeletons',
+                 'has_assets', 'has_force_plates', 'has_devices',
+                 'unpack_rigid_body', 'rigid_body_record',
+                 'labeled_marker_values', 'labeled_marker_record',
+                 'unpack_frame_suffix', 'columnar_frames', 'sections')
+
+    def __init__(self, major, minor):
+        self.major = major
+        self.minor = minor
+        # Section counts are followed by a byte count (NatNet 4.1 and later)
+        self.has_byte_counts = ((major == 4) and (minor > 0)) or (major > 4)
+        self.has_skeletons = (major == 2 and minor > 0) or (major > 2)
+        self.has_assets = ((major >= 4) and (minor >= 1)) or (major > 4)
+        self.has_force_plates = (major == 2 and minor >= 9) or (major > 2)
+        self.has_devices = (major == 2 and minor >= 11) or (major > 2)
+        self.unpack_rigid_body = None
+        self.rigid_body_record = None
+        self.labeled_marker_values = None
+        self.labeled_marker_record = None
+        if major >= 3:
+            self.labeled_marker_values = LabeledMarkerValues_3
+        elif (major == 2 and minor >= 6):
+            self.labeled_marker_values = LabeledMarkerValues_2_6
+        elif (major == 2 and minor > 3):
+            self.labeled_marker_values = LabeledMarkerValues_2_4
+        if np is not None:
+            if major >= 3:
+                self.rigid_body_record = RigidBodyRecord_3
+                self.labeled_marker_record = LabeledMarkerRecord_3
+            elif (major == 2 and minor >= 6):
+                self.labeled_marker_record = LabeledMarkerRecord_2_6
+            elif (major == 2 and minor > 3):
+                self.labeled_marker_record = LabeledMarkerRecord_2_4
+        self.unpack_frame_suffix = None
+        # Decode into MoCapData.ColumnarFrame instead of MoCapData
+        self.columnar_frames = False
+        # (section name, section decoder, decode) in packet order
+        self.sections = []
+
+
+class FrameQueue:
+    """Bounded queue of decoded frames between the data thread and the
+    delivery thread that calls the frame listeners.  Items are
+    (frame_dict, offset, frame) tuples.  When the queue is full the
+    overflow policy decides what happens to a new frame:
+      DROP_OLDEST           the oldest queued frame is dropped
+      KEEP_LATEST_PER_BODY  the oldest queued frame is dropped, but its
+                            rigid bodies that are missing from the next
+                            frame are moved into it, so every rigid body
+                            keeps its latest pose (MoCapData objects or
+                            ColumnarFrame rows)
+      BLOCK                 the data thread waits for room"""
+
+    DROP_OLDEST = "drop_oldest"
+    KEEP_LATEST_PER_BODY = "keep_latest_per_body"
+    BLOCK = "block"
+    OVERFLOW_POLICIES = (DROP_OLDEST, KEEP_LATEST_PER_BODY, BLOCK)
+
+    def __init__(self, max_size, overflow_policy=DROP_OLDEST):
+        self.max_size = max(int(max_size), 1)
+        self.overflow_policy = overflow_policy
+        self.__items = collections.deque()
+        self.__condition = threading.Condition()
+        self.__closed = False
+        self.put_count = 0
+        self.delivered_count = 0
+        self.dropped_count = 0
+        self.carried_rigid_body_count = 0
+        self.blocked_count = 0
+        self.max_depth = 0
+
+    def put(self, item):
+        """Queues item and returns the items dropped to make room"""
+        dropped_list = []
+        with self.__condition:
+            if self.__closed:
+                return [item]
+            if len(self.__items) >= self.max_size:
+                if self.overflow_policy == self.BLOCK:
+                    self.blocked_count += 1
+                    while (len(self.__items) >= self.max_size) and not self.__closed: #type: ignore  # noqa E501
+                        self.__condition.wait()
+                    if self.__closed:
+                        return [item]
+                else:
+                    while len(self.__items) >= self.max_size:
+                        dropped = self.__items.popleft()
+                        if self.overflow_policy == self.KEEP_LATEST_PER_BODY:
+                            next_item = self.__items[0] if self.__items else item #type: ignore  # noqa E501
+                            self.__carry_rigid_bodies(dropped, next_item)
+                        dropped_list.append(dropped)
+                    self.dropped_count += len(dropped_list)
+            self.__items.append(item)
+            self.put_count += 1
+            self.max_depth = max(self.max_depth, len(self.__items))
+            self.__condition.notify_all()
+        return dropped_list
+
+    def get(self):
+        """Returns the oldest item, waiting for one.  Returns None once
+        the queue is closed and empty."""
+        with self.__condition:
+            while not self.__items and not self.__closed:
+                self.__condition.wait()
+            if not self.__items:
+                return None
+            item = self.__items.popleft()
+            self.delivered_count += 1
+            self.__condition.notify_all()
+            return item
+
+    def close(self):
+        """Wakes both threads; get returns the remaining items and then
+        None"""
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+    def get_counts(self):
+        with self.__condition:
+            return {"depth": len(self.__items), "max_depth": self.max_depth,
+                    "queued": self.put_count,
+                    "delivered": self.delivered_count,
+                    "dropped": self.dropped_count,
+                    "carried_rigid_bodies": self.carried_rigid_body_count,
+                    "blocked": self.blocked_count}
+
+    def __carry_rigid_bodies(self, dropped, next_item):
+        """Moves the rigid bodies of a dropped frame that the next frame
+        does not have into the next frame"""
+        if isinstance(dropped[2], MoCapData.ColumnarFrame):
+            self.__carry_rigid_body_rows(dropped, next_item)
+            return
+        dropped_rigid_body_data = getattr(dropped[2], "rigid_body_data", None)
+        next_rigid_body_data = getattr(next_item[2], "rigid_body_data", None)
+        if (dropped_rigid_body_data is None) or (next_rigid_body_data is None):
+            return
+        next_ids = set(rigid_body.id_num for rigid_body in next_rigid_body_data.rigid_body_list) #type: ignore  # noqa E501
+        carried_list = []
+        kept_list = []
+        for rigid_body in dropped_rigid_body_data.rigid_body_list:
+            if rigid_body.id_num in next_ids:
+                kept_list.append(rigid_body)
+            else:
+                carried_list.append(rigid_body)
+        if not carried_list:
+            return
+        # the dropped frame no longer owns them, so a frame pool does not
+        # recycle them with it
+        dropped_rigid_body_data.rigid_body_list = kept_list
+        next_rigid_body_data.rigid_body_list.extend(carried_list)
+        next_item[0]["rigid_body_count"] = len(next_rigid_body_data.rigid_body_list) #type: ignore  # noqa E501
+        self.carried_rigid_body_count += len(carried_list)
+
+    def __carry_rigid_body_rows(self, dropped, next_item):
+        """__carry_rigid_bodies for ColumnarFrames, appending the rows of
+        the missing rigid bodies to the next frame's arrays"""
+        dropped_frame = dropped[2]
+        next_frame = next_item[2]
+        if (dropped_frame.rigid_body_ids is None) or (next_frame.rigid_body_ids is None): #type: ignore  # noqa E501
+            return
+        carried = ~np.isin(dropped_frame.rigid_body_ids, next_frame.rigid_body_ids) #type: ignore  # noqa E501
+        carried_count = int(np.count_nonzero(carried))
+        if carried_count == 0:
+            return
+        next_frame.set_rigid_bodies(
+            np.concatenate((next_frame.rigid_body_ids, dropped_frame.rigid_body_ids[carried])), #type: ignore  # noqa E501
+            np.concatenate((next_frame.rigid_body_pos, dropped_frame.rigid_body_pos[carried])), #type: ignore  # noqa E501
+            np.concatenate((next_frame.rigid_body_rot, dropped_frame.rigid_body_rot[carried])), #type: ignore  # noqa E501
+            np.concatenate((next_frame.rigid_body_error, dropped_frame.rigid_body_error[carried])), #type: ignore  # noqa E501
+            np.concatenate((next_frame.rigid_body_valid, dropped_frame.rigid_body_valid[carried]))) #type: ignore  # noqa E501
+        next_item[0]["rigid_body_count"] = len(next_frame.rigid_body_ids)
+        self.carried_rigid_body_count += carried_count
+
+
+class FrameStats:
+    """Frame loss, jitter and latency of the frames of data received by a
+    NatNetClient, with rolling distributions over the last window frames.
+
+    inter_arrival  time between frames arriving at the client
+    decode         time spent in the frame decoder
+    listener       time spent calling the listeners on the data thread, or
+                   with a frame queue putting the frame in the queue
+    motive_latency camera mid-exposure to transmit inside Motive, from the
+                   frame suffix stamps and the server's clock frequency
+    transit        Motive transmit (or frame timestamp) to client arrival,
+                   relative to the fastest transit seen, because the Motive
+                   and client clocks are not synchronized
+    jitter is the RFC 3550 interarrival jitter against the Motive frame
+    timestamps.  Times are in milliseconds."""
+
+    # Upper bucket edges of the histograms in milliseconds; the last
+    # bucket counts everything above the last edge
+    HISTOGRAM_EDGES_MS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0,
+                          100.0, 250.0, 1000.0)
+    SERIES = ("inter_arrival", "decode", "listener", "motive_latency",
+              "transit")
+
+    def __init__(self, window=1000):
+        self.window = max(int(window), 1)
+        self.frame_count = 0
+        # frame numbers that never arrived
+        self.dropped_frame_count = 0
+        # times one or more frame numbers were skipped
+        self.gap_count = 0
+        # frames whose number did not increase
+        self.repeated_frame_count = 0
+        # frames too short for the decoded NatNet version, or otherwise
+        # undecodable
+        self.malformed_frame_count = 0
+        self.last_frame_number = None
+        self.jitter = 0.0
+        self.message_counts = {}
+        self.__last_arrival_time = None
+        self.__last_timestamp = None
+        self.__min_transit = None
+        self.__series = dict((name, collections.deque(maxlen=self.window)) for name in self.SERIES) #type: ignore  # noqa E501
+        self.__lock = threading.Lock()
+
+    def add_message(self, message_id):
+        with self.__lock:
+            self.message_counts[message_id] = self.message_counts.get(message_id, 0) + 1 #type: ignore  # noqa E501
+
+    def add_malformed_frame(self):
+        with self.__lock:
+            self.malformed_frame_count += 1
+
+    def add_listener_time(self, listener_time):
+        with self.__lock:
+            self.__series["listener"].append(listener_time * 1000.0)
+
+    def add_frame(self, frame, arrival_time, decode_time, clock_frequency=0):
+        """Records a MoCapData or ColumnarFrame that arrived at
+        arrival_time (time.perf_counter seconds)"""
+        frame_number = frame.prefix_data.frame_number
+        suffix_data = frame.suffix_data
+        timestamp = suffix_data.timestamp
+        with self.__lock:
+            series = self.__series
+            self.frame_count += 1
+            last_frame_number = self.last_frame_number
+            if last_frame_number is not None:
+                gap = frame_number - last_frame_number - 1
+                if gap > 0:
+                    self.dropped_frame_count += gap
+                    self.gap_count += 1
+                elif gap < 0:
+                    self.repeated_frame_count += 1
+                    # Motive restarted or looped playback; its clocks
+                    # restart too
+                    if frame_number < last_frame_number - 1:
+                        self.__min_transit = None
+                        self.__last_timestamp = None
+            self.last_frame_number = frame_number
+
+            if self.__last_arrival_time is not None:
+                inter_arrival = arrival_time - self.__last_arrival_time
+                series["inter_arrival"].append(inter_arrival * 1000.0)
+                if (self.__last_timestamp is not None) and (timestamp >= 0):
+                    difference = inter_arrival - (timestamp - self.__last_timestamp) #type: ignore  # noqa E501
+                    self.jitter += (abs(difference) - self.jitter) / 16.0
+            self.__last_arrival_time = arrival_time
+            if timestamp >= 0:
+                self.__last_timestamp = timestamp
+            series["decode"].append(decode_time * 1000.0)
+
+            sent_time = timestamp
+            if clock_frequency > 0:
+                stamp_transmit = suffix_data.stamp_transmit
+                stamp_camera_mid_exposure = suffix_data.stamp_camera_mid_exposure #type: ignore  # noqa E501
+                if stamp_transmit > 0:
+                    sent_time = stamp_transmit / clock_frequency
+                    if 0 < stamp_camera_mid_exposure <= stamp_transmit:
+                        series["motive_latency"].append((stamp_transmit - stamp_camera_mid_exposure) * 1000.0 / clock_frequency) #type: ignore  # noqa E501
+            if sent_time >= 0:
+                transit = arrival_time - sent_time
+                if (self.__min_transit is None) or (transit < self.__min_transit): #type: ignore  # noqa E501
+                    self.__min_transit = transit
+                series["transit"].append((transit - self.__min_transit) * 1000.0) #type: ignore  # noqa E501
+
+    def get_stats(self):
+        with self.__lock:
+            stats = {"frames": self.frame_count,
+                     "dropped_frames": self.dropped_frame_count,
+                     "frame_gaps": self.gap_count,
+                     "repeated_frames": self.repeated_frame_count,
+                     "malformed_frames": self.malformed_frame_count,
+                     "last_frame_number": self.last_frame_number,
+                     "jitter_ms": self.jitter * 1000.0,
+                     "message_counts": dict(self.message_counts)}
+            samples = dict((name, list(values)) for name, values in self.__series.items()) #type: ignore  # noqa E501
+        for name in self.SERIES:
+            stats[name + "_ms"] = self.__summarize(samples[name])
+        return stats
+
+    def __summarize(self, values):
+        """count, mean, min, max, percentiles and histogram of values"""
+        count = len(values)
+        if count == 0:
+            return {"count": 0}
+        values.sort()
+        histogram = [0] * (len(self.HISTOGRAM_EDGES_MS) + 1)
+        bucket = 0
+        for value in values:
+            while (bucket < len(self.HISTOGRAM_EDGES_MS)) and (value > self.HISTOGRAM_EDGES_MS[bucket]): #type: ignore  # noqa E501
+                bucket += 1
+            histogram[bucket] += 1
+        return {"count": count,
+                "mean": sum(values) / count,
+                "min": values[0],
+                "max": values[-1],
+                "p50": values[int(0.50 * (count - 1))],
+                "p95": values[int(0.95 * (count - 1))],
+                "p99": values[int(0.99 * (count - 1))],
+                "histogram": histogram}
+
 
 class NatNetClient:
     # print_level = 0 off
@@ -96,6 +475,12 @@ class NatNetClient:
         self.rigid_body_listener = None
         self.new_frame_listener = None
         self.new_frame_with_data_listener = None
+        # Receives a MoCapData.ColumnarFrame per frame when columnar frames
+        # are enabled with set_use_columnar_frames.
+        self.columnar_frame_listener = None
+        # Receives each NAT_RESPONSE from the server, as an int for 4 byte
+        # responses and as a str otherwise.
+        self.command_response_listener = None
 
         # Set Application Name
         self.__application_name = "Not Set"
@@ -125,6 +510,62 @@ class NatNetClient:
 
         self.stop_threads = False
 
+        # Maximum number of datagrams drained per wakeup of the data thread.
+        # 1 keeps the original one recvfrom per datagram loop.
+        self.receive_batch_size = 1
+
+        # Histogram of datagrams received per wakeup of the data thread
+        self.__receive_batch_counts = {}
+
+        # Set once NAT_SERVERINFO has been received
+        self.__server_info_event = threading.Event()
+
+        # [event, response, waiting, send time] for each command sent by
+        # send_command, in the order the commands were sent
+        self.__pending_responses = collections.deque()
+        self.__pending_responses_lock = threading.Lock()
+
+        # Frame of data sections decoded into MoCapData objects.
+        # None decodes every section.
+        self.decode_sections = None
+
+        # Decode marker sets, legacy markers and labeled markers into numpy
+        # arrays instead of per marker objects.
+        self.use_marker_arrays = False
+
+        # Decode frames into MoCapData.ColumnarFrame instead of MoCapData
+        self.use_columnar_frames = False
+
+        # Reuses rigid bodies and labeled markers between frames when set
+        # with set_use_object_pool
+        self.__frame_pool = None
+        self.__new_rigid_body = MoCapData.RigidBody
+        self.__new_labeled_marker = MoCapData.LabeledMarker
+
+        # FrameDecodePlan for the requested version and decode options.
+        # Replaced by a new plan, never changed in place, when either
+        # changes; each frame is decoded with the plan it started with.
+        self.__decode_plan = None
+
+        # Frames queued between the data thread and the delivery thread,
+        # set with set_frame_queue.  0 calls the listeners on the data
+        # thread.
+        self.frame_queue_size = 0
+        self.frame_queue_overflow_policy = FrameQueue.DROP_OLDEST
+        self.__frame_queue = None
+        self.delivery_thread = None
+
+        # FrameStats set with set_stats_window; None keeps no statistics
+        self.__frame_stats = None
+
+        # Ticks per second of the Motive high resolution clock used by the
+        # frame suffix stamps, from the server info.  0 when unknown.
+        self.__high_resolution_clock_frequency = 0
+
+        # flight_recorder.FlightRecorder of start_capture; None when not
+        # capturing
+        self.__capture = None
+
     # Client/server message ids
     NAT_CONNECT = 0
     NAT_SERVERINFO = 1
@@ -140,6 +581,15 @@ class NatNetClient:
     NAT_UNRECOGNIZED_REQUEST = 100
     NAT_UNDEFINED = 999999.9999
 
+    # Frame of data sections that can be passed to set_decode_sections
+    DECODE_SECTIONS = ("marker_sets", "legacy_markers", "rigid_bodies",
+                       "skeletons", "assets", "labeled_markers",
+                       "force_plates", "devices")
+
+    # Seconds after which a command that is no longer waited for gives up
+    # its place in the response order, in case its NAT_RESPONSE was lost
+    COMMAND_RESPONSE_EXPIRY = 5.0
+
     def set_client_address(self, local_ip_address):
         if not self.__is_locked:
             self.local_ip_address = local_ip_address
@@ -175,6 +625,7 @@ class NatNetClient:
                 self.__nat_net_requested_version[1] = minor
                 self.__nat_net_requested_version[2] = 0
                 self.__nat_net_requested_version[3] = 0
+                self.__build_decode_plan()
                 print("changing bitstream MAIN")
                 # get original output state
                 # print_results = self.get_print_results()
@@ -213,6 +664,231 @@ class NatNetClient:
     def get_print_level(self):
         return self.print_level
 
+    def set_receive_batch_size(self, batch_size=1):
+        """Sets how many pending datagrams the data thread drains into its
+        preallocated buffers before decoding them as one batch"""
+        if not self.__is_locked and (batch_size >= 1):
+            self.receive_batch_size = int(batch_size)
+        return self.receive_batch_size
+
+    def get_receive_batch_size(self):
+        return self.receive_batch_size
+
+    def get_receive_batch_counts(self):
+        """Returns {datagrams per wakeup: number of wakeups}"""
+        return dict(self.__receive_batch_counts)
+
+    def set_frame_queue(self, queue_size=0, overflow_policy=FrameQueue.DROP_OLDEST): #type: ignore  # noqa E501
+        """Decouples the listeners from the data thread.  The data thread
+        decodes each frame into a FrameQueue of queue_size frames and a
+        delivery thread calls rigid_body_listener, new_frame_listener,
+        new_frame_with_data_listener and columnar_frame_listener, so a slow
+        listener no longer stalls the socket.  overflow_policy is one of
+        FrameQueue.OVERFLOW_POLICIES.  rigid_body_listener is called with
+        the frame's rigid bodies and skeleton bones just before the frame
+        listeners.  Pooled frames are recycled after delivery.  0 calls the
+        listeners on the data thread.  Takes effect when run is called."""
+        if overflow_policy not in FrameQueue.OVERFLOW_POLICIES:
+            print("ERROR: Unknown frame queue overflow policy: %s" % overflow_policy) #type: ignore  # noqa E501
+        elif not self.__is_locked:
+            self.frame_queue_size = max(int(queue_size), 0)
+            self.frame_queue_overflow_policy = overflow_policy
+        return self.frame_queue_size
+
+    def get_frame_queue_size(self):
+        return self.frame_queue_size
+
+    def get_frame_queue_counts(self):
+        """Returns the counters of the frame queue (depth, max_depth,
+        queued, delivered, dropped, carried_rigid_bodies and blocked), or an
+        empty dict without a frame queue"""
+        if self.__frame_queue is None:
+            return {}
+        return self.__frame_queue.get_counts()
+
+    def set_stats_window(self, window=0):
+        """Keeps FrameStats over the last window frames for get_stats.
+        0 turns the statistics off."""
+        if window > 0:
+            self.__frame_stats = FrameStats(window)
+        else:
+            self.__frame_stats = None
+        return window
+
+    def get_stats(self):
+        """Returns frame loss, jitter, decode time and latency statistics
+        (see FrameStats) with the receive batch and frame queue counters.
+        Empty without set_stats_window."""
+        frame_stats = self.__frame_stats
+        if frame_stats is None:
+            return {}
+        stats = frame_stats.get_stats()
+        stats["receive_batch_counts"] = self.get_receive_batch_counts()
+        stats["frame_queue"] = self.get_frame_queue_counts()
+        return stats
+
+    def start_capture(self, path):
+        """Logs every message the client receives from now on, with its
+        receive time, as raw datagram chunks of a flight log at path (see
+        flight_recorder.py) that NatNetReplay.py can replay.  The capture
+        starts with the server info of the current connection, so it
+        replays with the same NatNet version."""
+        if self.__capture is not None:
+            print("ERROR: already capturing to %s" % self.__capture.path)
+            return False
+        from flight_recorder import FlightRecorder
+        capture = FlightRecorder(path)
+        if self.__server_info_event.is_set():
+            capture.record_datagram(self.__pack_server_info(), time.time())
+        self.__capture = capture
+        return True
+
+    def stop_capture(self):
+        """Closes the capture of start_capture and returns its counts"""
+        capture = self.__capture
+        if capture is None:
+            return {}
+        self.__capture = None
+        capture.close()
+        return capture.get_counts()
+
+    def __pack_server_info(self):
+        """NAT_SERVERINFO message of the current connection, with the
+        NatNet version the client decodes"""
+        body = self.__application_name.encode('utf-8')[:255].ljust(256, b'\0') #type: ignore  # noqa E501
+        body += bytes(self.__server_version)
+        body += bytes([self.get_major(), self.get_minor(), 0, 0])
+        body += struct.pack('<Q', self.__high_resolution_clock_frequency)
+        return struct.pack('<hH', self.NAT_SERVERINFO, len(body)) + body
+
+    def set_decode_sections(self, sections=None):
+        """Limits frame decoding to the named DECODE_SECTIONS.  Sections that
+        are not named are left as None in the MoCapData, and on NatNet 4.1
+        and later they are stepped over by their byte count without being
+        decoded.  Older streams have no byte counts, so unselected sections
+        are still walked, but their rigid bodies and skeleton bones do not
+        reach rigid_body_listener either.  None decodes every section."""
+        if sections is None:
+            self.decode_sections = None
+            self.__build_decode_plan()
+            return self.decode_sections
+        sections = frozenset(sections)
+        unknown_sections = sections.difference(self.DECODE_SECTIONS)
+        if unknown_sections:
+            print("ERROR: Unknown decode sections: %s" % ", ".join(sorted(unknown_sections))) #type: ignore  # noqa E501
+        else:
+            self.decode_sections = sections
+            self.__build_decode_plan()
+        return self.decode_sections
+
+    def get_decode_sections(self):
+        return self.decode_sections
+
+    def set_use_marker_arrays(self, use_marker_arrays):
+        """Decodes marker sets, legacy markers and labeled markers into
+        MarkerSetArrayData, LegacyMarkerArrayData and LabeledMarkerArrayData.
+        Requires numpy."""
+        if use_marker_arrays and (np is None):
+            print("ERROR: numpy is required for marker arrays")
+        else:
+            self.use_marker_arrays = bool(use_marker_arrays)
+            self.__build_decode_plan()
+        return self.use_marker_arrays
+
+    def set_use_object_pool(self, use_object_pool):
+        """Recycles the rigid bodies and labeled markers of each MoCapData
+        frame once its listeners return.  Listeners must not keep frames,
+        rigid bodies or labeled markers past the callback."""
+        if use_object_pool:
+            self.__frame_pool = MoCapData.FramePool()
+            self.__new_rigid_body = self.__frame_pool.new_rigid_body
+            self.__new_labeled_marker = self.__frame_pool.new_labeled_marker
+        else:
+            self.__frame_pool = None
+            self.__new_rigid_body = MoCapData.RigidBody
+            self.__new_labeled_marker = MoCapData.LabeledMarker
+        return self.__frame_pool is not None
+
+    def set_use_columnar_frames(self, use_columnar_frames):
+        """Decodes each frame into a MoCapData.ColumnarFrame and passes it
+        to columnar_frame_listener.  new_frame_listener and
+        rigid_body_listener are still called, new_frame_with_data_listener
+        is not.  Requires numpy."""
+        if use_columnar_frames and (np is None):
+            print("ERROR: numpy is required for columnar frames")
+        else:
+            self.use_columnar_frames = bool(use_columnar_frames)
+            self.__build_decode_plan()
+        return self.use_columnar_frames
+
+    def __get_decode_plan(self):
+        plan = self.__decode_plan
+        if plan is None:
+            plan = self.__build_decode_plan()
+        return plan
+
+    def __build_decode_plan(self):
+        """Builds the FrameDecodePlan for the requested NatNet version and
+        the current decode options, and swaps it in with one assignment so
+        a frame being decoded keeps the plan it started with"""
+        major = self.get_major()
+        minor = self.get_minor()
+        plan = FrameDecodePlan(major, minor)
+        plan.columnar_frames = self.use_columnar_frames
+
+        if (major >= 3):
+            plan.unpack_rigid_body = self.__unpack_rigid_body_3_and_above
+        elif (major == 2 and minor >= 6):
+            plan.unpack_rigid_body = self.__unpack_rigid_body_2_6_to_3
+        else:
+            def unpack_rigid_body(data, offset, rb_num):
+                return self.__unpack_rigid_body_pre_2_6(data, offset, major, rb_num) #type: ignore  # noqa E501
+            plan.unpack_rigid_body = unpack_rigid_body
+
+        if (major == 0):
+            plan.unpack_frame_suffix = self.__unpack_frame_suffix_data_0_case
+        elif (major < 2 or (major <= 2 and minor < 7)):
+            plan.unpack_frame_suffix = self.__unpack_frame_suffix_data_pre_2_7
+        elif (major == 2 and minor >= 7 and major < 3):
+            plan.unpack_frame_suffix = self.__unpack_frame_suffix_data_2_7_to_3
+        elif ((major == 4 and minor > 0) or major > 4):
+            plan.unpack_frame_suffix = self.__unpack_frame_suffix_data_4_1_to_present #type: ignore  # noqa E501
+        else:
+            plan.unpack_frame_suffix = self.__unpack_frame_suffix_data_3_to_4
+
+        if plan.columnar_frames:
+            sections = [("marker_sets", self.__unpack_marker_set_array_data),
+                        ("legacy_markers", self.__unpack_legacy_other_markers_array), #type: ignore  # noqa E501
+                        ("rigid_bodies", self.__unpack_rigid_body_array_data), #type: ignore  # noqa E501
+                        ("skeletons", self.__unpack_skeleton_data)]
+        elif self.use_marker_arrays:
+            sections = [("marker_sets", self.__unpack_marker_set_array_data),
+                        ("legacy_markers", self.__unpack_legacy_other_markers_array), #type: ignore  # noqa E501
+                        ("rigid_bodies", self.__unpack_rigid_body_data),
+                        ("skeletons", self.__unpack_skeleton_data)]
+        else:
+            sections = [("marker_sets", self.__unpack_marker_set_data),
+                        ("legacy_markers", self.__unpack_legacy_other_markers), #type: ignore  # noqa E501
+                        ("rigid_bodies", self.__unpack_rigid_body_data),
+                        ("skeletons", self.__unpack_skeleton_data)]
+        # Assets (Motive 3.1/NatNet 4.1 and greater)
+        if plan.has_assets:
+            sections.append(("assets", self.__unpack_asset_data))
+        if plan.columnar_frames or self.use_marker_arrays:
+            sections.append(("labeled_markers", self.__unpack_labeled_marker_array_data)) #type: ignore  # noqa E501
+        else:
+            sections.append(("labeled_markers", self.__unpack_labeled_marker_data)) #type: ignore  # noqa E501
+        sections.append(("force_plates", self.__unpack_force_plate_data))
+        sections.append(("devices", self.__unpack_device_data))
+
+        decode_sections = self.decode_sections
+        for name, unpack_function in sections:
+            decode = (decode_sections is None) or (name in decode_sections)
+            plan.sections.append((name, unpack_function, decode))
+
+        self.__decode_plan = plan
+        return plan
+
     def connected(self):
         ret_value = True
         # check sockets
@@ -290,44 +966,36 @@ class NatNetClient:
                 sys.exit(1)
         return result
 
-    def __unpack_rigid_body_3_and_above(self, data, rb_num):
-        """Calculates offset for NatNet 3 and above for rigid body
-        unpacking"""
-        offset = 0
-
-        # ID (4 bytes)
-        new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
-        offset += 4
-
-        trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
-
-        # Position and orientation
-        pos = Vector3.unpack(data[offset:offset+12])
-        offset += 12
-        trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
-
-        rot = Quaternion.unpack(data[offset:offset+16])
-        offset += 16
-        trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
-
-        rigid_body = MoCapData.RigidBody(new_id, pos, rot)
-
-        # Send information to any listener.
-        if self.rigid_body_listener is not None:
-            self.rigid_body_listener(new_id, pos, rot)
-
-        marker_error, = FloatValue.unpack(data[offset:offset+4])
-        offset += 4
-        trace_mf("\tMean Marker Error: %3.2f" % marker_error)
+    def __unpack_rigid_body_3_and_above(self, data, offset, rb_num):
+        """Unpacks a NatNet 3 and above rigid body starting at offset and
+        returns the offset just past it"""
+        # ID (4 bytes), position (12 bytes), orientation (16 bytes),
+        # mean marker error (4 bytes) and param (2 bytes)
+        values = RigidBodyValues_3.unpack_from(data, offset)
+        offset += RigidBodyValues_3.size
+        new_id = values[0]
+        pos = values[1:4]
+        rot = values[4:8]
+        marker_error = values[8]
+        param = values[9]
+
+        if TRACE_MF:
+            trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
+            trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+            trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
+
+        rigid_body = self.__new_rigid_body(new_id, pos, rot)
+
+        if TRACE_MF:
+            trace_mf("\tMean Marker Error: %3.2f" % marker_error)
         rigid_body.error = marker_error
 
-        param, = struct.unpack('h', data[offset:offset+2])
         tracking_valid = (param & 0x01) != 0
-        offset += 2
         is_valid_str = 'False'
         if tracking_valid:
             is_valid_str = 'True'
-        trace_mf("\tTracking Valid: %s" % is_valid_str)
+        if TRACE_MF:
+            trace_mf("\tTracking Valid: %s" % is_valid_str)
         if tracking_valid:
             rigid_body.tracking_valid = True
         else:
@@ -335,36 +1003,34 @@ class NatNetClient:
 
         return offset, rigid_body
 
-    def __unpack_rigid_body_2_6_to_3(self, data, rb_num):
-        """Calculates offset starting at NatNet 2.6 and going
+    def __unpack_rigid_body_2_6_to_3(self, data, offset, rb_num):
+        """Unpacks a rigid body starting at NatNet 2.6 and going
         to (but not inclusive of 3)"""
-        offset = 0
-
         # ID (4 bytes)
-        new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        new_id, = IntValue.unpack_from(data, offset)
         offset += 4
 
-        trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
+        if TRACE_MF:
+            trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
 
         # Position and orientation
-        pos = Vector3.unpack(data[offset:offset+12])
+        pos = Vector3.unpack_from(data, offset)
         offset += 12
-        trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
 
-        rot = Quaternion.unpack(data[offset:offset+16])
+        rot = Quaternion.unpack_from(data, offset)
         offset += 16
-        trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
-
-        rigid_body = MoCapData.RigidBody(new_id, pos, rot)
+        if TRACE_MF:
+            trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
 
-        # Send information to any listener.
-        if self.rigid_body_listener is not None:
-            self.rigid_body_listener(new_id, pos, rot)
+        rigid_body = self.__new_rigid_body(new_id, pos, rot)
 
-        marker_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        marker_count, = IntValue.unpack_from(data, offset)
         offset += 4
         marker_count_range = range(0, marker_count)
-        trace_mf("\tMarker Count:", marker_count)
+        if TRACE_MF:
+            trace_mf("\tMarker Count:", marker_count)
 
         rb_marker_list = []
         for i in marker_count_range:
@@ -372,74 +1038,77 @@ class NatNetClient:
 
         # Marker positions
         for i in marker_count_range:
-            pos = Vector3.unpack(data[offset:offset+12])
+            pos = Vector3.unpack_from(data, offset)
             offset += 12
-            trace_mf("\tMarker", i, ":", pos[0], ",", pos[1], ",", pos[2])
+            if TRACE_MF:
+                trace_mf("\tMarker", i, ":", pos[0], ",", pos[1], ",", pos[2])
             rb_marker_list[i].pos = pos
 
         for i in marker_count_range:
-            new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+            new_id, = IntValue.unpack_from(data, offset)
             offset += 4
-            trace_mf("\tMarker ID", i, ":", new_id)
-            rb_marker_list[i].id = new_id
+            if TRACE_MF:
+                trace_mf("\tMarker ID", i, ":", new_id)
+            rb_marker_list[i].id_num = new_id
 
         # Marker sizes
         for i in marker_count_range:
-            size = FloatValue.unpack(data[offset:offset+4])
+            size, = FloatValue.unpack_from(data, offset)
             offset += 4
-            trace_mf("\tMarker Size", i, ":", size[0])
+            if TRACE_MF:
+                trace_mf("\tMarker Size", i, ":", size)
             rb_marker_list[i].size = size
 
         for i in marker_count_range:
             rigid_body.add_rigid_body_marker(rb_marker_list[i])
 
-        marker_error, = FloatValue.unpack(data[offset:offset+4])
+        marker_error, = FloatValue.unpack_from(data, offset)
         offset += 4
-        trace_mf("\tMean Marker Error: %3.2f" % marker_error)
+        if TRACE_MF:
+            trace_mf("\tMean Marker Error: %3.2f" % marker_error)
         rigid_body.error = marker_error
 
-        param, = struct.unpack('h', data[offset:offset+2])
+        param, = ShortValue.unpack_from(data, offset)
         tracking_valid = (param & 0x01) != 0
         offset += 2
         is_valid_str = 'False'
         if tracking_valid:
             is_valid_str = 'True'
-        trace_mf("\tTracking Valid: %s" % is_valid_str)
+        if TRACE_MF:
+            trace_mf("\tTracking Valid: %s" % is_valid_str)
         if tracking_valid:
             rigid_body.tracking_valid = True
         else:
             rigid_body.tracking_valid = False
         return offset, rigid_body
 
-    def __unpack_rigid_body_pre_2_6(self, data, major, rb_num):
-        """Calculates offset for anything below NatNet 2.6"""
-        offset = 0
-
+    def __unpack_rigid_body_pre_2_6(self, data, offset, major, rb_num):
+        """Unpacks a rigid body for anything below NatNet 2.6"""
         # ID (4 bytes)
-        new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        new_id, = IntValue.unpack_from(data, offset)
         offset += 4
 
-        trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
+        if TRACE_MF:
+            trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
 
         # Position and orientation
-        pos = Vector3.unpack(data[offset:offset+12])
+        pos = Vector3.unpack_from(data, offset)
         offset += 12
-        trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
 
-        rot = Quaternion.unpack(data[offset:offset+16])
+        rot = Quaternion.unpack_from(data, offset)
         offset += 16
-        trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
 
-        rigid_body = MoCapData.RigidBody(new_id, pos, rot)
-
-        # Send information to any listener.
-        if self.rigid_body_listener is not None:
-            self.rigid_body_listener(new_id, pos, rot)
+        rigid_body = self.__new_rigid_body(new_id, pos, rot)
 
-        marker_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        marker_count, = IntValue.unpack_from(data, offset)
         offset += 4
         marker_count_range = range(0, marker_count)
-        trace_mf("\tMarker Count:", marker_count)
+        if TRACE_MF:
+            trace_mf("\tMarker Count:", marker_count)
 
         rb_marker_list = []
         for i in marker_count_range:
@@ -447,195 +1116,203 @@ class NatNetClient:
 
         # Marker positions
         for i in marker_count_range:
-            pos = Vector3.unpack(data[offset:offset+12])
+            pos = Vector3.unpack_from(data, offset)
             offset += 12
-            trace_mf("\tMarker", i, ":", pos[0], ",", pos[1], ",", pos[2])
+            if TRACE_MF:
+                trace_mf("\tMarker", i, ":", pos[0], ",", pos[1], ",", pos[2])
             rb_marker_list[i].pos = pos
 
         if major >= 2:
             # Marker ID's
             for i in marker_count_range:
-                new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+                new_id, = IntValue.unpack_from(data, offset)
                 offset += 4
-                trace_mf("\tMarker ID", i, ":", new_id)
-                rb_marker_list[i].id = new_id
+                if TRACE_MF:
+                    trace_mf("\tMarker ID", i, ":", new_id)
+                rb_marker_list[i].id_num = new_id
 
             # Marker sizes
             for i in marker_count_range:
-                size = FloatValue.unpack(data[offset:offset+4])
+                size, = FloatValue.unpack_from(data, offset)
                 offset += 4
-                trace_mf("\tMarker Size", i, ":", size[0])
+                if TRACE_MF:
+                    trace_mf("\tMarker Size", i, ":", size)
                 rb_marker_list[i].size = size
 
             for i in marker_count_range:
                 rigid_body.add_rigid_body_marker(rb_marker_list[i])
 
             if major >= 2:
-                marker_error, = FloatValue.unpack(data[offset:offset+4])
+                marker_error, = FloatValue.unpack_from(data, offset)
                 offset += 4
-                trace_mf("\tMean Marker Error: %3.2f" % marker_error)
+                if TRACE_MF:
+                    trace_mf("\tMean Marker Error: %3.2f" % marker_error)
                 rigid_body.error = marker_error
         return offset, rigid_body
 
-    def __unpack_rigid_body_0_case(self, data, rb_num):
-        """Calculates offset for case where major version is 0"""
-        offset = 0
-
+    def __unpack_rigid_body_0_case(self, data, offset, rb_num):
+        """Unpacks a rigid body for the case where major version is 0"""
         # ID (4 bytes)
-        new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        new_id, = IntValue.unpack_from(data, offset)
         offset += 4
 
-        trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
+        if TRACE_MF:
+            trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
 
         # Position and orientation
-        pos = Vector3.unpack(data[offset:offset+12])
+        pos = Vector3.unpack_from(data, offset)
         offset += 12
-        trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
 
-        rot = Quaternion.unpack(data[offset:offset+16])
+        rot = Quaternion.unpack_from(data, offset)
         offset += 16
-        trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
-
-        rigid_body = MoCapData.RigidBody(new_id, pos, rot)
-
-        # Send information to any listener.
-        if self.rigid_body_listener is not None:
-            self.rigid_body_listener(new_id, pos, rot)
-        return offset, rigid_body
+        if TRACE_MF:
+            trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
 
-    def __unpack_rigid_body(self, data, major, minor, rb_num):
-        if (major >= 3):
-            offset, rigid_body = self.__unpack_rigid_body_3_and_above(data, rb_num) #type: ignore  # noqa E501
-        elif (major == 2 and minor >= 6):
-            offset, rigid_body = self.__unpack_rigid_body_2_6_to_3(data, rb_num) #type: ignore  # noqa E501
-        elif (major < 2 or (major == 2 and minor < 6)):
-            offset, rigid_body = self.__unpack_rigid_body_pre_2_6(data, major, rb_num) #type: ignore  # noqa E501
-        elif (major == 0):
-            offset, rigid_body = self.__unpack_rigid_body_0_case(data, rb_num)
-        else:
-            pass
+        rigid_body = self.__new_rigid_body(new_id, pos, rot)
         return offset, rigid_body
 
     # Unpack a skeleton object from a data packet
-    def __unpack_skeleton(self, data, major, minor, skeleton_num=0):
-        offset = 0
-        new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+    def __unpack_skeleton(self, data, offset, major, minor, plan, skeleton_num=0):
+        new_id, = IntValue.unpack_from(data, offset)
         offset += 4
-        trace_mf("Skeleton %3.1d ID: %3.1d" % (skeleton_num, new_id))
+        if TRACE_MF:
+            trace_mf("Skeleton %3.1d ID: %3.1d" % (skeleton_num, new_id))
         skeleton = MoCapData.Skeleton(new_id)
 
-        rigid_body_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        rigid_body_count, = IntValue.unpack_from(data, offset)
         offset += 4
-        trace_mf("Rigid Body Count: %3.1d" % rigid_body_count)
+        if TRACE_MF:
+            trace_mf("Rigid Body Count: %3.1d" % rigid_body_count)
         if (rigid_body_count > 0):
+            unpack_rigid_body = plan.unpack_rigid_body
             for rb_num in range(0, rigid_body_count):
-                offset_tmp, rigid_body = self.__unpack_rigid_body(data[offset:], major, minor, rb_num) #type: ignore  # noqa E501
+                offset, rigid_body = unpack_rigid_body(data, offset, rb_num)
                 skeleton.add_rigid_body(rigid_body)
-                offset += offset_tmp
 
         return offset, skeleton
 
-    def __unpack_asset(self, data, major, minor, asset_num=0):
-        offset = 0
-        trace_dd("\tAsset       : %d" % (asset_num))
+    def __unpack_asset(self, data, offset, major, minor, asset_num=0):
+        if TRACE_DD:
+            trace_dd("\tAsset       : %d" % (asset_num))
         # Asset ID 4 bytes
-        new_id = int.from_bytes(data[offset:offset+4], 'little',  signed=True)
+        new_id, = IntValue.unpack_from(data, offset)
         offset += 4
         asset = MoCapData.Asset()
-        trace_dd("\tAsset ID    : %d" % (new_id))
+        if TRACE_DD:
+            trace_dd("\tAsset ID    : %d" % (new_id))
         asset.set_id(new_id)
         # # of RigidBodies
-        numRBs = int.from_bytes(data[offset:offset+4], 'little',  signed=True)
+        numRBs, = IntValue.unpack_from(data, offset)
         offset += 4
-        trace_dd("\tRigid Bodies: %d" % (numRBs))
-        offset1 = 0
+        if TRACE_DD:
+            trace_dd("\tRigid Bodies: %d" % (numRBs))
         for rb_num in range(numRBs):
             # # of RigidBodies
-            offset1, rigid_body = self.__unpack_asset_rigid_body_data(data[offset:], major, minor) #type: ignore  # noqa E501
-            offset += offset1
+            offset, rigid_body = self.__unpack_asset_rigid_body_data(data, offset, major, minor) #type: ignore  # noqa E501
             rigid_body.rb_num = rb_num
             asset.add_rigid_body(rigid_body)
 
         # # of Markers
-        numMarkers = int.from_bytes(data[offset:offset+4], 'little', signed=True) #type: ignore  # noqa E501
+        numMarkers, = IntValue.unpack_from(data, offset)
         offset += 4
-        trace_dd("\tMarkers     : %d" % (numMarkers))
+        if TRACE_DD:
+            trace_dd("\tMarkers     : %d" % (numMarkers))
 
         for marker_num in range(numMarkers):
             # # of Markers
-            offset1, marker = self.__unpack_asset_marker_data(data[offset:], major, minor) #type: ignore  # noqa E501
-            offset += offset1
+            offset, marker = self.__unpack_asset_marker_data(data, offset, major, minor) #type: ignore  # noqa E501
             marker.marker_num = marker_num
             asset.add_marker(marker)
 
         return offset, asset
 
 # Unpack Mocap Data Functions
-
-    def __unpack_frame_prefix_data(self, data):
-        offset = 0
+# All of the frame of data functions below read from one buffer using
+# absolute offsets and return the offset just past what they consumed, so
+# the remainder of the packet is never sliced or copied.
+
+    def __unpack_section(self, name, unpack_function, decode, data, offset, packet_size, major, minor, plan): #type: ignore  # noqa E501
+        """Unpacks one frame section, or returns None for it when it is not
+        in decode_sections"""
+        if decode:
+            return unpack_function(data, offset, packet_size, major, minor, plan)
+
+        if plan.has_byte_counts:
+            # count (4 bytes) and byte count (4 bytes) lead the section
+            count, = IntValue.unpack_from(data, offset)
+            offset, sizeInBytes = self.__unpack_data_size(data, offset + 4, major, minor, plan) #type: ignore  # noqa E501
+            if TRACE_MF:
+                trace_mf("Skipped %s: %3.1d in %3.1d bytes" % (name, count, sizeInBytes)) #type: ignore  # noqa E501
+            return offset + sizeInBytes, None
+
+        # Older streams carry no byte counts so the section has to be walked
+        offset, section_data = unpack_function(data, offset, packet_size, major, minor, plan) #type: ignore  # noqa E501
+        return offset, None
+
+    def __unpack_frame_prefix_data(self, data, offset):
         # Frame number (4 bytes)
-        frame_number = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        frame_number, = IntValue.unpack_from(data, offset)
         offset += 4
-        trace_mf("Frame #: %3.1d" % frame_number)
+        if TRACE_MF:
+            trace_mf("Frame #: %3.1d" % frame_number)
         frame_prefix_data = MoCapData.FramePrefixData(frame_number)
         return offset, frame_prefix_data
 
-    def __unpack_data_size(self, data, major, minor):
+    def __unpack_data_size(self, data, offset, major, minor, plan):
         sizeInBytes = 0
-        offset = 0
 
-        if (((major == 4) and (minor > 0)) or (major > 4)):
-            sizeInBytes = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        if plan.has_byte_counts:
+            sizeInBytes, = IntValue.unpack_from(data, offset)
             offset += 4
-            trace_mf("Byte Count: %3.1d" % sizeInBytes)
+            if TRACE_MF:
+                trace_mf("Byte Count: %3.1d" % sizeInBytes)
 
         return offset, sizeInBytes
 
-    def __unpack_legacy_other_markers(self, data, packet_size, major, minor):
-        offset = 0
-
+    def __unpack_legacy_other_markers(self, data, offset, packet_size, major, minor, plan): #type: ignore  # noqa E501
         # Markerset count (4 bytes)
-        other_marker_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        other_marker_count, = IntValue.unpack_from(data, offset)
         offset += 4
-        trace_mf("Other Marker Count:", other_marker_count)
+        if TRACE_MF:
+            trace_mf("Other Marker Count:", other_marker_count)
 
         # get data size (4 bytes)
-        offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
-        offset += offset_tmp
+        offset, unpackedDataSize = self.__unpack_data_size(data, offset, major, minor, plan) #type: ignore  # noqa E501
 
         other_marker_data = MoCapData.LegacyMarkerData()
         if (other_marker_count > 0):
             # get legacy_marker positions
             # legacy_marker_data
             for j in range(0, other_marker_count):
-                pos = Vector3.unpack(data[offset:offset+12])
+                pos = Vector3.unpack_from(data, offset)
                 offset += 12
-                trace_mf("\tMarker %3.1d: [x=%3.2f,y=%3.2f,z=%3.2f]" % (j, pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+                if TRACE_MF:
+                    trace_mf("\tMarker %3.1d: [x=%3.2f,y=%3.2f,z=%3.2f]" % (j, pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
                 other_marker_data.add_pos(pos)
         return offset, other_marker_data
 
-    def __unpack_marker_set_data(self, data, packet_size, major, minor):
+    def __unpack_marker_set_data(self, data, offset, packet_size, major, minor, plan):
         marker_set_data = MoCapData.MarkerSetData()
-        offset = 0
         # Markerset count (4 bytes)
-        marker_set_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501s
+        marker_set_count, = IntValue.unpack_from(data, offset)
         offset += 4
-        trace_mf("Markerset Count:", marker_set_count)
+        if TRACE_MF:
+            trace_mf("Markerset Count:", marker_set_count)
 
         # get data size (4 bytes)
-        offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
-        offset += offset_tmp
+        offset, unpackedDataSize = self.__unpack_data_size(data, offset, major, minor, plan) #type: ignore  # noqa E501
 
         for i in range(0, marker_set_count):
             marker_data = MoCapData.MarkerData()
             # Model name
-            model_name, separator, remainder = bytes(data[offset:]).partition(b'\0') #type: ignore  # noqa E501
-            offset += len(model_name) + 1
-            trace_mf("Model Name     : ", model_name.decode('utf-8'))
+            model_name, offset = unpack_string(data, offset)
+            if TRACE_MF:
+                trace_mf("Model Name     : ", model_name.decode('utf-8'))
             marker_data.set_model_name(model_name)
             # Marker count (4 bytes)
-            marker_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+            marker_count, = IntValue.unpack_from(data, offset)
             offset += 4
             if (marker_count < 0):
                 print("WARNING: Early return.  Invalid marker count")
@@ -646,67 +1323,66 @@ class NatNetClient:
                 offset = len(data)
                 return offset, marker_set_data
 
-            trace_mf("Marker Count   : ", marker_count)
+            if TRACE_MF:
+                trace_mf("Marker Count   : ", marker_count)
             for j in range(0, marker_count):
                 if (len(data) < (offset+12)):
                     print("WARNING: Early return.  Out of data at marker ", j, " of ", marker_count) #type: ignore  # noqa E501
                     offset = len(data)
                     return offset, marker_set_data
                     break
-                pos = Vector3.unpack(data[offset:offset+12])
+                pos = Vector3.unpack_from(data, offset)
                 offset += 12
-                trace_mf("\tMarker %3.1d: [x=%3.2f,y=%3.2f,z=%3.2f]" % (j, pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+                if TRACE_MF:
+                    trace_mf("\tMarker %3.1d: [x=%3.2f,y=%3.2f,z=%3.2f]" % (j, pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
                 marker_data.add_pos(pos)
             marker_set_data.add_marker_data(marker_data)
 
         # Unlabeled markers count (4 bytes)
-        # unlabeled_markers_count = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
+        # unlabeled_markers_count, = IntValue.unpack_from(data, offset)
         # offset += 4
         # trace_mf("Unlabeled Marker Count:", unlabeled_markers_count)
 
         # for i in range(0, unlabeled_markers_count):
-        #    pos = Vector3.unpack(data[offset:offset+12])
+        #    pos = Vector3.unpack_from(data, offset)
         #    offset += 12
         #    trace_mf("\tMarker %3.1d: [%3.2f,%3.2f,%3.2f]" % (i, pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
         #    marker_set_data.add_unlabeled_marker(pos)
         return offset, marker_set_data
 
-    def __unpack_rigid_body_data(self, data, packet_size, major, minor):
+    def __unpack_rigid_body_data(self, data, offset, packet_size, major, minor, plan):
         rigid_body_data = MoCapData.RigidBodyData()
-        offset = 0
         # Rigid body count (4 bytes)
-        rigid_body_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        rigid_body_count, = IntValue.unpack_from(data, offset)
         offset += 4
-        trace_mf("Rigid Body Count:", rigid_body_count)
+        if TRACE_MF:
+            trace_mf("Rigid Body Count:", rigid_body_count)
 
         # get data size (4 bytes)
-        offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
-        offset += offset_tmp
+        offset, unpackedDataSize = self.__unpack_data_size(data, offset, major, minor, plan) #type: ignore  # noqa E501
 
+        unpack_rigid_body = plan.unpack_rigid_body
         for i in range(0, rigid_body_count):
-            offset_tmp, rigid_body = self.__unpack_rigid_body(data[offset:], major, minor, i) #type: ignore  # noqa E501
-            offset += offset_tmp
+            offset, rigid_body = unpack_rigid_body(data, offset, i)
             rigid_body_data.add_rigid_body(rigid_body)
 
         return offset, rigid_body_data
 
-    def __unpack_skeleton_data(self, data, packet_size, major, minor):
+    def __unpack_skeleton_data(self, data, offset, packet_size, major, minor, plan):
         skeleton_data = MoCapData.SkeletonData()
 
-        offset = 0
         # Version 2.1 and later
         skeleton_count = 0
-        if ((major == 2 and minor > 0) or major > 2):
-            skeleton_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501v
+        if plan.has_skeletons:
+            skeleton_count, = IntValue.unpack_from(data, offset)
             offset += 4
-            trace_mf("Skeleton Count:", skeleton_count)
+            if TRACE_MF:
+                trace_mf("Skeleton Count:", skeleton_count)
             # Get data size (4 bytes)
-            offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
-            offset += offset_tmp
+            offset, unpackedDataSize = self.__unpack_data_size(data, offset, major, minor, plan) #type: ignore  # noqa E501
             if (skeleton_count > 0):
                 for skeleton_num in range(0, skeleton_count):
-                    rel_offset, skeleton = self.__unpack_skeleton(data[offset:], major, minor, skeleton_num) #type: ignore  # noqa E501
-                    offset += rel_offset
+                    offset, skeleton = self.__unpack_skeleton(data, offset, major, minor, plan, skeleton_num) #type: ignore  # noqa E501
                     skeleton_data.add_skeleton(skeleton)
 
         return offset, skeleton_data
@@ -718,228 +1394,334 @@ class NatNetClient:
         marker_id = new_id & 0x0000ffff
         return model_id, marker_id
 
-    def __unpack_labeled_marker_data(self, data, packet_size, major, minor):
+    def __unpack_labeled_marker_data(self, data, offset, packet_size, major, minor, plan): #type: ignore  # noqa E501
         labeled_marker_data = MoCapData.LabeledMarkerData()
-        offset = 0
         # Labeled markers (Version 2.3 and later)
         labeled_marker_count = 0
-        if ((major == 2 and minor > 3) or major > 2):
-            labeled_marker_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        # Record layout for this version, None before 2.3
+        labeled_marker_values = plan.labeled_marker_values
+        if labeled_marker_values is not None:
+            labeled_marker_count, = IntValue.unpack_from(data, offset)
             offset += 4
-            trace_mf("Labeled Marker Count:", labeled_marker_count)
+            if TRACE_MF:
+                trace_mf("Labeled Marker Count:", labeled_marker_count)
 
             # get data size (4 bytes)
-            offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
-            offset += offset_tmp
+            offset, unpackedDataSize = self.__unpack_data_size(data, offset, major, minor, plan) #type: ignore  # noqa E501
 
+            record_size = labeled_marker_values.size
             for lm_num in range(0, labeled_marker_count):
-                model_id = 0
-                marker_id = 0
-                tmp_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
-                offset += 4
-                model_id, marker_id = self.__decode_marker_id(tmp_id)
-                pos = Vector3.unpack(data[offset:offset+12])
-                offset += 12
-                size = FloatValue.unpack(data[offset:offset+4])
-                offset += 4
-                trace_mf(" %3.1d ID    : [MarkerID: %3.1d] [ModelID: %3.1d]" % (lm_num, marker_id,model_id)) #type: ignore  # noqa E501
-                trace_mf("    pos : [%3.2f, %3.2f, %3.2f]" % (pos[0],pos[1],pos[2])) #type: ignore  # noqa E501
-                trace_mf("    size: [%3.2f]" % size)
+                values = labeled_marker_values.unpack_from(data, offset)
+                offset += record_size
+                tmp_id = values[0]
+                pos = values[1:4]
+                size = values[4:5]
+                if TRACE_MF:
+                    model_id, marker_id = self.__decode_marker_id(tmp_id)
+                    trace_mf(" %3.1d ID    : [MarkerID: %3.1d] [ModelID: %3.1d]" % (lm_num, marker_id,model_id)) #type: ignore  # noqa E501
+                    trace_mf("    pos : [%3.2f, %3.2f, %3.2f]" % (pos[0],pos[1],pos[2])) #type: ignore  # noqa E501
+                    trace_mf("    size: [%3.2f]" % size)
 
                 # Version 2.6 and later
                 param = 0
-                if ((major == 2 and minor >= 6) or major > 2):
-                    param, = struct.unpack('h', data[offset:offset+2])
-                    offset += 2
+                if len(values) > 5:
+                    param = values[5]
                     # occluded = (param & 0x01) != 0
                     # point_cloud_solved = (param & 0x02) != 0
                     # model_solved = (param & 0x04) != 0
 
                 # Version 3.0 and later
                 residual = 0.0
-                if major >= 3:
-                    residual, = FloatValue.unpack(data[offset:offset+4])
-                    offset += 4
-                    residual = residual * 1000.0
-                    trace_mf("    err : [%3.2f]" % residual)
+                if len(values) > 6:
+                    residual = values[6] * 1000.0
+                    if TRACE_MF:
+                        trace_mf("    err : [%3.2f]" % residual)
 
-                labeled_marker = MoCapData.LabeledMarker(tmp_id, pos, size, param, residual) #type: ignore  # noqa E501
+                labeled_marker = self.__new_labeled_marker(tmp_id, pos, size, param, residual) #type: ignore  # noqa E501
                 labeled_marker_data.add_labeled_marker(labeled_marker)
 
         return offset, labeled_marker_data
 
-    def __unpack_force_plate_data(self, data, packet_size, major, minor):
+    def __unpack_marker_set_array_data(self, data, offset, packet_size, major, minor, plan): #type: ignore  # noqa E501
+        """Unpacks the marker sets with one np.frombuffer per set"""
+        # Markerset count (4 bytes)
+        marker_set_count, = IntValue.unpack_from(data, offset)
+        offset += 4
+        if TRACE_MF:
+            trace_mf("Markerset Count:", marker_set_count)
+
+        # get data size (4 bytes)
+        offset, unpackedDataSize = self.__unpack_data_size(data, offset, major, minor, plan) #type: ignore  # noqa E501
+
+        model_names = []
+        marker_counts = []
+        pos_list = []
+        for i in range(0, marker_set_count):
+            model_name, offset = unpack_string(data, offset)
+            marker_count, = IntValue.unpack_from(data, offset)
+            offset += 4
+            if (marker_count < 0):
+                print("WARNING: Early return.  Invalid marker count")
+                offset = len(data)
+                break
+            elif (marker_count > 10000):
+                print("WARNING: Early return.  Marker count too high")
+                offset = len(data)
+                break
+            elif (len(data) < (offset + 12 * marker_count)):
+                print("WARNING: Early return.  Out of data in marker set ", i, " of ", marker_set_count) #type: ignore  # noqa E501
+                offset = len(data)
+                break
+            if TRACE_MF:
+                trace_mf("Model Name     : ", model_name.decode('utf-8'))
+            if TRACE_MF:
+                trace_mf("Marker Count   : ", marker_count)
+            pos_list.append(np.frombuffer(data, MarkerPosArray, 3 * marker_count, offset)) #type: ignore  # noqa E501
+            offset += 12 * marker_count
+            model_names.append(model_name)
+            marker_counts.append(marker_count)
+
+        # The receive buffer is reused, so the positions are always copied
+        if pos_list:
+            pos = np.concatenate(pos_list).reshape(-1, 3)
+        else:
+            pos = np.zeros((0, 3), MarkerPosArray)
+        marker_set_data = MoCapData.MarkerSetArrayData(model_names, marker_counts, pos) #type: ignore  # noqa E501
+        return offset, marker_set_data
+
+    def __unpack_legacy_other_markers_array(self, data, offset, packet_size, major, minor, plan): #type: ignore  # noqa E501
+        """Unpacks the legacy markers with a single np.frombuffer"""
+        # Markerset count (4 bytes)
+        other_marker_count, = IntValue.unpack_from(data, offset)
+        offset += 4
+        if TRACE_MF:
+            trace_mf("Other Marker Count:", other_marker_count)
+
+        # get data size (4 bytes)
+        offset, unpackedDataSize = self.__unpack_data_size(data, offset, major, minor, plan) #type: ignore  # noqa E501
+
+        other_marker_count = max(other_marker_count, 0)
+        pos = np.frombuffer(data, MarkerPosArray, 3 * other_marker_count, offset).reshape(-1, 3).copy() #type: ignore  # noqa E501
+        offset += 12 * other_marker_count
+        return offset, MoCapData.LegacyMarkerArrayData(pos)
+
+    def __unpack_labeled_marker_array_data(self, data, offset, packet_size, major, minor, plan): #type: ignore  # noqa E501
+        """Unpacks the labeled markers with a single np.frombuffer over the
+        record layout of this NatNet version"""
+        labeled_marker_count = 0
+        record = plan.labeled_marker_record
+        if record is not None:
+            labeled_marker_count, = IntValue.unpack_from(data, offset)
+            offset += 4
+            if TRACE_MF:
+                trace_mf("Labeled Marker Count:", labeled_marker_count)
+
+            # get data size (4 bytes)
+            offset, unpackedDataSize = self.__unpack_data_size(data, offset, major, minor, plan) #type: ignore  # noqa E501
+
+        labeled_marker_count = max(labeled_marker_count, 0)
+        markers = np.zeros(labeled_marker_count, MoCapData.LABELED_MARKER_DTYPE) #type: ignore  # noqa E501
+        if labeled_marker_count > 0:
+            raw = np.frombuffer(data, record, labeled_marker_count, offset)
+            offset += record.itemsize * labeled_marker_count
+            for name in record.names:
+                markers[name] = raw[name]
+            markers['residual'] *= 1000.0
+        return offset, MoCapData.LabeledMarkerArrayData(markers)
+
+    def __unpack_rigid_body_array_data(self, data, offset, packet_size, major, minor, plan): #type: ignore  # noqa E501
+        """Unpacks the rigid bodies into (ids, pos, rot, error, valid)
+        arrays.  NatNet 3 and above rigid bodies are fixed size records read
+        with a single np.frombuffer."""
+        # Rigid body count (4 bytes)
+        rigid_body_count, = IntValue.unpack_from(data, offset)
+        offset += 4
+        if TRACE_MF:
+            trace_mf("Rigid Body Count:", rigid_body_count)
+
+        # get data size (4 bytes)
+        offset, unpackedDataSize = self.__unpack_data_size(data, offset, major, minor, plan) #type: ignore  # noqa E501
+
+        rigid_body_count = max(rigid_body_count, 0)
+        record = plan.rigid_body_record
+        if record is not None:
+            records = np.frombuffer(data, record, rigid_body_count, offset)
+            offset += record.itemsize * rigid_body_count
+            ids = records['id'].copy()
+            pos = records['pos'].copy()
+            rot = records['rot'].copy()
+            error = records['error'].copy()
+            valid = (records['param'] & 0x01) != 0
+        else:
+            # Older rigid bodies carry a variable number of markers
+            rigid_body_list = []
+            unpack_rigid_body = plan.unpack_rigid_body
+            for i in range(0, rigid_body_count):
+                offset, rigid_body = unpack_rigid_body(data, offset, i)
+                rigid_body_list.append(rigid_body)
+            ids = np.array([rb.id_num for rb in rigid_body_list], np.int32)
+            pos = np.array([rb.pos for rb in rigid_body_list], np.float32).reshape(-1, 3) #type: ignore  # noqa E501
+            rot = np.array([rb.rot for rb in rigid_body_list], np.float32).reshape(-1, 4) #type: ignore  # noqa E501
+            error = np.array([rb.error for rb in rigid_body_list], np.float32) #type: ignore  # noqa E501
+            valid = np.array([rb.tracking_valid for rb in rigid_body_list], bool) #type: ignore  # noqa E501
+
+        return offset, (ids, pos, rot, error, valid)
+
+    def __unpack_force_plate_data(self, data, offset, packet_size, major, minor, plan): #type: ignore  # noqa E501
         force_plate_data = MoCapData.ForcePlateData()
         n_frames_show_max = 4
-        offset = 0
         # Force Plate data (version 2.9 and later)
         force_plate_count = 0
-        if ((major == 2 and minor >= 9) or major > 2):
-            force_plate_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        if plan.has_force_plates:
+            force_plate_count, = IntValue.unpack_from(data, offset)
             offset += 4
-            trace_mf("Force Plate Count:", force_plate_count)
+            if TRACE_MF:
+                trace_mf("Force Plate Count:", force_plate_count)
 
             # get data size (4 bytes)
-            offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
-            offset += offset_tmp
+            offset, unpackedDataSize = self.__unpack_data_size(data, offset, major, minor, plan) #type: ignore  # noqa E501
 
             for i in range(0, force_plate_count):
                 # ID
-                force_plate_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+                force_plate_id, = IntValue.unpack_from(data, offset)
                 offset += 4
                 force_plate = MoCapData.ForcePlate(force_plate_id)
 
                 # Channel Count
-                force_plate_channel_count = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
+                force_plate_channel_count, = IntValue.unpack_from(data, offset)
                 offset += 4
 
-                trace_mf("\tForce Plate %3.1d ID: %3.1d Num Channels: %3.1d" % (i, force_plate_id, force_plate_channel_count)) #type: ignore  # noqa E501
+                if TRACE_MF:
+                    trace_mf("\tForce Plate %3.1d ID: %3.1d Num Channels: %3.1d" % (i, force_plate_id, force_plate_channel_count)) #type: ignore  # noqa E501
 
                 # Channel Data
                 for j in range(force_plate_channel_count):
                     fp_channel_data = MoCapData.ForcePlateChannelData()
-                    force_plate_channel_frame_count = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
+                    force_plate_channel_frame_count, = IntValue.unpack_from(data, offset) #type: ignore  # noqa E501
                     offset += 4
-                    out_string = "\tChannel %3.1d: " % (j)
-                    out_string += "  %3.1d Frames - Frame Data: " % (force_plate_channel_frame_count) #type: ignore  # noqa E501
 
                     # Force plate frames
-                    n_frames_show = min(force_plate_channel_frame_count, n_frames_show_max) #type: ignore  # noqa E501
                     for k in range(force_plate_channel_frame_count):
-                        force_plate_channel_val = FloatValue.unpack(data[offset:offset+4]) #type: ignore  # noqa E501
+                        force_plate_channel_val = FloatValue.unpack_from(data, offset) #type: ignore  # noqa E501
                         offset += 4
                         fp_channel_data.add_frame_entry(force_plate_channel_val) #type: ignore  # noqa E501
 
-                        if k < n_frames_show:
+                    if TRACE_MF:
+                        n_frames_show = min(force_plate_channel_frame_count, n_frames_show_max) #type: ignore  # noqa E501
+                        out_string = "\tChannel %3.1d: " % (j)
+                        out_string += "  %3.1d Frames - Frame Data: " % (force_plate_channel_frame_count) #type: ignore  # noqa E501
+                        for force_plate_channel_val in fp_channel_data.frame_list[:n_frames_show]: #type: ignore  # noqa E501
                             out_string += " %3.2f " % (force_plate_channel_val)
-                    if n_frames_show < force_plate_channel_frame_count:
-                        out_string += " showing %3.1d of %3.1d frames" % (n_frames_show, force_plate_channel_frame_count) #type: ignore  # noqa E501
+                        if n_frames_show < force_plate_channel_frame_count:
+                            out_string += " showing %3.1d of %3.1d frames" % (n_frames_show, force_plate_channel_frame_count) #type: ignore  # noqa E501
+                        trace_mf(" %s" % out_string)
                     force_plate.add_channel_data(fp_channel_data)
                 force_plate_data.add_force_plate(force_plate)
         return offset, force_plate_data
 
-    def __unpack_device_data(self, data, packet_size, major, minor):
+    def __unpack_device_data(self, data, offset, packet_size, major, minor, plan):
         device_data = MoCapData.DeviceData()
         n_frames_show_max = 4
-        offset = 0
         # Device data (version 2.11 and later)
         device_count = 0
-        if (major == 2 and minor >= 11) or (major > 2):
-            device_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        if plan.has_devices:
+            device_count, = IntValue.unpack_from(data, offset)
             offset += 4
-            trace_mf("Device Count:", device_count)
+            if TRACE_MF:
+                trace_mf("Device Count:", device_count)
 
             # get data size (4 bytes)
-            offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
-            offset += offset_tmp
+            offset, unpackedDataSize = self.__unpack_data_size(data, offset, major, minor, plan) #type: ignore  # noqa E501
 
             for i in range(0, device_count):
 
                 # ID
-                device_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+                device_id, = IntValue.unpack_from(data, offset)
                 offset += 4
                 device = MoCapData.Device(device_id)
                 # Channel Count
-                device_channel_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+                device_channel_count, = IntValue.unpack_from(data, offset)
                 offset += 4
 
-                trace_mf("\tDevice %3.1d      ID: %3.1d Num Channels: %3.1d" % (i, device_id, device_channel_count)) #type: ignore  # noqa E501
+                if TRACE_MF:
+                    trace_mf("\tDevice %3.1d      ID: %3.1d Num Channels: %3.1d" % (i, device_id, device_channel_count)) #type: ignore  # noqa E501
 
                 # Channel Data
                 for j in range(0, device_channel_count):
                     device_channel_data = MoCapData.DeviceChannelData()
-                    device_channel_frame_count = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
+                    device_channel_frame_count, = IntValue.unpack_from(data, offset) #type: ignore  # noqa E501
                     offset += 4
-                    out_string = "\tChannel %3.1d " % (j)
-                    out_string += "  %3.1d Frames - Frame Data: " % (device_channel_frame_count) #type: ignore  # noqa E501
 
                     # Device Frame Data
-                    n_frames_show = min(device_channel_frame_count, n_frames_show_max) #type: ignore  # noqa E501
                     for k in range(0, device_channel_frame_count):
-                        device_channel_val = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
-                        device_channel_val = FloatValue.unpack(data[offset:offset+4]) #type: ignore  # noqa E501
+                        device_channel_val = FloatValue.unpack_from(data, offset) #type: ignore  # noqa E501
                         offset += 4
-                        if k < n_frames_show:
-                            out_string += " %3.2f " % (device_channel_val)
-
                         device_channel_data.add_frame_entry(device_channel_val)
-                    if n_frames_show < device_channel_frame_count:
-                        out_string += " showing %3.1d of %3.1d frames" % (n_frames_show, device_channel_frame_count) #type: ignore  # noqa E501
-                    trace_mf(" %s" % out_string)
+
+                    if TRACE_MF:
+                        n_frames_show = min(device_channel_frame_count, n_frames_show_max) #type: ignore  # noqa E501
+                        out_string = "\tChannel %3.1d " % (j)
+                        out_string += "  %3.1d Frames - Frame Data: " % (device_channel_frame_count) #type: ignore  # noqa E501
+                        for device_channel_val in device_channel_data.frame_list[:n_frames_show]: #type: ignore  # noqa E501
+                            out_string += " %3.2f " % (device_channel_val)
+                        if n_frames_show < device_channel_frame_count:
+                            out_string += " showing %3.1d of %3.1d frames" % (n_frames_show, device_channel_frame_count) #type: ignore  # noqa E501
+                        trace_mf(" %s" % out_string)
                     device.add_channel_data(device_channel_data)
                 device_data.add_device(device)
         return offset, device_data
 
     def __unpack_frame_suffix_data_4_1_to_present(self, data, offset, frame_suffix_data, param): #type: ignore  # noqa E501
         """Unpacks frame suffix data from NatNet 4.1 to present NatNet"""
-        timestamp, = DoubleValue.unpack(data[offset:offset+8])
-        offset += 8
-        trace_mf("Timestamp: %3.2f" % timestamp)
+        timestamp, stamp_camera_mid_exposure, stamp_data_received, \
+            stamp_transmit, prec_timestamp_secs, prec_timestamp_frac_secs, \
+            param = FrameSuffixValues_4_1.unpack_from(data, offset)
+        offset += FrameSuffixValues_4_1.size
+        if TRACE_MF:
+            trace_mf("Timestamp: %3.2f" % timestamp)
+            trace_mf("Mid-exposure timestamp        : %3.1d" % stamp_camera_mid_exposure) #type: ignore  # noqa E501
+            trace_mf("Camera data received timestamp: %3.1d" %stamp_data_received) #type: ignore  # noqa E501
+            trace_mf("Transmit timestamp            : %3.1d" % stamp_transmit)  #type: ignore  # noqa E501
+            # hours = int(prec_timestamp_secs/3600)
+            # minutes=int(prec_timestamp_secs/60)%60
+            # seconds=prec_timestamp_secs%60
+            # out_string= "Precision timestamp (h:m:s) - %4.1d:%2.2d:%2.2d" % (hours, minutes, seconds) #type: ignore  # noqa E501
+            # trace_mf(" %s" %out_string)
+            trace_mf("Precision timestamp (sec)     : %3.1d" % prec_timestamp_secs) #type: ignore  # noqa E501
+            trace_mf("Precision timestamp (frac sec): %3.1d" % prec_timestamp_frac_secs) #type: ignore  # noqa E501
         frame_suffix_data.timestamp = timestamp
-        trace_mf("Mid-exposure timestamp        : %3.1d" % stamp_camera_mid_exposure) #type: ignore  # noqa E501
-        offset += 8
         frame_suffix_data.stamp_camera_mid_exposure = stamp_camera_mid_exposure #type: ignore  # noqa E501
-
-        stamp_data_received = int.from_bytes(data[offset:offset+8], byteorder='little',  signed=True) #type: ignore  # noqa E501
-        offset += 8
         frame_suffix_data.stamp_data_received = stamp_data_received
-        trace_mf("Camera data received timestamp: %3.1d" %stamp_data_received) #type: ignore  # noqa E501
-
-        stamp_transmit = int.from_bytes(data[offset:offset+8], byteorder='little',  signed=True) #type: ignore  # noqa E501
-        offset += 8
-        trace_mf("Transmit timestamp            : %3.1d" % stamp_transmit)  #type: ignore  # noqa E501
         frame_suffix_data.stamp_transmit = stamp_transmit
-
-        prec_timestamp_secs = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
-        # hours = int(prec_timestamp_secs/3600)
-        # minutes=int(prec_timestamp_secs/60)%60
-        # seconds=prec_timestamp_secs%60
-        # out_string= "Precision timestamp (h:m:s) - %4.1d:%2.2d:%2.2d" % (hours, minutes, seconds) #type: ignore  # noqa E501
-        # trace_mf(" %s" %out_string)
-        trace_mf("Precision timestamp (sec)     : %3.1d" % prec_timestamp_secs) #type: ignore  # noqa E501
-        offset += 4
         frame_suffix_data.prec_timestamp_secs = prec_timestamp_secs
-
-        prec_timestamp_frac_secs = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
-        trace_mf("Precision timestamp (frac sec): %3.1d" % prec_timestamp_frac_secs) #type: ignore  # noqa E501
-        offset += 4
         frame_suffix_data.prec_timestamp_frac_secs = prec_timestamp_frac_secs #type: ignore  # noqa E501
-        param, = struct.unpack('h', data[offset:offset+2])
-        offset += 2
 
         return data, offset, frame_suffix_data, param
 
     def __unpack_frame_suffix_data_3_to_4(self, data, offset, frame_suffix_data, param):  #type: ignore  # noqa E501
         """Unpacks frame suffix data inclusive from NatNet 3 to NatNet 4"""
-        timestamp, = DoubleValue.unpack(data[offset:offset+8])
-        offset += 8
-        trace_mf("Timestamp: %3.2f" % timestamp)
+        timestamp, stamp_camera_mid_exposure, stamp_data_received, \
+            stamp_transmit, param = FrameSuffixValues_3.unpack_from(data, offset) #type: ignore  # noqa E501
+        offset += FrameSuffixValues_3.size
+        if TRACE_MF:
+            trace_mf("Timestamp: %3.2f" % timestamp)
+            trace_mf("Mid-exposure timestamp        : %3.1d" % stamp_camera_mid_exposure) #type: ignore  # noqa E501
+            trace_mf("Camera data received timestamp: %3.1d" %stamp_data_received) #type: ignore  # noqa E501
+            trace_mf("Transmit timestamp            : %3.1d" % stamp_transmit)  #type: ignore  # noqa E501
         frame_suffix_data.timestamp = timestamp
-        stamp_camera_mid_exposure = int.from_bytes(data[offset:offset+8], byteorder='little',  signed=True) #type: ignore  # noqa E501
-        trace_mf("Mid-exposure timestamp        : %3.1d" % stamp_camera_mid_exposure) #type: ignore  # noqa E501
-        offset += 8
         frame_suffix_data.stamp_camera_mid_exposure = stamp_camera_mid_exposure #type: ignore  # noqa E501
-
-        stamp_data_received = int.from_bytes(data[offset:offset+8], byteorder='little',  signed=True) #type: ignore  # noqa E501
-        offset += 8
         frame_suffix_data.stamp_data_received = stamp_data_received
-        trace_mf("Camera data received timestamp: %3.1d" %stamp_data_received) #type: ignore  # noqa E501
-
-        stamp_transmit = int.from_bytes(data[offset:offset+8], byteorder='little',  signed=True) #type: ignore  # noqa E501
-        offset += 8
-        trace_mf("Transmit timestamp            : %3.1d" % stamp_transmit)  #type: ignore  # noqa E501
         frame_suffix_data.stamp_transmit = stamp_transmit
-        param, = struct.unpack('h', data[offset:offset+2])
-        offset += 2
         return data, offset, frame_suffix_data, param
     def __unpack_frame_suffix_data_2_7_to_3(self, data, offset, frame_suffix_data, param): #type: ignore  # noqa E501
         """Unpacks frame suffix data from inclusive of NatNet 2.7 to but not
         including NatNet 3"""
-        timestamp, = DoubleValue.unpack(data[offset:offset+8])
+        timestamp, = DoubleValue.unpack_from(data, offset)
         offset += 8
-        trace_mf("Timestamp: %3.2f" % timestamp)
+        if TRACE_MF:
+            trace_mf("Timestamp: %3.2f" % timestamp)
         frame_suffix_data.timestamp = timestamp
-        param, = struct.unpack('h', data[offset:offset+2])
+        param, = ShortValue.unpack_from(data, offset)
         offset += 2
 
         return data, offset, frame_suffix_data, param
@@ -947,35 +1729,36 @@ class NatNetClient:
     def __unpack_frame_suffix_data_pre_2_7(self, data, offset, frame_suffix_data, param): #type: ignore  # noqa E501
         """Unpacks frame suffix data for any NatNet version before
           NatNet 2.7"""
-        timestamp, = FloatValue.unpack(data[offset:offset+4])
+        timestamp, = FloatValue.unpack_from(data, offset)
         offset += 4
-        trace_mf("Timestamp: %3.2f" % timestamp)
+        if TRACE_MF:
+            trace_mf("Timestamp: %3.2f" % timestamp)
         frame_suffix_data.timestamp = timestamp
-        param, = struct.unpack('h', data[offset:offset+2])
+        param, = ShortValue.unpack_from(data, offset)
         offset += 2
 
         return data, offset, frame_suffix_data, param
 
     def __unpack_frame_suffix_data_0_case(self, data, offset, frame_suffix_data, param): #type: ignore  # noqa E501
         """Unpacks frame suffix data if the major case is 0 """
-        timestamp, = DoubleValue.unpack(data[offset:offset+8])
+        timestamp, = DoubleValue.unpack_from(data, offset)
         offset += 8
-        trace_mf("Timestamp: %3.2f" % timestamp)
+        if TRACE_MF:
+            trace_mf("Timestamp: %3.2f" % timestamp)
         frame_suffix_data.timestamp = timestamp
-        param, = struct.unpack('h', data[offset:offset+2])
+        param, = ShortValue.unpack_from(data, offset)
         offset += 2
         return data, offset, frame_suffix_data, param
 
-    def __unpack_frame_suffix_data(self, data, packet_size, major, minor):
+    def __unpack_frame_suffix_data(self, data, offset, packet_size, major, minor, plan): #type: ignore  # noqa E501
         frame_suffix_data = MoCapData.FrameSuffixData()
-        offset = 0
 
         # Timecode
-        timecode = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        timecode, = IntValue.unpack_from(data, offset)
         offset += 4
         frame_suffix_data.timecode = timecode
 
-        timecode_sub = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        timecode_sub, = IntValue.unpack_from(data, offset)
         offset += 4
         frame_suffix_data.timecode_sub = timecode_sub
 
@@ -985,16 +1768,7 @@ class NatNetClient:
             print("ERROR: Early End of Data Frame Suffix Data")
             print("\tNo time stamp info available")
         else:
-            if (major == 0):
-                data, offset, frame_suffix_data = self.__unpack_frame_suffix_data_0_case(data, offset, frame_suffix_data, param) #type: ignore  # noqa E501
-            elif (major < 2 or (major <= 2 and minor < 7)):
-                data, offset, frame_suffix_data, param = self.__unpack_frame_suffix_data_pre_2_7(data, offset, frame_suffix_data, param)#type: ignore  # noqa E501
-            elif (major == 2 and minor >= 7 and major < 3):
-                data, offset, frame_suffix_data, param = self.__unpack_frame_suffix_data_2_7_to_3(data, offset, frame_suffix_data, param) #type: ignore  # noqa E501
-            elif (major >= 3 or (major == 4 and minor == 0)):
-                data, offset, frame_suffix_data, param = self.__unpack_frame_suffix_data_3_to_4(data, offset, frame_suffix_data, param) #type: ignore  # noqa E501
-            elif (major >= 4 and minor != 0):
-                data, offset, frame_suffix_data, param = self.__unpack_frame_suffix_data_4_1_to_present(data, offset, frame_suffix_data, param) #type: ignore  # noqa E501
+            data, offset, frame_suffix_data, param = plan.unpack_frame_suffix(data, offset, frame_suffix_data, param) #type: ignore  # noqa E501
 
         is_recording = (param & 0x01) != 0
         tracked_models_changed = (param & 0x02) != 0
@@ -1005,116 +1779,225 @@ class NatNetClient:
         return offset, frame_suffix_data
 
     # Unpack data from a motion capture frame message
-    def __unpack_mocap_data(self, data: bytes, packet_size, major, minor):
+    def __unpack_mocap_data(self, data: bytes, packet_size, major, minor, plan=None): #type: ignore  # noqa E501
+        # The plan is read once per frame, so a decode option or version
+        # changed on another thread takes effect from the next frame
+        if plan is None:
+            plan = self.__get_decode_plan()
         mocap_data = MoCapData.MoCapData()
         data = memoryview(data)
         offset = 0
-        rel_offset = 0
         # Frame Prefix Data
-        rel_offset, frame_prefix_data = self.__unpack_frame_prefix_data(data[offset:]) #type: ignore  # noqa E501
-        offset += rel_offset
+        offset, frame_prefix_data = self.__unpack_frame_prefix_data(data, offset) #type: ignore  # noqa E501
         mocap_data.set_prefix_data(frame_prefix_data)
-        frame_number = frame_prefix_data.frame_number
-
-        # Markerset Data
-        rel_offset, marker_set_data = self.__unpack_marker_set_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
-        offset += rel_offset
-        mocap_data.set_marker_set_data(marker_set_data)
-        marker_set_count = marker_set_data.get_marker_set_count()
-        unlabeled_markers_count = marker_set_data.get_unlabeled_marker_count()
-
-        # Legacy Other Markers
-        rel_offset, legacy_other_markers = self.__unpack_legacy_other_markers(data[offset:], (packet_size - offset),major, minor) #type: ignore  # noqa E501
-        offset += rel_offset
-        mocap_data.set_legacy_other_markers(legacy_other_markers)
-        marker_set_count = legacy_other_markers.get_marker_count()
-        legacy_other_markers_count = marker_set_data.get_unlabeled_marker_count() #type: ignore  # noqa F401
-
-        # Rigid Body Data
-        rel_offset, rigid_body_data = self.__unpack_rigid_body_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
-        offset += rel_offset
-        mocap_data.set_rigid_body_data(rigid_body_data)
-        rigid_body_count = rigid_body_data.get_rigid_body_count()
-
-        # Skeleton Data
-        rel_offset, skeleton_data = self.__unpack_skeleton_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
-        offset += rel_offset
-        mocap_data.set_skeleton_data(skeleton_data)
-        skeleton_count = skeleton_data.get_skeleton_count()
 
+        # Frame sections in packet order for this version
+        section_data = {}
+        for name, unpack_function, decode in plan.sections:
+            offset, section_data[name] = self.__unpack_section(name, unpack_function, decode, data, offset, packet_size, major, minor, plan) #type: ignore  # noqa E501
+
+        mocap_data.set_marker_set_data(section_data["marker_sets"])
+        mocap_data.set_legacy_other_markers(section_data["legacy_markers"])
+        mocap_data.set_rigid_body_data(section_data["rigid_bodies"])
+        mocap_data.set_skeleton_data(section_data["skeletons"])
         # Assets (Motive 3.1/NatNet 4.1 and greater)
-        asset_count = 0
-        if (((major >= 4) and (minor >= 1)) or (major > 4)):
-            rel_offset, asset_data = self.__unpack_asset_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
-            offset += rel_offset
-            mocap_data.set_asset_data(asset_data)
-            asset_count = asset_data.get_asset_count()
-
-        # Labeled Marker Data
-        rel_offset, labeled_marker_data = self.__unpack_labeled_marker_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
-        offset += rel_offset
-        mocap_data.set_labeled_marker_data(labeled_marker_data)
-        labeled_marker_count = labeled_marker_data.get_labeled_marker_count()
-
-        # Force Plate Data
-        rel_offset, force_plate_data = self.__unpack_force_plate_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
-        offset += rel_offset
-        mocap_data.set_force_plate_data(force_plate_data)
-
-        # Device Data
-        rel_offset, device_data = self.__unpack_device_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
-        offset += rel_offset
-        mocap_data.set_device_data(device_data)
+        if "assets" in section_data:
+            mocap_data.set_asset_data(section_data["assets"])
+        mocap_data.set_labeled_marker_data(section_data["labeled_markers"])
+        mocap_data.set_force_plate_data(section_data["force_plates"])
+        mocap_data.set_device_data(section_data["devices"])
 
         # Frame Suffix Data
-        # rel_offset, timecode, timecode_sub, timestamp, is_recording, tracked_models_changed = #type: ignore  # noqa E501
-        rel_offset, frame_suffix_data = self.__unpack_frame_suffix_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
-        offset += rel_offset
+        offset, frame_suffix_data = self.__unpack_frame_suffix_data(data, offset, packet_size, major, minor, plan) #type: ignore  # noqa E501
         mocap_data.set_suffix_data(frame_suffix_data)
 
-        timecode = frame_suffix_data.timecode
-        timecode_sub = frame_suffix_data.timecode_sub
-        timestamp = frame_suffix_data.timestamp
-        is_recording = frame_suffix_data.is_recording
-        tracked_models_changed = frame_suffix_data.tracked_models_changed
+        return offset, mocap_data
 
-        # Send information to any listener.
-        if self.new_frame_listener is not None:
-            data_dict = {}
-            data_dict["frame_number"] = frame_number
-            data_dict["marker_set_count"] = marker_set_count
-            data_dict["unlabeled_markers_count"] = unlabeled_markers_count
-            data_dict["rigid_body_count"] = rigid_body_count
-            data_dict["skeleton_count"] = skeleton_count
-            data_dict["asset_count"] = asset_count
-            data_dict["labeled_marker_count"] = labeled_marker_count
-            data_dict["timecode"] = timecode
-            data_dict["timecode_sub"] = timecode_sub
-            data_dict["timestamp"] = timestamp
-            data_dict["is_recording"] = is_recording
-            data_dict["tracked_models_changed"] = tracked_models_changed
+    def __get_mocap_data_dict(self, mocap_data, has_assets):
+        """data_dict of new_frame_listener for a MoCapData frame"""
+        marker_set_count = None
+        unlabeled_markers_count = None
+        marker_set_data = mocap_data.marker_set_data
+        if marker_set_data is not None:
+            marker_set_count = marker_set_data.get_marker_set_count()
+            unlabeled_markers_count = marker_set_data.get_unlabeled_marker_count() #type: ignore  # noqa E501
+        if mocap_data.legacy_other_markers is not None:
+            marker_set_count = mocap_data.legacy_other_markers.get_marker_count() #type: ignore  # noqa E501
+        rigid_body_count = None
+        if mocap_data.rigid_body_data is not None:
+            rigid_body_count = mocap_data.rigid_body_data.get_rigid_body_count() #type: ignore  # noqa E501
+        skeleton_count = None
+        if mocap_data.skeleton_data is not None:
+            skeleton_count = mocap_data.skeleton_data.get_skeleton_count()
+        asset_count = 0
+        if has_assets:
+            asset_count = None
+            if mocap_data.asset_data is not None:
+                asset_count = mocap_data.asset_data.get_asset_count()
+        labeled_marker_count = None
+        if mocap_data.labeled_marker_data is not None:
+            labeled_marker_count = mocap_data.labeled_marker_data.get_labeled_marker_count() #type: ignore  # noqa E501
+        frame_suffix_data = mocap_data.suffix_data
+
+        data_dict = {}
+        data_dict["frame_number"] = mocap_data.prefix_data.frame_number
+        data_dict["marker_set_count"] = marker_set_count
+        data_dict["unlabeled_markers_count"] = unlabeled_markers_count
+        data_dict["rigid_body_count"] = rigid_body_count
+        data_dict["skeleton_count"] = skeleton_count
+        data_dict["asset_count"] = asset_count
+        data_dict["labeled_marker_count"] = labeled_marker_count
+        data_dict["timecode"] = frame_suffix_data.timecode
+        data_dict["timecode_sub"] = frame_suffix_data.timecode_sub
+        data_dict["timestamp"] = frame_suffix_data.timestamp
+        data_dict["is_recording"] = frame_suffix_data.is_recording
+        data_dict["tracked_models_changed"] = frame_suffix_data.tracked_models_changed #type: ignore  # noqa E501
+        return data_dict
+
+    def __deliver_frame(self, frame, offset, has_assets):
+        """Queues a decoded frame for the delivery thread, or calls its
+        listeners as the delivery thread would.  Called once the frame is
+        decoded, so listener time is not decode time."""
+        frame_queue = self.__frame_queue
+        is_columnar = isinstance(frame, MoCapData.ColumnarFrame)
+        data_dict = None
+        if (self.new_frame_listener is not None) or (frame_queue is not None) or \
+                ((not is_columnar) and (self.new_frame_with_data_listener is not None)): #type: ignore  # noqa E501
+            if is_columnar:
+                data_dict = self.__get_columnar_frame_dict(frame, has_assets)
+            else:
+                data_dict = self.__get_mocap_data_dict(frame, has_assets)
+
+        if frame_queue is not None:
+            self.__queue_frame(frame_queue, (data_dict, offset, frame))
+            return
+        if self.rigid_body_listener is not None:
+            self.__call_rigid_body_listener(frame)
+        if is_columnar:
+            self.__call_columnar_frame_listeners(data_dict, offset, frame)
+        else:
+            self.__call_mocap_frame_listeners(data_dict, offset, frame)
+
+    def __queue_frame(self, frame_queue, item):
+        for dropped in frame_queue.put(item):
+            self.__recycle_frame(dropped[2])
+
+    def __recycle_frame(self, frame):
+        if (self.__frame_pool is not None) and not isinstance(frame, MoCapData.ColumnarFrame): #type: ignore  # noqa E501
+            self.__frame_pool.recycle(frame)
+
+    def __delivery_thread_function(self, frame_queue):
+        """Calls the listeners for each queued frame until the queue is
+        closed"""
+        while True:
+            item = frame_queue.get()
+            if item is None:
+                break
+            data_dict, offset, frame = item
+            if self.rigid_body_listener is not None:
+                self.__call_rigid_body_listener(frame)
+            if isinstance(frame, MoCapData.ColumnarFrame):
+                self.__call_columnar_frame_listeners(data_dict, offset, frame)
+            else:
+                self.__call_mocap_frame_listeners(data_dict, offset, frame)
+                self.__recycle_frame(frame)
+        return 0
 
+    def __call_rigid_body_listener(self, frame):
+        """Calls rigid_body_listener for the rigid bodies and skeleton
+        bones of a queued frame, as the decoders do without a queue"""
+        rigid_body_listener = self.rigid_body_listener
+        if isinstance(frame, MoCapData.ColumnarFrame):
+            if frame.rigid_body_ids is not None:
+                for new_id, rb_pos, rb_rot in zip(frame.rigid_body_ids.tolist(), frame.rigid_body_pos.tolist(), frame.rigid_body_rot.tolist()): #type: ignore  # noqa E501
+                    rigid_body_listener(new_id, tuple(rb_pos), tuple(rb_rot))
+        elif frame.rigid_body_data is not None:
+            for rigid_body in frame.rigid_body_data.rigid_body_list:
+                rigid_body_listener(rigid_body.id_num, rigid_body.pos, rigid_body.rot) #type: ignore  # noqa E501
+        if frame.skeleton_data is not None:
+            for skeleton in frame.skeleton_data.skeleton_list:
+                for rigid_body in skeleton.rigid_body_list:
+                    rigid_body_listener(rigid_body.id_num, rigid_body.pos, rigid_body.rot) #type: ignore  # noqa E501
+
+    def __call_mocap_frame_listeners(self, data_dict, offset, mocap_data):
+        if self.new_frame_listener is not None:
             self.new_frame_listener(data_dict)
 
         if self.new_frame_with_data_listener is not None:
-            data_dict = {}
-            data_dict["frame_number"] = frame_number
-            data_dict["marker_set_count"] = marker_set_count
-            data_dict["unlabeled_markers_count"] = unlabeled_markers_count
-            data_dict["rigid_body_count"] = rigid_body_count
-            data_dict["skeleton_count"] = skeleton_count
-            data_dict["asset_count"] = asset_count
-            data_dict["labeled_marker_count"] = labeled_marker_count
-            data_dict["timecode"] = timecode
-            data_dict["timecode_sub"] = timecode_sub
-            data_dict["timestamp"] = timestamp
-            data_dict["is_recording"] = is_recording
-            data_dict["tracked_models_changed"] = tracked_models_changed
+            data_dict = dict(data_dict)
             data_dict["offset"] = offset
             data_dict["mocap_data"] = mocap_data
             self.new_frame_with_data_listener(data_dict)
 
-        return offset, mocap_data
+    # Unpack a motion capture frame message into a ColumnarFrame
+    def __unpack_columnar_frame(self, data: bytes, packet_size, major, minor, plan=None): #type: ignore  # noqa E501
+        if plan is None:
+            plan = self.__get_decode_plan()
+        data = memoryview(data)
+        offset = 0
+        # Frame Prefix Data
+        offset, frame_prefix_data = self.__unpack_frame_prefix_data(data, offset) #type: ignore  # noqa E501
+        frame = MoCapData.ColumnarFrame(frame_prefix_data)
+
+        # Frame sections in packet order for this version
+        section_data = {}
+        for name, unpack_function, decode in plan.sections:
+            offset, section_data[name] = self.__unpack_section(name, unpack_function, decode, data, offset, packet_size, major, minor, plan) #type: ignore  # noqa E501
+
+        frame.marker_set_data = section_data["marker_sets"]
+        frame.legacy_other_markers = section_data["legacy_markers"]
+        if section_data["rigid_bodies"] is not None:
+            frame.set_rigid_bodies(*section_data["rigid_bodies"])
+        frame.skeleton_data = section_data["skeletons"]
+        frame.asset_data = section_data.get("assets")
+        frame.labeled_marker_data = section_data["labeled_markers"]
+        frame.force_plate_data = section_data["force_plates"]
+        frame.device_data = section_data["devices"]
+
+        # Frame Suffix Data
+        offset, frame_suffix_data = self.__unpack_frame_suffix_data(data, offset, packet_size, major, minor, plan) #type: ignore  # noqa E501
+        frame.set_suffix_data(frame_suffix_data)
+
+        return offset, frame
+
+    def __get_columnar_frame_dict(self, frame, has_assets):
+        """data_dict of new_frame_listener for a ColumnarFrame"""
+        data_dict = {}
+        data_dict["frame_number"] = frame.prefix_data.frame_number
+        data_dict["marker_set_count"] = None
+        data_dict["unlabeled_markers_count"] = None
+        if frame.marker_set_data is not None:
+            data_dict["marker_set_count"] = frame.marker_set_data.get_marker_set_count() #type: ignore  # noqa E501
+            data_dict["unlabeled_markers_count"] = 0
+        if frame.legacy_other_markers is not None:
+            data_dict["marker_set_count"] = frame.legacy_other_markers.get_marker_count() #type: ignore  # noqa E501
+        data_dict["rigid_body_count"] = None
+        if frame.rigid_body_ids is not None:
+            data_dict["rigid_body_count"] = frame.get_rigid_body_count()
+        data_dict["skeleton_count"] = None
+        if frame.skeleton_data is not None:
+            data_dict["skeleton_count"] = frame.skeleton_data.get_skeleton_count() #type: ignore  # noqa E501
+        data_dict["asset_count"] = 0
+        if has_assets:
+            data_dict["asset_count"] = None
+            if frame.asset_data is not None:
+                data_dict["asset_count"] = frame.asset_data.get_asset_count() #type: ignore  # noqa E501
+        data_dict["labeled_marker_count"] = None
+        if frame.labeled_marker_data is not None:
+            data_dict["labeled_marker_count"] = frame.labeled_marker_data.get_labeled_marker_count() #type: ignore  # noqa E501
+        data_dict["timecode"] = frame.timecode
+        data_dict["timecode_sub"] = frame.timecode_sub
+        data_dict["timestamp"] = frame.timestamp
+        data_dict["is_recording"] = frame.is_recording
+        data_dict["tracked_models_changed"] = frame.tracked_models_changed
+        return data_dict
+
+    def __call_columnar_frame_listeners(self, data_dict, offset, frame):
+        if self.new_frame_listener is not None:
+            self.new_frame_listener(data_dict)
+
+        if self.columnar_frame_listener is not None:
+            self.columnar_frame_listener(frame)
 
     def __unpack_marker_set_description(self, data, major, minor):
         """Unpack marker description packet"""
@@ -1700,87 +2583,94 @@ class NatNetClient:
         marker_desc = DataDescriptions.MarkerDescription(name, marker_id, initialPosition, marker_size, marker_params) #type: ignore  # noqa E501
         return offset, marker_desc
 
-    def __unpack_asset_rigid_body_data(self, data, major, minor):
-        offset = 0
+    def __unpack_asset_rigid_body_data(self, data, offset, major, minor):
+        start = offset
         # ID
-        rbID = int.from_bytes(data[offset:offset+4], 'little',  signed=True)
+        rbID, = IntValue.unpack_from(data, offset)
         offset += 4
-        trace_dd("\tID        : %d" % (rbID))
+        if TRACE_DD:
+            trace_dd("\tID        : %d" % (rbID))
 
         # Position: x,y,z
-        pos = Vector3.unpack(data[offset:offset+12])
+        pos = Vector3.unpack_from(data, offset)
         offset += 12
-        trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
 
         # Orientation: qx, qy, qz, qw
-        rot = Quaternion.unpack(data[offset:offset+16])
+        rot = Quaternion.unpack_from(data, offset)
         offset += 16
-        trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
 
         # Mean error
-        mean_error, = FloatValue.unpack(data[offset:offset+4])
+        mean_error, = FloatValue.unpack_from(data, offset)
         offset += 4
-        trace_mf("\tMean Error : %3.2f" % mean_error)
+        if TRACE_MF:
+            trace_mf("\tMean Error : %3.2f" % mean_error)
 
         # Params
-        marker_params, = struct.unpack('h', data[offset:offset+2])
+        marker_params, = ShortValue.unpack_from(data, offset)
         offset += 2
-        trace_mf("\tParams     :", marker_params)
+        if TRACE_MF:
+            trace_mf("\tParams     :", marker_params)
 
-        trace_dd("unpack_marker_description processed %3.1d bytes" % offset)
+        if TRACE_DD:
+            trace_dd("unpack_marker_description processed %3.1d bytes" % (offset - start)) #type: ignore  # noqa E501
         # Package for return object
         rigid_body_data = MoCapData.AssetRigidBodyData(rbID, pos, rot, mean_error, marker_params) #type: ignore  # noqa E501
 
         return offset, rigid_body_data
 
-    def __unpack_asset_marker_data(self, data, major, minor):
-        offset = 0
+    def __unpack_asset_marker_data(self, data, offset, major, minor):
         # ID
-        marker_id = int.from_bytes(data[offset:offset+4], 'little', signed=True) #type: ignore  # noqa E501
+        marker_id, = IntValue.unpack_from(data, offset)
         offset += 4
-        trace_dd("\tID         : %d" % (marker_id))
+        if TRACE_DD:
+            trace_dd("\tID         : %d" % (marker_id))
 
         # Position: x,y,z
-        pos = Vector3.unpack(data[offset:offset+12])
+        pos = Vector3.unpack_from(data, offset)
         offset += 12
-        trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
 
         # Size
-        marker_size, = FloatValue.unpack(data[offset:offset+4])
+        marker_size, = FloatValue.unpack_from(data, offset)
         offset += 4
-        trace_mf("\tMarker Size: %3.2f" % marker_size)
+        if TRACE_MF:
+            trace_mf("\tMarker Size: %3.2f" % marker_size)
 
         # Params
-        marker_params, = struct.unpack('h', data[offset:offset+2])
+        marker_params, = ShortValue.unpack_from(data, offset)
         offset += 2
-        trace_mf("\tParams     :", marker_params)
+        if TRACE_MF:
+            trace_mf("\tParams     :", marker_params)
 
         # Residual
-        residual, = FloatValue.unpack(data[offset:offset+4])
+        residual, = FloatValue.unpack_from(data, offset)
         offset += 4
-        trace_mf("\tResidual   : %3.2f" % residual)
+        if TRACE_MF:
+            trace_mf("\tResidual   : %3.2f" % residual)
 
         marker_data = MoCapData.AssetMarkerData(marker_id, pos, marker_size, marker_params, residual) #type: ignore  # noqa E501
         return offset, marker_data
 
-    def __unpack_asset_data(self, data, packet_size, major, minor):
+    def __unpack_asset_data(self, data, offset, packet_size, major, minor, plan):
         asset_data = MoCapData.AssetData()
 
-        offset = 0
-
         # Asset Count
-        asset_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        asset_count, = IntValue.unpack_from(data, offset)
         offset += 4
-        trace_mf("Asset Count:", asset_count)
+        if TRACE_MF:
+            trace_mf("Asset Count:", asset_count)
 
         # Get data size (4 bytes)
-        offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
-        offset += offset_tmp
+        offset, unpackedDataSize = self.__unpack_data_size(data, offset, major, minor, plan) #type: ignore  # noqa E501
 
         # Unpack assets
         for asset_num in range(0, asset_count):
-            rel_offset, asset = self.__unpack_asset(data[offset:], major, minor, asset_num) #type: ignore  # noqa E501
-            offset += rel_offset
+            offset, asset = self.__unpack_asset(data, offset, major, minor, asset_num) #type: ignore  # noqa E501
             asset_data.add_asset(asset)
 
         return offset, asset_data
@@ -1909,6 +2799,12 @@ class NatNetClient:
         self.__nat_net_stream_version_server[1] = nnsvs[1]
         self.__nat_net_stream_version_server[2] = nnsvs[2]
         self.__nat_net_stream_version_server[3] = nnsvs[3]
+
+        # High resolution clock frequency (NatNet 3.0 and later)
+        if len(data) >= offset + 8:
+            self.__high_resolution_clock_frequency = struct.unpack_from('<Q', data, offset)[0] #type: ignore  # noqa E501
+            offset += 8
+
         if (self.__nat_net_requested_version[0] == 0) and\
            (self.__nat_net_requested_version[1] == 0):
             print("resetting requested version to %d %d %d %d from %d %d %d %d" % ( #type: ignore  # noqa E501
@@ -1928,6 +2824,7 @@ class NatNetClient:
             # Determine if the bitstream version can be changed
             if (self.__nat_net_stream_version_server[0] >= 4) and (self.use_multicast is False): #type: ignore  # noqa E501
                 self.__can_change_bitstream_version = True
+            self.__build_decode_plan()
 
         trace_mf("Sending Application Name: ", self.__application_name)
         trace_mf("NatNetVersion ", str(self.__nat_net_stream_version_server[0]), " ", #type: ignore  # noqa E501
@@ -1939,6 +2836,9 @@ class NatNetClient:
                                  , str(self.__server_version[1]), " " #type: ignore  # noqa E203
                                  , str(self.__server_version[2]), " " #type: ignore  # noqa E203
                                  , str(self.__server_version[3]))
+
+        # Last, so wait_for_server_info returns with the version set up
+        self.__server_info_event.set()
         return offset
 
     # __unpack_bitstream_info is for local use of the client
@@ -1957,7 +2857,11 @@ class NatNetClient:
     def __command_thread_function(self, in_socket, stop, gprint_level, thread_option): #type: ignore  # noqa E501
         message_id_dict = {}
         if not self.use_multicast:
-            in_socket.settimeout(2.0)
+            if thread_option == 'c':
+                in_socket.settimeout(1.0)
+            else:
+                in_socket.settimeout(2.0)
+        last_keep_alive_time = 0.0
         data = bytearray(0) #type: ignore  # noqa F841
         # 64k buffer size
         recv_buffer_size = 128*1024
@@ -1969,6 +2873,7 @@ class NatNetClient:
             # Block for input
             try:
                 buffer_list[buffer_list_recv_index], addr = in_socket.recvfrom(recv_buffer_size) #type: ignore  # noqa E501
+                arrival_time = time.perf_counter()
                 buffer_list_in_use_index = buffer_list_recv_index
                 buffer_list_recv_index = (buffer_list_recv_index + 1) % buffer_list_size #type: ignore  # noqa E501
             except socket.error as msg: #type: ignore  # noqa F841
@@ -2001,15 +2906,18 @@ class NatNetClient:
                             print_level = 1
                         else:
                             print_level = 0
-                message_id = self.__process_message(buffer_list[buffer_list_in_use_index], print_level) #type: ignore  # noqa E501
+                message_id = self.__process_message(buffer_list[buffer_list_in_use_index], print_level, arrival_time) #type: ignore  # noqa E501
                 buffer_list[buffer_list_in_use_index] = bytearray(0)
 
             if not self.use_multicast:
                 if not stop():
-                    # provides option for users to use prompting
-                    if thread_option == 'c':
-                        time.sleep(1)
-                    self.send_keep_alive(in_socket, self.server_ip_address, self.command_port) #type: ignore  # noqa E501
+                    # provides option for users to use prompting: keep
+                    # alives go out at most once a second, without holding
+                    # up the next command response
+                    if (thread_option != 'c') or \
+                       (time.time() - last_keep_alive_time >= 1.0):
+                        self.send_keep_alive(in_socket, self.server_ip_address, self.command_port) #type: ignore  # noqa E501
+                        last_keep_alive_time = time.time()
         return 0
 
     def __data_thread_function(self, in_socket, stop, gprint_level):
@@ -2021,6 +2929,7 @@ class NatNetClient:
             # Block for input
             try:
                 data, addr = in_socket.recvfrom(recv_buffer_size)
+                arrival_time = time.perf_counter()
             except socket.error as msg:
                 if not stop():
                     print("ERROR: data socket access error occurred:\n  %s" % msg) #type: ignore  # noqa E501
@@ -2049,13 +2958,89 @@ class NatNetClient:
                             print_level = 1
                         else:
                             print_level = 0
-                message_id = self.__process_message(data, print_level)
+                message_id = self.__process_message(data, print_level, arrival_time) #type: ignore  # noqa E501
                 data = bytearray(0)
 
         return 0
 
-    def __process_message(self, data: bytes, print_level=0):
+    def __recv_pending_into(self, in_socket, buffer, nowait_flag):
+        """Receives one already queued datagram into buffer without
+        blocking. Returns 0 when nothing is pending"""
+        try:
+            if nowait_flag:
+                return in_socket.recv_into(buffer, 0, nowait_flag)
+            ready_list, _, _ = select.select([in_socket], [], [], 0)
+            if not ready_list:
+                return 0
+            return in_socket.recv_into(buffer)
+        except (BlockingIOError, InterruptedError):
+            return 0
+
+    def __data_thread_function_batched(self, in_socket, stop, gprint_level):
+        """Data thread variant that blocks for the first datagram, drains
+        every datagram already queued into a ring of preallocated buffers
+        and then decodes the whole batch"""
+        message_id_dict = {}
+        # 64k buffer size
+        recv_buffer_size = 128*1024
+        batch_size = self.receive_batch_size
+        buffer_list = [bytearray(recv_buffer_size) for _ in range(batch_size)]
+        view_list = [memoryview(buffer) for buffer in buffer_list]
+        size_list = [0] * batch_size
+        # receive time of each datagram, as the batch is decoded after it
+        # is drained
+        arrival_time_list = [0.0] * batch_size
+        # MSG_DONTWAIT only bypasses the wait on sockets without a timeout
+        # and is not available on Windows; fall back to a zero select.
+        nowait_flag = 0
+        if in_socket.gettimeout() is None:
+            nowait_flag = getattr(socket, "MSG_DONTWAIT", 0)
+        while not stop():
+            batch_count = 0
+            # Block for input
+            try:
+                size_list[0] = in_socket.recv_into(buffer_list[0])
+                arrival_time_list[0] = time.perf_counter()
+                batch_count = 1
+                while batch_count < batch_size:
+                    size = self.__recv_pending_into(in_socket, buffer_list[batch_count], nowait_flag) #type: ignore  # noqa E501
+                    if size <= 0:
+                        break
+                    size_list[batch_count] = size
+                    arrival_time_list[batch_count] = time.perf_counter()
+                    batch_count += 1
+            except socket.error as msg:
+                if not stop():
+                    print("ERROR: data socket access error occurred:\n  %s" % msg) #type: ignore  # noqa E501
+                    return 1
+            if batch_count > 0:
+                self.__receive_batch_counts[batch_count] = \
+                    self.__receive_batch_counts.get(batch_count, 0) + 1
+            for i in range(batch_count):
+                if size_list[i] <= 0:
+                    continue
+                data = view_list[i][:size_list[i]]
+                # peek ahead at message_id
+                message_id = get_message_id(data)
+                tmp_str = "mi_%1.1d" % message_id
+                if tmp_str not in message_id_dict:
+                    message_id_dict[tmp_str] = 0
+                message_id_dict[tmp_str] += 1
+                print_level = gprint_level()
+                if message_id == self.NAT_FRAMEOFDATA:
+                    if print_level > 0:
+                        if (message_id_dict[tmp_str] % print_level) == 0:
+                            print_level = 1
+                        else:
+                            print_level = 0
+                message_id = self.__process_message(data, print_level, arrival_time_list[i]) #type: ignore  # noqa E501
+
+        return 0
+
+    def __process_message(self, data: bytes, print_level=0, arrival_time=None): #type: ignore  # noqa E501
         # return message ID
+        # arrival_time is the time.perf_counter() the datagram was received
+        # at, default now
         major = self.get_major()
         minor = self.get_minor()
 
@@ -2067,23 +3052,58 @@ class NatNetClient:
                                   , str(self.__nat_net_requested_version[2]), " " #type: ignore  # noqa E501
                                   , str(self.__nat_net_requested_version[3]))
 
+        capture = self.__capture
+        if capture is not None:
+            capture.record_datagram(data, time.time())
+
         message_id = get_message_id(data)
+        frame_stats = self.__frame_stats
+        if frame_stats is not None:
+            frame_stats.add_message(message_id)
 
-        packet_size = int.from_bytes(data[2:4], byteorder='little', signed=True) #type: ignore  # noqa E501
+        packet_size = int.from_bytes(data[2:4], byteorder='little', signed=False) #type: ignore  # noqa E501
 
         # skip the 4 bytes for message ID and packet_size
         offset = 4
         if message_id == self.NAT_FRAMEOFDATA:
-            trace("Message ID : %3.1d NAT_FRAMEOFDATA" % message_id)
-            trace("Packet Size: ", packet_size)
-
-            offset_tmp, mocap_data = self.__unpack_mocap_data(data[offset:], packet_size, major, minor) #type: ignore  # noqa E501
+            if TRACE:
+                trace("Message ID : %3.1d NAT_FRAMEOFDATA" % message_id)
+            if TRACE:
+                trace("Packet Size: ", packet_size)
+            if frame_stats is not None:
+                decode_start_time = time.perf_counter()
+                if arrival_time is None:
+                    arrival_time = decode_start_time
+
+            # one plan for the whole frame, see __build_decode_plan
+            plan = self.__get_decode_plan()
+            # A frame shorter than the layout of the decoded version, e.g.
+            # truncated or sent with another bitstream version, is skipped
+            # so the receive thread keeps going
+            try:
+                if plan.columnar_frames:
+                    offset_tmp, mocap_data = self.__unpack_columnar_frame(memoryview(data)[offset:], packet_size, plan.major, plan.minor, plan) #type: ignore  # noqa E501
+                else:
+                    offset_tmp, mocap_data = self.__unpack_mocap_data(memoryview(data)[offset:], packet_size, plan.major, plan.minor, plan) #type: ignore  # noqa E501
+            except (struct.error, ValueError) as msg:
+                print("WARNING: Malformed frame of data skipped for NatNet %d.%d: %s" % (plan.major, plan.minor, msg)) #type: ignore  # noqa E501
+                if frame_stats is not None:
+                    frame_stats.add_malformed_frame()
+                return message_id
             offset += offset_tmp
-            print("MoCap Frame: %d\n" % (mocap_data.prefix_data.frame_number))
+            if frame_stats is not None:
+                decode_end_time = time.perf_counter()
+                frame_stats.add_frame(mocap_data, arrival_time, decode_end_time - decode_start_time, self.__high_resolution_clock_frequency) #type: ignore  # noqa E501
+            self.__deliver_frame(mocap_data, offset_tmp, plan.has_assets)
+            if frame_stats is not None:
+                frame_stats.add_listener_time(time.perf_counter() - decode_end_time) #type: ignore  # noqa E501
             # get a string version of the data for output
             if print_level >= 1:
+                print("MoCap Frame: %d\n" % (mocap_data.prefix_data.frame_number)) #type: ignore  # noqa E501
                 mocap_data_str = mocap_data.get_as_string()
                 print(" %s\n" % mocap_data_str)
+            if self.__frame_queue is None:
+                self.__recycle_frame(mocap_data)
 
         elif message_id == self.NAT_MODELDEF:
             trace("Message ID : %3.1d NAT_MODELDEF" % message_id)
@@ -2112,6 +3132,9 @@ class NatNetClient:
                                                               data[offset+2],
                                                               data[offset+3]))
                 offset += 4
+                self.__set_command_response(command_response)
+                if self.command_response_listener is not None:
+                    self.command_response_listener(command_response)
             else:
                 show_remainder = False
                 message, separator, remainder = bytes(data[offset:]).partition(b'\0') #type: ignore  # noqa E501
@@ -2119,7 +3142,7 @@ class NatNetClient:
                     tmpString = message.decode('utf-8')
                     # Decode bitstream version
                     if (tmpString.startswith('Bitstream')):
-                        nn_version = self.__unpack_bitstream_info(data[offset:], packet_size, major, minor) #type: ignore  # noqa E501
+                        nn_version = self.__unpack_bitstream_info(message, packet_size, major, minor) #type: ignore  # noqa E501
                         # This is the current server version
                         if (len(nn_version) > 1):
                             for i in range(len(nn_version)):
@@ -2134,6 +3157,9 @@ class NatNetClient:
                           " separator:", separator, " remainder:", remainder)
                 else:
                     trace("Command response:", message.decode('utf-8'))
+                self.__set_command_response(message.decode('utf-8'))
+                if self.command_response_listener is not None:
+                    self.command_response_listener(message.decode('utf-8'))
         elif message_id == self.NAT_UNRECOGNIZED_REQUEST:
             trace("Message ID : %3.1d NAT_UNRECOGNIZED_REQUEST: " % message_id)
             trace("Packet Size: ", packet_size)
@@ -2152,6 +3178,13 @@ class NatNetClient:
         trace("End Packet\n-----------------")
         return message_id
 
+    def process_message(self, data, print_level=0, arrival_time=None):
+        """Decodes one NatNet message received outside of the client
+        threads, e.g. by AsyncNatNetClient, and returns its message id.
+        arrival_time is the time.perf_counter() it was received at, for
+        the frame statistics; default now."""
+        return self.__process_message(data, print_level, arrival_time)
+
     def send_request(self, in_socket, command, command_str, address):
         # Compose the message in our known message format
         packet_size = 0
@@ -2199,17 +3232,66 @@ class NatNetClient:
 
         return in_socket.sendto(data, address)
 
-    def send_command(self, command_str):
+    def send_command(self, command_str, wait=False, timeout=2.0):
+        """Sends a command to Motive and returns the number of bytes sent,
+        or -1 on failure.  With wait=True it instead blocks until the
+        command's NAT_RESPONSE arrives and returns it, an int for 4 byte
+        responses and a str otherwise, or None if nothing arrives within
+        timeout seconds.  Responses carry no request id, so every command
+        sent here takes its place in the order of sending and each
+        NAT_RESPONSE goes to the oldest place.  Responses to commands sent
+        without wait and responses that arrive after their command timed
+        out are dropped.  The command thread delivers responses, so do not
+        wait from a listener."""
         # print("Send command %s" %command_str)
-        nTries = 3
-        ret_val = -1
-        while nTries:
-            nTries -= 1
-            ret_val = self.send_request(self.command_socket, self.NAT_REQUEST,
-                                        command_str,  (self.server_ip_address, self.command_port))  #type: ignore  # noqa E501
-            if (ret_val != -1):
-                break
-        return ret_val
+        pending = [threading.Event(), None, wait, 0.0]
+        # Sending and queueing are one step, so concurrent callers queue in
+        # the order their commands were sent
+        with self.__pending_responses_lock:
+            nTries = 3
+            ret_val = -1
+            while nTries:
+                nTries -= 1
+                ret_val = self.send_request(self.command_socket, self.NAT_REQUEST,
+                                            command_str,  (self.server_ip_address, self.command_port))  #type: ignore  # noqa E501
+                if (ret_val != -1):
+                    break
+            if ret_val != -1:
+                pending[3] = time.monotonic()
+                self.__pending_responses.append(pending)
+        if (not wait) or (ret_val == -1):
+            return ret_val
+
+        if not pending[0].wait(timeout):
+            with self.__pending_responses_lock:
+                if not pending[0].is_set():
+                    # Keep the place so a late response is dropped instead
+                    # of answering the next command
+                    pending[2] = False
+                    print("ERROR: No response to command %s" % command_str)
+                    return None
+        return pending[1]
+
+    def __set_command_response(self, response):
+        """Hands a NAT_RESPONSE to the oldest command sent by send_command,
+        or drops it when nobody waits for that command any more"""
+        with self.__pending_responses_lock:
+            pending_responses = self.__pending_responses
+            # Places of commands whose response was lost
+            expiry_time = time.monotonic() - self.COMMAND_RESPONSE_EXPIRY
+            while pending_responses and (not pending_responses[0][2]) and \
+                    (pending_responses[0][3] < expiry_time):
+                pending_responses.popleft()
+            if pending_responses:
+                pending = pending_responses.popleft()
+                if pending[2]:
+                    pending[1] = response
+                    pending[0].set()
+
+    def wait_for_server_info(self, timeout=2.0):
+        """Blocks until the server info requested by run() arrives.
+        Returns False if it does not arrive within timeout seconds."""
+        return self.__server_info_event.wait(timeout)
 
         # return self.send_request(self.data_socket, self.NAT_REQUEST, command_str, (self.server_ip_address, self.command_port)) #type: ignore  # noqa E501
 
@@ -2244,7 +3326,9 @@ class NatNetClient:
     def get_server_version(self):
         return self.__server_version
 
-    def run(self, thread_option):
+    def open_sockets(self):
+        """Creates the data and command sockets without starting the client
+        threads"""
         # Create the data socket
         self.data_socket = self.__create_data_socket()
         if self.data_socket is None:
@@ -2257,14 +3341,28 @@ class NatNetClient:
             print("Could not open command channel")
             return False
         self.__is_locked = True
+        return True
+
+    def run(self, thread_option):
+        if not self.open_sockets():
+            return False
 
         self.stop_threads = False
 
         # Create a separate thread for receiving data packets
-        self.data_thread = Thread(target=self.__data_thread_function, args=(self.data_socket, lambda: self.stop_threads, lambda: self.print_level,)) #type: ignore  # noqa E501
+        data_thread_function = self.__data_thread_function
+        if self.receive_batch_size > 1:
+            data_thread_function = self.__data_thread_function_batched
+        self.data_thread = Thread(target=data_thread_function, args=(self.data_socket, lambda: self.stop_threads, lambda: self.print_level,)) #type: ignore  # noqa E501
         self.command_thread = Thread(target=self.__command_thread_function, args=(self.command_socket, lambda: self.stop_threads, lambda: self.print_level, thread_option,)) #type: ignore  # noqa E501
         if thread_option == 'd':
             print("starting data thread")
+            # Create a separate thread for calling the frame listeners
+            if self.frame_queue_size > 0:
+                frame_queue = FrameQueue(self.frame_queue_size, self.frame_queue_overflow_policy) #type: ignore  # noqa E501
+                self.delivery_thread = Thread(target=self.__delivery_thread_function, args=(frame_queue,)) #type: ignore  # noqa E501
+                self.delivery_thread.start()
+                self.__frame_queue = frame_queue
             self.command_thread.start()
             if self.command_thread.is_alive():
                 self.data_thread.start()
@@ -2287,8 +3385,18 @@ class NatNetClient:
     def shutdown(self):
         print("shutdown called")
         self.stop_threads = True
+        # a blocked data thread waits for room in the frame queue
+        if self.__frame_queue is not None:
+            self.__frame_queue.close()
         # closing sockets causes blocking recvfrom to throw
-        # an exception and break the loop
+        # an exception and break the loop.  On Linux close alone does not
+        # wake a blocked receiver, so shut the sockets down first.
+        for in_socket in (self.command_socket, self.data_socket):
+            try:
+                in_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                # unconnected UDP sockets report ENOTCONN but still wake
+                pass
         self.command_socket.close()
         self.data_socket.close()
         # attempt to join the threads back.
@@ -2296,3 +3404,6 @@ class NatNetClient:
             self.command_thread.join()
         if self.data_thread.is_alive():
             self.data_thread.join()
+        if (self.delivery_thread is not None) and self.delivery_thread.is_alive():
+            self.delivery_thread.join()
+        self.stop_capture()
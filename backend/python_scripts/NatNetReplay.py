@@ -0,0 +1,103 @@
+# OptiTrack NatNet capture replay
+#
+# Feeds a capture written by NatNetClient.start_capture back through the
+# decoder of a NatNetClient, without Motive or sockets, so decoder changes
+# can be measured offline.  Replay as fast as possible to benchmark
+# throughput, or at the original timing for soak tests.
+#
+#   replay = NatNetReplay("capture.nnfl")
+#   replay.client.new_frame_with_data_listener = receive_new_frame
+#   result = replay.run(realtime=False)
+#
+# or from a shell
+#   python NatNetReplay.py capture.nnfl [--realtime] [--speed 2] [--loops 10]
+# which prints the result and the client's get_stats() as JSON.
+
+import json
+import time
+
+from NatNetClient import NatNetClient, get_message_id
+from flight_recorder import FlightLogReader
+
+
+class NatNetReplay:
+    """Replays the raw NatNet messages of a capture into client.
+
+    The capture starts with the server info of the captured connection, so
+    a new client decodes with the captured NatNet version.  Messages are
+    decoded on the calling thread, including the client's listeners; a
+    client with a frame queue delivers them on its delivery thread only
+    once run() was called on it, so replay clients normally have none."""
+
+    def __init__(self, path, client=None):
+        if client is None:
+            client = NatNetClient()
+            client.set_print_level(0)
+        self.client = client
+        self.reader = FlightLogReader(path)
+        # (receive time, message) of the capture
+        self.messages = list(self.reader.datagrams())
+
+    def run(self, realtime=False, speed=1.0, loops=1):
+        """Replays the capture loops times and returns the message and frame
+        counts and rates.  With realtime each message is decoded when it was
+        received in the capture, scaled by speed, and lateness reports how
+        far behind that schedule the decoder fell."""
+        client = self.client
+        messages = self.messages
+        message_count = 0
+        frame_count = 0
+        max_lateness = 0.0
+        total_lateness = 0.0
+        start_time = time.perf_counter()
+        for _ in range(max(int(loops), 1)):
+            loop_start_time = time.perf_counter()
+            first_receive_time = messages[0][0] if messages else 0.0
+            for receive_time, data in messages:
+                if realtime:
+                    due_time = loop_start_time + (receive_time - first_receive_time) / speed #type: ignore  # noqa E501
+                    now = time.perf_counter()
+                    if now < due_time:
+                        time.sleep(due_time - now)
+                    else:
+                        max_lateness = max(max_lateness, now - due_time)
+                        total_lateness += now - due_time
+                if get_message_id(data) == client.NAT_FRAMEOFDATA:
+                    frame_count += 1
+                client.process_message(data)
+                message_count += 1
+        elapsed = time.perf_counter() - start_time
+        result = {"messages": message_count,
+                  "frames": frame_count,
+                  "elapsed_s": elapsed,
+                  "messages_per_s": message_count / elapsed if elapsed > 0 else 0.0, #type: ignore  # noqa E501
+                  "frames_per_s": frame_count / elapsed if elapsed > 0 else 0.0} #type: ignore  # noqa E501
+        if realtime:
+            result["max_lateness_ms"] = max_lateness * 1000.0
+            result["mean_lateness_ms"] = total_lateness * 1000.0 / message_count if message_count else 0.0 #type: ignore  # noqa E501
+        return result
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay a NatNet capture through NatNetClient") #type: ignore  # noqa E501
+    parser.add_argument("path", help="capture written by NatNetClient.start_capture") #type: ignore  # noqa E501
+    parser.add_argument("--realtime", action="store_true", help="replay at the captured timing") #type: ignore  # noqa E501
+    parser.add_argument("--speed", type=float, default=1.0, help="realtime speed factor") #type: ignore  # noqa E501
+    parser.add_argument("--loops", type=int, default=1, help="times to replay the capture") #type: ignore  # noqa E501
+    parser.add_argument("--decode-sections", nargs="*", default=None, help="NatNetClient.set_decode_sections, default all") #type: ignore  # noqa E501
+    parser.add_argument("--stats-window", type=int, default=100000, help="frames in the decode statistics") #type: ignore  # noqa E501
+    args = parser.parse_args()
+
+    client = NatNetClient()
+    client.set_print_level(0)
+    client.set_decode_sections(args.decode_sections)
+    client.set_stats_window(args.stats_window)
+    replay = NatNetReplay(args.path, client)
+    result = replay.run(args.realtime, args.speed, args.loops)
+    result["stats"] = client.get_stats()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
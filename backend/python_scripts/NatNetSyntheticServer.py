@@ -0,0 +1,523 @@
+# OptiTrack NatNet synthetic server
+#
+# Local stand-in for Motive, so NatNetClient throughput and frame loss can
+# be measured without a Motive machine.  The server answers NAT_CONNECT
+# with a configurable server and NatNet version, responds to commands
+# ("Bitstream" queries and changes, StartRecording, ...), describes its
+# assets in NAT_MODELDEF and streams generated NAT_FRAMEOFDATA packets with
+# rigid bodies, marker sets, labeled markers, skeletons, assets, force plates
+# and devices at a fixed rate.
+#
+#   server = NatNetSyntheticServer(nat_net_version=(4, 1), rate_hz=1000,
+#                                  rigid_body_count=10)
+#   server.start()
+#   client = NatNetClient()
+#   client.set_server_address("127.0.0.1")
+#   client.set_client_address("127.0.0.1")
+#   client.set_use_multicast(False)
+#   client.command_port = server.command_port
+#   client.run('d')
+#   ...
+#   print(server.get_counts())
+#   server.stop()
+#
+# or from a shell
+#   python NatNetSyntheticServer.py --rate 1000 --rigid-bodies 10 --version 4.1
+#
+# Streaming is unicast to every client that connected, as Motive does,
+# unless a multicast address is given.  Frames of the same frame number
+# are identical, so captures of the synthetic stream are reproducible.
+
+import math
+import random
+import socket
+import struct
+import threading
+import time
+
+from NatNetClient import NatNetClient, get_message_id
+
+
+def build_server_info(nat_net_version=(4, 1), server_version=(3, 1, 0, 0),
+                      application_name="Motive", clock_frequency=10000000,
+                      multicast_address=None, data_port=1511):
+    """Returns the NAT_SERVERINFO packet a server of nat_net_version answers
+    NAT_CONNECT with"""
+    payload = application_name.encode('utf-8')[:255].ljust(256, b'\0')
+    payload += bytes(server_version)
+    payload += bytes([nat_net_version[0], nat_net_version[1], 0, 0])
+    payload += struct.pack('<Q', clock_frequency)
+    # NatNet 3.0 and later: connection info (multicast, address, port)
+    if multicast_address is not None:
+        payload += struct.pack('<?4sH', True, socket.inet_aton(multicast_address), data_port) #type: ignore  # noqa E501
+    else:
+        payload += struct.pack('<?4sH', False, bytes(4), 0)
+    return struct.pack('<hH', NatNetClient.NAT_SERVERINFO, len(payload)) + payload #type: ignore  # noqa E501
+
+
+class SyntheticFrameGenerator:
+    """Builds NAT_FRAMEOFDATA packets in the layout of one NatNet version.
+
+    Rigid bodies, skeleton bones and assets move on circles and markers
+    around them, so consecutive frames differ; everything else is fixed per
+    seed.  Counts of zero leave a section empty."""
+
+    def __init__(self, nat_net_version=(4, 1), rigid_body_count=4,
+                 marker_set_count=1, markers_per_set=5,
+                 legacy_marker_count=0, labeled_marker_count=6,
+                 skeleton_count=0, bones_per_skeleton=2, asset_count=0,
+                 force_plate_count=0, device_count=0, rate_hz=120.0, seed=7):
+        self.major = nat_net_version[0]
+        self.minor = nat_net_version[1]
+        self.rigid_body_count = rigid_body_count
+        self.marker_set_count = marker_set_count
+        self.markers_per_set = markers_per_set
+        self.legacy_marker_count = legacy_marker_count
+        self.labeled_marker_count = labeled_marker_count
+        self.skeleton_count = skeleton_count
+        self.bones_per_skeleton = bones_per_skeleton
+        self.asset_count = asset_count
+        self.force_plate_count = force_plate_count
+        self.device_count = device_count
+        self.rate_hz = rate_hz
+        rnd = random.Random(seed)
+        # (center x, y, z, radius, angular speed, phase) of each moving
+        # rigid body, bone and asset rigid body
+        self.__paths = [(rnd.uniform(-3, 3), rnd.uniform(0.5, 2.5), rnd.uniform(-3, 3), #type: ignore  # noqa E501
+                         rnd.uniform(0.2, 1.5), rnd.uniform(0.5, 3.0), rnd.uniform(0, 2 * math.pi)) #type: ignore  # noqa E501
+                        for _ in range(max(rigid_body_count, bones_per_skeleton, 1) + 1)] #type: ignore  # noqa E501
+        self.__marker_offsets = [(rnd.uniform(-0.1, 0.1), rnd.uniform(-0.1, 0.1), rnd.uniform(-0.1, 0.1)) #type: ignore  # noqa E501
+                                 for _ in range(max(markers_per_set, labeled_marker_count, legacy_marker_count, 3))] #type: ignore  # noqa E501
+
+    def set_nat_net_version(self, major, minor):
+        self.major = major
+        self.minor = minor
+
+    def __version_at_least(self, major, minor):
+        return (self.major > major) or ((self.major == major) and (self.minor >= minor)) #type: ignore  # noqa E501
+
+    def __section(self, count, payload):
+        # NatNet 4.1 and later follow each count with the section's size
+        if self.__version_at_least(4, 1):
+            return struct.pack('<ii', count, len(payload)) + payload
+        return struct.pack('<i', count) + payload
+
+    def __pose(self, path_index, t):
+        cx, cy, cz, radius, speed, phase = self.__paths[path_index % len(self.__paths)] #type: ignore  # noqa E501
+        angle = phase + speed * t
+        pos = (cx + radius * math.cos(angle), cy, cz + radius * math.sin(angle))
+        # yaw about the vertical axis, as x y z w
+        rot = (0.0, math.sin(angle / 2), 0.0, math.cos(angle / 2))
+        return pos, rot
+
+    def __rigid_body(self, rb_id, path_index, t):
+        pos, rot = self.__pose(path_index, t)
+        out = struct.pack('<i7f', rb_id, pos[0], pos[1], pos[2], rot[0], rot[1], rot[2], rot[3]) #type: ignore  # noqa E501
+        if self.major >= 3:
+            # mean marker error and tracking valid
+            return out + struct.pack('<fh', 0.0005, 1)
+        marker_count = 3
+        out += struct.pack('<i', marker_count)
+        for i in range(marker_count):
+            dx, dy, dz = self.__marker_offsets[i]
+            out += struct.pack('<3f', pos[0] + dx, pos[1] + dy, pos[2] + dz)
+        if self.major >= 2:
+            out += struct.pack('<%di' % marker_count, *range(marker_count))
+            out += struct.pack('<%df' % marker_count, *([0.014] * marker_count))
+            out += struct.pack('<f', 0.0005)
+            if self.__version_at_least(2, 6):
+                out += struct.pack('<h', 1)
+        return out
+
+    def __markers(self, count, center):
+        return b"".join(struct.pack('<3f', center[0] + dx, center[1] + dy, center[2] + dz) #type: ignore  # noqa E501
+                        for dx, dy, dz in self.__marker_offsets[:count])
+
+    def build(self, frame_number, timestamp=None, stamps=None, is_recording=False): #type: ignore  # noqa E501
+        """Returns the NAT_FRAMEOFDATA packet of frame_number.  timestamp
+        defaults to frame_number / rate_hz, stamps to the camera mid
+        exposure, data received and transmit ticks of a 10 MHz clock."""
+        t = frame_number / float(self.rate_hz)
+        if timestamp is None:
+            timestamp = t
+        if stamps is None:
+            ticks = int(t * 10000000)
+            stamps = (ticks, ticks + 2000, ticks + 4000)
+        out = struct.pack('<i', frame_number)
+
+        # Marker sets
+        payload = b""
+        for s in range(self.marker_set_count):
+            center, _ = self.__pose(s, t)
+            payload += ('set_%d' % s).encode('utf-8') + b'\0'
+            payload += struct.pack('<i', self.markers_per_set)
+            payload += self.__markers(self.markers_per_set, center)
+        out += self.__section(self.marker_set_count, payload)
+
+        # Legacy unlabeled markers
+        out += self.__section(self.legacy_marker_count, self.__markers(self.legacy_marker_count, (0.0, 0.0, 0.0))) #type: ignore  # noqa E501
+
+        # Rigid bodies
+        payload = b"".join(self.__rigid_body(i + 1, i, t) for i in range(self.rigid_body_count)) #type: ignore  # noqa E501
+        out += self.__section(self.rigid_body_count, payload)
+
+        # Skeletons (NatNet 2.1 and later)
+        if self.__version_at_least(2, 1):
+            payload = b""
+            for s in range(self.skeleton_count):
+                payload += struct.pack('<ii', 100 + s, self.bones_per_skeleton)
+                for b in range(self.bones_per_skeleton):
+                    payload += self.__rigid_body(b + 1, b, t)
+            out += self.__section(self.skeleton_count, payload)
+
+        # Assets (NatNet 4.1 and later)
+        if self.__version_at_least(4, 1):
+            payload = b""
+            for a in range(self.asset_count):
+                pos, rot = self.__pose(a, t)
+                payload += struct.pack('<ii', 200 + a, 1)
+                payload += struct.pack('<i7ffh', 1, pos[0], pos[1], pos[2], rot[0], rot[1], rot[2], rot[3], 0.0005, 1) #type: ignore  # noqa E501
+                payload += struct.pack('<i', 1)
+                payload += struct.pack('<i3ffhf', 5, pos[0], pos[1], pos[2], 0.014, 2, 0.0002) #type: ignore  # noqa E501
+            out += self.__section(self.asset_count, payload)
+
+        # Labeled markers (NatNet 2.4 and later)
+        if self.__version_at_least(2, 4):
+            center, _ = self.__pose(0, t)
+            payload = b""
+            for i in range(self.labeled_marker_count):
+                dx, dy, dz = self.__marker_offsets[i]
+                # model id 1 in the high 16 bits, marker id in the low
+                payload += struct.pack('<i3ff', (1 << 16) | (i + 1), center[0] + dx, center[1] + dy, center[2] + dz, 0.014) #type: ignore  # noqa E501
+                if self.__version_at_least(2, 6):
+                    payload += struct.pack('<h', 4)
+                if self.major >= 3:
+                    payload += struct.pack('<f', 0.0003)
+            out += self.__section(self.labeled_marker_count, payload)
+
+        # Force plates (NatNet 2.9 and later), 2 channels of 3 samples
+        if self.__version_at_least(2, 9):
+            payload = b""
+            for i in range(self.force_plate_count):
+                payload += struct.pack('<ii', i + 1, 2)
+                for c in range(2):
+                    payload += struct.pack('<i3f', 3, 10.0 * c + math.sin(t), 10.0 * c + math.cos(t), 10.0 * c) #type: ignore  # noqa E501
+            out += self.__section(self.force_plate_count, payload)
+
+        # Devices (NatNet 2.11 and later), 1 channel of 2 samples
+        if self.__version_at_least(2, 11):
+            payload = b""
+            for i in range(self.device_count):
+                payload += struct.pack('<iii2f', i + 1, 1, 2, math.sin(t), math.cos(t)) #type: ignore  # noqa E501
+            out += self.__section(self.device_count, payload)
+
+        # Frame suffix: timecode, timecode sub, timestamp, stamps and params
+        out += struct.pack('<ii', 0, 0)
+        if self.major >= 3:
+            out += struct.pack('<d3q', timestamp, stamps[0], stamps[1], stamps[2]) #type: ignore  # noqa E501
+            if self.__version_at_least(4, 1):
+                out += struct.pack('<II', int(timestamp), int((timestamp % 1.0) * 1000000000)) #type: ignore  # noqa E501
+        elif self.__version_at_least(2, 7):
+            out += struct.pack('<d', timestamp)
+        else:
+            out += struct.pack('<f', timestamp)
+        out += struct.pack('<h', 0x01 if is_recording else 0)
+        return struct.pack('<hH', NatNetClient.NAT_FRAMEOFDATA, len(out)) + out #type: ignore  # noqa E501
+
+    def __rigid_body_description(self, name, rb_id, parent_id, path_index):
+        pos, rot = self.__pose(path_index, 0.0)
+        out = name.encode('utf-8') + b'\0'
+        out += struct.pack('<ii3f', rb_id, parent_id, pos[0], pos[1], pos[2])
+        if self.major < 3:
+            return out
+        if self.__version_at_least(4, 2):
+            out += struct.pack('<4f', rot[0], rot[1], rot[2], rot[3])
+        marker_count = 3
+        out += struct.pack('<i', marker_count)
+        for i in range(marker_count):
+            out += struct.pack('<3f', *self.__marker_offsets[i])
+        out += struct.pack('<%di' % marker_count, *range(1, marker_count + 1))
+        if self.major >= 4:
+            for i in range(marker_count):
+                out += ('Marker%d' % (i + 1)).encode('utf-8') + b'\0'
+        return out
+
+    def __dataset(self, data_type, payload):
+        # NatNet 4.1 and later follow each type with the dataset's size
+        if self.__version_at_least(4, 1):
+            return struct.pack('<ii', data_type, len(payload)) + payload
+        return struct.pack('<i', data_type) + payload
+
+    def build_model_def(self):
+        """Returns the NAT_MODELDEF packet describing the assets of build()
+        frames.  Force plates and devices are described from NatNet 3.0,
+        cameras from 4.0 and assets from 4.1, as by Motive."""
+        datasets = []
+
+        # Marker sets (type 0)
+        for s in range(self.marker_set_count):
+            payload = ('set_%d' % s).encode('utf-8') + b'\0'
+            payload += struct.pack('<i', self.markers_per_set)
+            for i in range(self.markers_per_set):
+                payload += ('set_%d_%d' % (s, i + 1)).encode('utf-8') + b'\0'
+            datasets.append(self.__dataset(0, payload))
+
+        # Rigid bodies (type 1)
+        for i in range(self.rigid_body_count):
+            datasets.append(self.__dataset(1, self.__rigid_body_description('RigidBody_%d' % (i + 1), i + 1, -1, i))) #type: ignore  # noqa E501
+
+        # Skeletons (type 2), each bone the parent of the next
+        for s in range(self.skeleton_count):
+            payload = ('Skeleton_%d' % s).encode('utf-8') + b'\0'
+            payload += struct.pack('<ii', 100 + s, self.bones_per_skeleton)
+            for b in range(self.bones_per_skeleton):
+                payload += self.__rigid_body_description('Bone_%d' % (b + 1), b + 1, b if b > 0 else -1, b) #type: ignore  # noqa E501
+            datasets.append(self.__dataset(2, payload))
+
+        if self.major >= 3:
+            # Force plates (type 3), 600 x 400 mm with 2 channels
+            for i in range(self.force_plate_count):
+                payload = struct.pack('<i', i + 1)
+                payload += ('FP-%04d' % (i + 1)).encode('utf-8') + b'\0'
+                payload += struct.pack('<2f3f', 600.0, 400.0, 0.0, 0.0, 0.0)
+                for row in range(12):
+                    payload += struct.pack('<12f', *[1.0 if column == row else 0.0 for column in range(12)]) #type: ignore  # noqa E501
+                payload += struct.pack('<12f', 0.3, 0.0, 0.2, -0.3, 0.0, 0.2, -0.3, 0.0, -0.2, 0.3, 0.0, -0.2) #type: ignore  # noqa E501
+                payload += struct.pack('<iii', 1, 0, 2)
+                payload += b'Fz\0Mz\0'
+                datasets.append(self.__dataset(3, payload))
+
+            # Devices (type 4) with 1 channel
+            for i in range(self.device_count):
+                payload = struct.pack('<i', i + 1)
+                payload += ('Device_%d' % (i + 1)).encode('utf-8') + b'\0'
+                payload += ('DEV-%04d' % (i + 1)).encode('utf-8') + b'\0'
+                payload += struct.pack('<iii', 1, 0, 1)
+                payload += b'Channel_1\0'
+                datasets.append(self.__dataset(4, payload))
+
+        # Cameras (type 5), one per rigid body path
+        if self.major >= 4:
+            for i in range(max(self.rigid_body_count, 1)):
+                pos, rot = self.__pose(i, 0.0)
+                payload = ('Camera_%d' % (i + 1)).encode('utf-8') + b'\0'
+                payload += struct.pack('<3f4f', pos[0], 3.0, pos[2], rot[0], rot[1], rot[2], rot[3]) #type: ignore  # noqa E501
+                datasets.append(self.__dataset(5, payload))
+
+        # Assets (type 6), one rigid body and one marker each
+        if self.__version_at_least(4, 1):
+            for a in range(self.asset_count):
+                pos, _ = self.__pose(a, 0.0)
+                payload = ('Asset_%d' % a).encode('utf-8') + b'\0'
+                payload += struct.pack('<iii', 1, 200 + a, 1)
+                payload += self.__rigid_body_description('AssetBody_%d' % a, 1, -1, a) #type: ignore  # noqa E501
+                payload += struct.pack('<i', 1)
+                payload += ('AssetMarker_%d' % a).encode('utf-8') + b'\0'
+                payload += struct.pack('<i3ffh', 5, pos[0], pos[1], pos[2], 0.014, 2) #type: ignore  # noqa E501
+                datasets.append(self.__dataset(6, payload))
+
+        out = struct.pack('<i', len(datasets)) + b"".join(datasets)
+        return struct.pack('<hH', NatNetClient.NAT_MODELDEF, len(out)) + out #type: ignore  # noqa E501
+
+
+class NatNetSyntheticServer:
+    """UDP NatNet server on address streaming SyntheticFrameGenerator
+    frames at rate_hz.  command_port 0 picks a free port, read it back from
+    command_port after start()."""
+
+    # Unicast clients that sent no keep alive for this long stop receiving
+    # frames, as with Motive
+    CLIENT_TIMEOUT = 5.0
+
+    def __init__(self, address="127.0.0.1", command_port=0,
+                 server_version=(3, 1, 0, 0), nat_net_version=(4, 1),
+                 rate_hz=120.0, multicast_address=None, data_port=1511,
+                 application_name="Motive", clock_frequency=10000000,
+                 **generator_options):
+        self.address = address
+        self.command_port = command_port
+        self.server_version = tuple(server_version)
+        self.nat_net_version = tuple(nat_net_version)
+        self.rate_hz = rate_hz
+        self.multicast_address = multicast_address
+        self.data_port = data_port
+        self.application_name = application_name
+        self.clock_frequency = clock_frequency
+        self.generator = SyntheticFrameGenerator(nat_net_version, rate_hz=rate_hz, **generator_options) #type: ignore  # noqa E501
+        self.commands = []
+        self.is_recording = False
+        self.frame_count = 0
+        self.late_frame_count = 0
+        self.send_error_count = 0
+        self.frame_number = 0
+        # client address: time of its last message
+        self.__clients = {}
+        self.__lock = threading.Lock()
+        self.__stop = False
+        self.__socket = None
+        self.__threads = []
+
+    def start(self):
+        command_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        command_socket.bind((self.address, self.command_port))
+        command_socket.settimeout(0.5)
+        if self.multicast_address is not None:
+            command_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.address)) #type: ignore  # noqa E501
+            command_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1) #type: ignore  # noqa E501
+        self.command_port = command_socket.getsockname()[1]
+        self.__socket = command_socket
+        self.__stop = False
+        self.__threads = [threading.Thread(target=self.__command_thread_function, daemon=True), #type: ignore  # noqa E501
+                          threading.Thread(target=self.__stream_thread_function, daemon=True)] #type: ignore  # noqa E501
+        for thread in self.__threads:
+            thread.start()
+        return self.command_port
+
+    def stop(self):
+        self.__stop = True
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
+        if self.__socket is not None:
+            self.__socket.close()
+            self.__socket = None
+
+    def get_counts(self):
+        with self.__lock:
+            client_count = len(self.__clients)
+        return {"frames_sent": self.frame_count,
+                "late_frames": self.late_frame_count,
+                "send_errors": self.send_error_count,
+                "last_frame_number": self.frame_number,
+                "clients": client_count}
+
+    def __send(self, message_id, payload, address):
+        self.__socket.sendto(struct.pack('<hH', message_id, len(payload)) + payload, address) #type: ignore  # noqa E501
+
+    def __command_response(self, command):
+        """Response payload of a NAT_REQUEST command string"""
+        if command == "Bitstream":
+            return ("Bitstream,%d.%d" % self.nat_net_version).encode('utf-8') + b'\0' #type: ignore  # noqa E501
+        if command.startswith("Bitstream,"):
+            try:
+                major, minor = (int(part) for part in command.split(",")[1].split(".")[:2]) #type: ignore  # noqa E501
+            except ValueError:
+                return struct.pack('<i', -1)
+            self.nat_net_version = (major, minor)
+            self.generator.set_nat_net_version(major, minor)
+            return struct.pack('<i', 0)
+        if command == "StartRecording":
+            self.is_recording = True
+        elif command == "StopRecording":
+            self.is_recording = False
+        return struct.pack('<i', 0)
+
+    def __command_thread_function(self):
+        while not self.__stop:
+            try:
+                data, address = self.__socket.recvfrom(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self.__stop:
+                    break
+                continue
+            if len(data) < 4:
+                continue
+            message_id = get_message_id(data)
+            packet_size = struct.unpack_from('<H', data, 2)[0]
+            with self.__lock:
+                self.__clients[address] = time.monotonic()
+            if message_id == NatNetClient.NAT_CONNECT:
+                self.__socket.sendto(build_server_info(self.nat_net_version, self.server_version, self.application_name, self.clock_frequency, self.multicast_address, self.data_port), address) #type: ignore  # noqa E501
+            elif message_id == NatNetClient.NAT_REQUEST:
+                command = bytes(data[4:4 + packet_size]).partition(b'\0')[0].decode('utf-8', 'replace') #type: ignore  # noqa E501
+                self.commands.append(command)
+                self.__send(NatNetClient.NAT_RESPONSE, self.__command_response(command), address) #type: ignore  # noqa E501
+            elif message_id == NatNetClient.NAT_REQUEST_MODELDEF:
+                self.__socket.sendto(self.generator.build_model_def(), address) #type: ignore  # noqa E501
+            elif message_id == NatNetClient.NAT_REQUEST_FRAMEOFDATA:
+                self.__socket.sendto(self.generator.build(max(self.frame_number, 1), is_recording=self.is_recording), address) #type: ignore  # noqa E501
+            elif message_id == NatNetClient.NAT_DISCONNECT:
+                with self.__lock:
+                    self.__clients.pop(address, None)
+            elif message_id != NatNetClient.NAT_KEEPALIVE:
+                self.__send(NatNetClient.NAT_UNRECOGNIZED_REQUEST, b"", address)
+
+    def __stream_thread_function(self):
+        interval = 1.0 / self.rate_hz
+        next_time = time.perf_counter()
+        while not self.__stop:
+            # sleep until just before the frame is due, then spin, since
+            # sleep alone overshoots by more than a 1 kHz period
+            now = time.perf_counter()
+            if next_time - now > 0.002:
+                time.sleep(next_time - now - 0.001)
+            while time.perf_counter() < next_time:
+                pass
+            next_time += interval
+            if time.perf_counter() > next_time:
+                # more than a whole period behind, skip ahead
+                self.late_frame_count += 1
+                next_time = time.perf_counter() + interval
+
+            self.frame_number += 1
+            packet = self.generator.build(self.frame_number, is_recording=self.is_recording) #type: ignore  # noqa E501
+            if self.multicast_address is not None:
+                addresses = [(self.multicast_address, self.data_port)]
+            else:
+                expired_time = time.monotonic() - self.CLIENT_TIMEOUT
+                with self.__lock:
+                    for address in [address for address, last_time in self.__clients.items() if last_time < expired_time]: #type: ignore  # noqa E501
+                        del self.__clients[address]
+                    addresses = list(self.__clients)
+            for address in addresses:
+                try:
+                    self.__socket.sendto(packet, address)
+                except OSError:
+                    self.send_error_count += 1
+            self.frame_count += 1
+
+
+def main():
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Synthetic NatNet server for local load testing") #type: ignore  # noqa E501
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1510, help="command port")
+    parser.add_argument("--version", default="4.1", help="NatNet version, e.g. 3.1") #type: ignore  # noqa E501
+    parser.add_argument("--rate", type=float, default=120.0, help="frames per second") #type: ignore  # noqa E501
+    parser.add_argument("--rigid-bodies", type=int, default=4)
+    parser.add_argument("--marker-sets", type=int, default=1)
+    parser.add_argument("--markers", type=int, default=5, help="markers per marker set") #type: ignore  # noqa E501
+    parser.add_argument("--labeled-markers", type=int, default=6)
+    parser.add_argument("--skeletons", type=int, default=0)
+    parser.add_argument("--assets", type=int, default=0)
+    parser.add_argument("--force-plates", type=int, default=0)
+    parser.add_argument("--devices", type=int, default=0)
+    parser.add_argument("--multicast", default=None, help="multicast address, default unicast") #type: ignore  # noqa E501
+    args = parser.parse_args()
+
+    major, minor = (int(part) for part in args.version.split(".")[:2])
+    server = NatNetSyntheticServer(args.address, args.port, nat_net_version=(major, minor), #type: ignore  # noqa E501
+                                   rate_hz=args.rate, multicast_address=args.multicast, #type: ignore  # noqa E501
+                                   rigid_body_count=args.rigid_bodies,
+                                   marker_set_count=args.marker_sets,
+                                   markers_per_set=args.markers,
+                                   labeled_marker_count=args.labeled_markers,
+                                   skeleton_count=args.skeletons,
+                                   asset_count=args.assets,
+                                   force_plate_count=args.force_plates,
+                                   device_count=args.devices)
+    server.start()
+    print("NatNet %d.%d synthetic server on %s:%d at %g Hz" % (major, minor, args.address, server.command_port, args.rate)) #type: ignore  # noqa E501
+    try:
+        while True:
+            time.sleep(5)
+            print(json.dumps(server.get_counts()))
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+# flight_recorder.py
+# Append-only binary log of the rigid body frames of a NatNet stream, so a
+# flight can be evaluated from the live stream instead of a Motive CSV
+# export.  FlightRecorder writes it from a new_frame_with_data_listener,
+# FlightLogReader loads it.  The same file format holds the raw datagram
+# captures of NatNetClient.start_capture, which NatNetReplay.py replays.
+#
+# "record_path" in the stdin config of optitrack_stdout.py and
+# optitrack_wrapper.py records the whole session to that file; the bridge
+# records between its start_flight_recording and stop_flight_recording
+# requests.  Every decoded frame is recorded, before any decimation.
+#
+# Everything is little-endian.  The file starts with a 32 byte header
+#   offset  type     field
+#   0       4 bytes  magic b"NNFL"
+#   4       uint32   layout version (1)
+#   8       float64  seconds since the epoch when the recording started
+#   16      16 bytes reserved
+# followed by blocks, each a 12 byte block header and its payload
+#   0       4 bytes  tag
+#   4       uint32   payload length in bytes (not counting this header)
+#   8       uint32   entry count
+#
+# b"RBCK" rigid body chunk: entry count frames.  The payload is entry count
+#   24 byte frame entries
+#     0       uint32   frame number
+#     4       uint32   rigid body count
+#     8       float64  Motive timestamp of the frame
+#     16      float64  seconds since the epoch when the frame was received
+#   followed by the rigid bodies of all those frames, in order, as the 48
+#   byte RIGID_BODY_RECORD of rigid_body_stream.py.
+# b"RAWC" raw datagram chunk: entry count NatNet messages.  The payload is
+#   entry count 12 byte entries
+#     0       float64  seconds since the epoch when the message was received
+#     8       uint32   message length in bytes
+#   followed by the messages, in order, exactly as received.
+# b"INDX" index: entry count 32 byte entries, one per chunk written since
+#   the previous index
+#     0       uint64   file offset of the chunk's block header
+#     8       uint32   frames (or messages) in the chunk
+#     12      uint32   first frame number (0 in raw datagram chunks)
+#     16      float64  first Motive timestamp (-1 in raw datagram chunks)
+#     24      float64  first receive time
+#   An index follows every index_interval chunks and ends a closed file.
+#
+# Readers skip unknown tags, and a block cut short by a crash ends the log.
+import os, queue, struct, threading, time
+from rigid_body_stream import RIGID_BODY_RECORD
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LOG_MAGIC = b"NNFL"
+LOG_VERSION = 1
+
+FILE_HEADER = struct.Struct('<4sId16x')
+BLOCK_HEADER = struct.Struct('<4sII')
+FRAME_ENTRY = struct.Struct('<IIdd')
+DATAGRAM_ENTRY = struct.Struct('<dI')
+INDEX_ENTRY = struct.Struct('<QIIdd')
+
+TAG_RIGID_BODY_CHUNK = b"RBCK"
+TAG_DATAGRAM_CHUNK = b"RAWC"
+TAG_INDEX = b"INDX"
+
+
+class FlightRecorder:
+    """Records rigid body frames or raw NatNet messages to path.
+
+    Frames are packed into the current chunk on the calling thread, which
+    costs about as much as the binary stdout format; full chunks are
+    written and flushed by a writer thread, so the receive thread never
+    waits on the disk.  A chunk is handed over after chunk_frames frames
+    or flush_interval seconds, also when the stream pauses, which bounds
+    what a crash can lose."""
+
+    def __init__(self, path, chunk_frames=360, index_interval=16, flush_interval=1.0): #type: ignore  # noqa E501
+        self.path = path
+        self.chunk_frames = max(int(chunk_frames), 1)
+        self.index_interval = max(int(index_interval), 1)
+        self.flush_interval = flush_interval
+        self.frame_count = 0
+        self.rigid_body_count = 0
+        self.datagram_count = 0
+        self.chunk_count = 0
+        self.byte_count = 0
+        self.__lock = threading.Lock()
+        self.__closed = False
+        self.__new_chunk()
+        self.__new_datagram_chunk()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__file = open(path, 'wb', buffering=1 << 20)
+        self.__write(FILE_HEADER.pack(LOG_MAGIC, LOG_VERSION, time.time()))
+        self.__file.flush()
+        # chunks since the last index, as INDEX_ENTRY tuples
+        self.__index_entries = []
+        self.__queue = queue.Queue()
+        self.__writer_thread = threading.Thread(target=self.__writer_thread_function) #type: ignore  # noqa E501
+        self.__writer_thread.daemon = True
+        self.__writer_thread.start()
+
+    def __new_chunk(self):
+        self.__chunk_entries = bytearray()
+        self.__chunk_records = bytearray()
+        self.__chunk_frame_count = 0
+        self.__chunk_start_time = time.monotonic()
+        self.__chunk_first = None
+
+    def __new_datagram_chunk(self):
+        self.__datagram_entries = bytearray()
+        self.__datagram_data = bytearray()
+        self.__datagram_chunk_count = 0
+        self.__datagram_chunk_start_time = time.monotonic()
+        self.__datagram_chunk_first = None
+
+    def record_frame(self, frame_number, rigid_body_list, motive_timestamp, timestamp): #type: ignore  # noqa E501
+        """Appends the MoCapData.RigidBody objects of one frame"""
+        with self.__lock:
+            if self.__closed:
+                return
+            if self.__chunk_first is None:
+                self.__chunk_first = (frame_number, motive_timestamp, timestamp)
+            count = len(rigid_body_list)
+            self.__chunk_entries += FRAME_ENTRY.pack(frame_number, count, motive_timestamp, timestamp) #type: ignore  # noqa E501
+            records = self.__chunk_records
+            offset = len(records)
+            records.extend(bytes(count * RIGID_BODY_RECORD.size))
+            for rigid_body in rigid_body_list:
+                pos = rigid_body.pos
+                rot = rigid_body.rot
+                RIGID_BODY_RECORD.pack_into(records, offset, frame_number, rigid_body.id_num, pos[0], pos[1], pos[2], rot[0], rot[1], rot[2], rot[3], timestamp, 1 if rigid_body.tracking_valid else 0) #type: ignore  # noqa E501
+                offset += RIGID_BODY_RECORD.size
+            self.__chunk_frame_count += 1
+            self.frame_count += 1
+            self.rigid_body_count += count
+            if (self.__chunk_frame_count >= self.chunk_frames) or (time.monotonic() - self.__chunk_start_time >= self.flush_interval): #type: ignore  # noqa E501
+                self.__hand_over_chunk()
+
+    def record_mocap_frame(self, data_dict, timestamp):
+        """Appends every rigid body of a new_frame_with_data_listener
+        frame"""
+        rigid_body_data = data_dict["mocap_data"].rigid_body_data
+        rigid_body_list = []
+        if rigid_body_data is not None:
+            rigid_body_list = rigid_body_data.rigid_body_list
+        motive_timestamp = data_dict["timestamp"]
+        if motive_timestamp is None:
+            motive_timestamp = -1.0
+        self.record_frame(data_dict["frame_number"], rigid_body_list, motive_timestamp, timestamp) #type: ignore  # noqa E501
+
+    def record_datagram(self, data, timestamp):
+        """Appends a copy of one raw NatNet message received at timestamp
+        (seconds since the epoch)"""
+        with self.__lock:
+            if self.__closed:
+                return
+            if self.__datagram_chunk_first is None:
+                self.__datagram_chunk_first = (0, -1.0, timestamp)
+            self.__datagram_entries += DATAGRAM_ENTRY.pack(timestamp, len(data))
+            self.__datagram_data += data
+            self.__datagram_chunk_count += 1
+            self.datagram_count += 1
+            if (self.__datagram_chunk_count >= self.chunk_frames) or (time.monotonic() - self.__datagram_chunk_start_time >= self.flush_interval): #type: ignore  # noqa E501
+                self.__hand_over_datagram_chunk()
+
+    def __hand_over_chunk(self):
+        if self.__chunk_frame_count == 0:
+            return
+        self.__queue.put((TAG_RIGID_BODY_CHUNK, self.__chunk_frame_count, self.__chunk_first, self.__chunk_entries, self.__chunk_records)) #type: ignore  # noqa E501
+        self.__new_chunk()
+
+    def __hand_over_datagram_chunk(self):
+        if self.__datagram_chunk_count == 0:
+            return
+        self.__queue.put((TAG_DATAGRAM_CHUNK, self.__datagram_chunk_count, self.__datagram_chunk_first, self.__datagram_entries, self.__datagram_data)) #type: ignore  # noqa E501
+        self.__new_datagram_chunk()
+
+    def __write(self, data):
+        self.__file.write(data)
+        self.byte_count += len(data)
+
+    def __write_index(self):
+        entries = self.__index_entries
+        if not entries:
+            return
+        payload = b"".join(INDEX_ENTRY.pack(*entry) for entry in entries)
+        self.__write(BLOCK_HEADER.pack(TAG_INDEX, len(payload), len(entries)))
+        self.__write(payload)
+        self.__index_entries = []
+
+    def __hand_over_stale_chunks(self):
+        """Hands over chunks that are flush_interval old while no frames
+        arrive to do it"""
+        with self.__lock:
+            if self.__closed:
+                return
+            now = time.monotonic()
+            if now - self.__chunk_start_time >= self.flush_interval:
+                self.__hand_over_chunk()
+            if now - self.__datagram_chunk_start_time >= self.flush_interval:
+                self.__hand_over_datagram_chunk()
+
+    def __writer_thread_function(self):
+        while True:
+            try:
+                item = self.__queue.get(timeout=max(self.flush_interval, 0.01)) #type: ignore  # noqa E501
+            except queue.Empty:
+                self.__hand_over_stale_chunks()
+                continue
+            if item is None:
+                break
+            tag, count, first, entries, payload = item
+            offset = self.byte_count
+            self.__write(BLOCK_HEADER.pack(tag, len(entries) + len(payload), count)) #type: ignore  # noqa E501
+            self.__write(entries)
+            self.__write(payload)
+            self.chunk_count += 1
+            self.__index_entries.append((offset, count) + first)
+            if len(self.__index_entries) >= self.index_interval:
+                self.__write_index()
+            self.__file.flush()
+
+    def get_counts(self):
+        return {"path": self.path,
+                "frames": self.frame_count,
+                "rigid_bodies": self.rigid_body_count,
+                "datagrams": self.datagram_count,
+                "chunks": self.chunk_count,
+                "bytes": self.byte_count,
+                "pending_chunks": self.__queue.qsize()}
+
+    def close(self):
+        """Writes the last chunk and the final index and closes the file"""
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__closed = True
+            self.__hand_over_chunk()
+            self.__hand_over_datagram_chunk()
+            self.__queue.put(None)
+        self.__writer_thread.join()
+        self.__write_index()
+        self.__file.close()
+
+
+class FlightLogReader:
+    """Loads a log written by FlightRecorder.  chunks and datagram_chunks
+    list the INDEX_ENTRY tuples of every complete rigid body and raw
+    datagram chunk in the file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as log_file:
+            self.data = log_file.read()
+        if len(self.data) < FILE_HEADER.size:
+            raise ValueError("%s is not a flight log" % path)
+        magic, version, self.start_time = FILE_HEADER.unpack_from(self.data, 0)
+        if (magic != LOG_MAGIC) or (version != LOG_VERSION):
+            raise ValueError("%s is not a version %d flight log" % (path, LOG_VERSION)) #type: ignore  # noqa E501
+        self.chunks = []
+        self.datagram_chunks = []
+        offset = FILE_HEADER.size
+        while offset + BLOCK_HEADER.size <= len(self.data):
+            tag, length, count = BLOCK_HEADER.unpack_from(self.data, offset)
+            if offset + BLOCK_HEADER.size + length > len(self.data):
+                break
+            if tag == TAG_RIGID_BODY_CHUNK and count > 0:
+                first = FRAME_ENTRY.unpack_from(self.data, offset + BLOCK_HEADER.size) #type: ignore  # noqa E501
+                self.chunks.append((offset, count, first[0], first[2], first[3]))
+            elif tag == TAG_DATAGRAM_CHUNK and count > 0:
+                first = DATAGRAM_ENTRY.unpack_from(self.data, offset + BLOCK_HEADER.size) #type: ignore  # noqa E501
+                self.datagram_chunks.append((offset, count, 0, -1.0, first[0]))
+            offset += BLOCK_HEADER.size + length
+
+    def get_frame_count(self):
+        return sum(chunk[1] for chunk in self.chunks)
+
+    def get_datagram_count(self):
+        return sum(chunk[1] for chunk in self.datagram_chunks)
+
+    def datagrams(self):
+        """Yields (receive time, message) for every raw NatNet message, the
+        message as a memoryview into the loaded file"""
+        view = memoryview(self.data)
+        for offset, count, _, _, _ in self.datagram_chunks:
+            entry_offset = offset + BLOCK_HEADER.size
+            data_offset = entry_offset + count * DATAGRAM_ENTRY.size
+            for timestamp, length in DATAGRAM_ENTRY.iter_unpack(view[entry_offset:data_offset]): #type: ignore  # noqa E501
+                yield timestamp, view[data_offset:data_offset + length]
+                data_offset += length
+
+    def frames(self):
+        """Yields the frames as the JSON frame records of
+        rigid_body_stream.py"""
+        for offset, count, _, _, _ in self.chunks:
+            entry_offset = offset + BLOCK_HEADER.size
+            record_offset = entry_offset + count * FRAME_ENTRY.size
+            for frame_number, rigid_body_count, motive_timestamp, timestamp in FRAME_ENTRY.iter_unpack(self.data[entry_offset:record_offset]): #type: ignore  # noqa E501
+                rigid_bodies = []
+                for _ in range(rigid_body_count):
+                    record = RIGID_BODY_RECORD.unpack_from(self.data, record_offset)
+                    rigid_bodies.append({
+                        "id": record[1],
+                        "pos": {"x": record[2], "y": record[3], "z": record[4]},
+                        "rot": {"x": record[5], "y": record[6], "z": record[7], "w": record[8]},
+                        "valid": record[10] == 1
+                    })
+                    record_offset += RIGID_BODY_RECORD.size
+                yield {
+                    "frame_number": frame_number,
+                    "timestamp": motive_timestamp,
+                    "ts": timestamp,
+                    "rigid_bodies": rigid_bodies
+                }
+
+    def to_arrays(self):
+        """Returns numpy arrays with one row per recorded rigid body:
+        frame_number, id, pos (n x 3), rot (n x 4, x y z w), timestamp
+        (Motive), ts (receive time) and valid.  Requires numpy."""
+        if np is None:
+            raise RuntimeError("numpy is required for FlightLogReader.to_arrays") #type: ignore  # noqa E501
+        record_dtype = np.dtype([('frame_number', '<u4'), ('id', '<i4'),
+                                 ('pos', '<f4', (3,)), ('rot', '<f4', (4,)),
+                                 ('ts', '<f8'), ('valid', 'u1'), ('pad', 'V3')]) #type: ignore  # noqa E501
+        entry_dtype = np.dtype([('frame_number', '<u4'), ('count', '<u4'),
+                                ('timestamp', '<f8'), ('ts', '<f8')])
+        records = []
+        entries = []
+        for offset, count, _, _, _ in self.chunks:
+            entry_offset = offset + BLOCK_HEADER.size
+            chunk_entries = np.frombuffer(self.data, entry_dtype, count, entry_offset) #type: ignore  # noqa E501
+            record_offset = entry_offset + count * FRAME_ENTRY.size
+            entries.append(chunk_entries)
+            records.append(np.frombuffer(self.data, record_dtype, int(chunk_entries['count'].sum()), record_offset)) #type: ignore  # noqa E501
+        if records:
+            record_array = np.concatenate(records)
+            entry_array = np.concatenate(entries)
+        else:
+            record_array = np.zeros(0, record_dtype)
+            entry_array = np.zeros(0, entry_dtype)
+        return {"frame_number": record_array['frame_number'].astype(np.int64),
+                "id": record_array['id'].astype(np.int64),
+                "pos": record_array['pos'].astype(np.float64),
+                "rot": record_array['rot'].astype(np.float64),
+                "timestamp": np.repeat(entry_array['timestamp'], entry_array['count']), #type: ignore  # noqa E501
+                "ts": record_array['ts'].copy(),
+                "valid": record_array['valid'] == 1}
@@ -368,9 +368,9 @@ class KMLToPlanConverter:
         return plan
 
 
-def main():
-    raw = sys.stdin.read() or "{}"
-    params = json.loads(raw)
+def generate_kml_and_plan(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds the KML (and .plan when the test has waypoints) for one
+    /api/generate-kml request and returns the response body"""
     lat0 = float(params.get("lat0", 0))
     lon0 = float(params.get("lon0", 0))
     ground_msl = float(params.get("ground_msl", 0))
@@ -440,8 +440,14 @@ def main():
             "filename": plan_filename,
             "content": json.dumps(plan_data, indent=2)
         }
-    
-    sys.stdout.write(json.dumps(result))
+
+    return result
+
+
+def main():
+    raw = sys.stdin.read() or "{}"
+    params = json.loads(raw)
+    sys.stdout.write(json.dumps(generate_kml_and_plan(params)))
 
 
 if __name__ == "__main__":
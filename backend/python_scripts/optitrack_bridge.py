@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# optitrack_bridge.py
+# Resident Python side of the backend.  One process serves the rigid body
+# stream, Motive commands and KML/plan generation, so a request only costs
+# the work itself instead of an interpreter start, imports and a NatNet
+# connection.
+#
+# stdin and stdout carry one JSON object per line.  The first stdin line is
+# the config ({"server_ip": ..., "use_multicast": ...}, plus the optional
+# "receive_batch_size", "decode_sections", "command_timeout", "output_format",
+# "max_rate_hz", "min_position_delta", "frame_queue_size",
+# "frame_queue_overflow_policy", "stats_interval", "stats_window",
+# "shared_memory_name", "shared_memory_slots",
+# "shared_memory_max_rigid_bodies" and "capture_path").  Every following line is a request with
+# an id and a type:
+#   {"id": 1, "type": "start_stream"}
+#   {"id": 2, "type": "stop_stream"}
+#   {"id": 3, "type": "command", "command": "SetRecordTakeName", "args": ["take_01"]}
+#   {"id": 4, "type": "generate_kml", "params": {"lat0": ..., "lon0": ..., ...}}
+#   {"id": 5, "type": "start_flight_recording", "path": "recordings/take_01.nnfl"}
+#   {"id": 6, "type": "stop_flight_recording"}
+# and is answered on stdout with
+#   {"type": "response", "id": 3, "ok": true, "result": 0}
+#   {"type": "response", "id": 4, "ok": false, "error": "..."}
+# Requests are handled concurrently, so responses can arrive out of order.
+# While streaming, stdout also carries one line per mocap frame, the frame
+# record of rigid_body_stream.py with "type": "frame"
+#   {"type": "frame", "frame_number": 1234, "timestamp": ..., "ts": ..., "rigid_bodies": [...]}
+# With "output_format": "binary" stdout is instead the length-prefixed stream
+# of rigid_body_stream.py: one rigid body frame message per mocap frame, and
+# responses as JSON messages.  With "shared_memory_name" the frames are also
+# written into the shared memory ring of rigid_body_ring.py, and with
+# "output_format": "shared_memory" only there, leaving stdout to the
+# responses.  A flight recording (flight_recorder.py) gets every frame
+# between its start and stop requests, streaming or not.
+# Status and errors go to stderr as in the other optitrack scripts, and with
+# "stats_interval" so does a stats line every interval while streaming
+#   {"type": "stats", "frames": ..., "dropped_frames": ..., "jitter_ms": ..., ...}
+# The bridge exits when stdin is closed.
+import json, sys, time, socket, threading
+from concurrent.futures import ThreadPoolExecutor
+from rigid_body_stream import RigidBodyDecimator, mocap_frame_record, pack_json_message, pack_mocap_frame, stats_record
+
+cfg = json.loads(sys.stdin.readline() or "{}")
+
+SERVER_IP = cfg.get("server_ip")
+USE_MULTICAST = bool(cfg.get("use_multicast", True))
+COMMAND_TIMEOUT = float(cfg.get("command_timeout", 2.0))
+OUTPUT_FORMAT = cfg.get("output_format", "json")
+SHARED_MEMORY_NAME = cfg.get("shared_memory_name") or ("optitrack_rigid_bodies" if OUTPUT_FORMAT == "shared_memory" else None) #type: ignore  # noqa E501
+# seconds between stats lines on stderr, 0 writes none
+STATS_INTERVAL = float(cfg.get("stats_interval", 0))
+
+# Loaded once here instead of per /api/generate-kml request
+try:
+    from generate_kml_and_plan_api import generate_kml_and_plan
+except Exception as e:
+    generate_kml_and_plan = None
+    print(json.dumps({"type":"error","message":f"KML generation unavailable: {str(e)}"}), file=sys.stderr)
+
+# stdout carries only the protocol; NatNetClient prints its diagnostics from
+# its own threads, so those go to stderr with the status messages
+protocol_out = sys.stdout.buffer
+sys.stdout = sys.stderr
+stdout_lock = threading.Lock()
+
+def write_bytes(data):
+    with stdout_lock:
+        protocol_out.write(data)
+        protocol_out.flush()
+
+def write_line(payload):
+    if OUTPUT_FORMAT == "binary":
+        write_bytes(pack_json_message(payload))
+    else:
+        write_bytes((json.dumps(payload) + "\n").encode('utf-8'))
+
+def infer_local_ip(server_ip):
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect((server_ip, 1511))
+        return s.getsockname()[0]
+    finally:
+        s.close()
+
+class Bridge:
+    def __init__(self):
+        self.client = None
+        self.streaming = False
+        self.client_lock = threading.Lock()
+        # Motive commands run one at a time: NatNet responses carry no
+        # request id, so concurrent commands could be answered out of turn
+        self.command_lock = threading.Lock()
+        self.stopped = threading.Event()
+        # shared memory ring of every frame for local consumers, see
+        # rigid_body_ring.py
+        self.ring = None
+        # FlightRecorder between start_flight_recording and
+        # stop_flight_recording
+        self.recorder = None
+        # per rigid body decimation before serializing, 0 writes every frame
+        self.decimator = RigidBodyDecimator(float(cfg.get("max_rate_hz", 0)), float(cfg.get("min_position_delta", 0))) #type: ignore  # noqa E501
+
+    def frame_handler(self, data_dict):
+        timestamp = time.time()
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.record_mocap_frame(data_dict, timestamp)
+        if not self.streaming:
+            return
+        if self.ring is not None:
+            self.ring.write_mocap_frame(data_dict, timestamp)
+        if OUTPUT_FORMAT == "shared_memory":
+            return
+        record = mocap_frame_record(data_dict, timestamp, self.decimator)
+        if record is not None:
+            record["type"] = "frame"
+            write_line(record)
+
+    def binary_frame_handler(self, data_dict):
+        timestamp = time.time()
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.record_mocap_frame(data_dict, timestamp)
+        if not self.streaming:
+            return
+        if self.ring is not None:
+            self.ring.write_mocap_frame(data_dict, timestamp)
+        message = pack_mocap_frame(data_dict, timestamp, self.decimator)
+        if message is not None:
+            write_bytes(message)
+
+    def get_client(self):
+        """Connects the NatNet client on first use and returns it"""
+        with self.client_lock:
+            if self.client is None:
+                if not SERVER_IP:
+                    raise RuntimeError("Missing server_ip")
+                from NatNetClient import NatNetClient
+                if SHARED_MEMORY_NAME and (self.ring is None):
+                    from rigid_body_ring import RigidBodyRing
+                    self.ring = RigidBodyRing(SHARED_MEMORY_NAME, int(cfg.get("shared_memory_slots", 256)), int(cfg.get("shared_memory_max_rigid_bodies", 64))) #type: ignore  # noqa E501
+                client = NatNetClient()
+                client.set_server_address(SERVER_IP)
+                client.set_client_address(infer_local_ip(SERVER_IP))
+                client.set_use_multicast(USE_MULTICAST)
+                client.set_receive_batch_size(int(cfg.get("receive_batch_size", 32)))
+                client.set_decode_sections(cfg.get("decode_sections", ["rigid_bodies"]))
+                # frames queued between receiving and writing, so a full
+                # stdout pipe does not stall the socket
+                client.set_frame_queue(int(cfg.get("frame_queue_size", 0)), cfg.get("frame_queue_overflow_policy", "keep_latest_per_body")) #type: ignore  # noqa E501
+                if STATS_INTERVAL > 0:
+                    client.set_stats_window(int(cfg.get("stats_window", 1000)))
+                # raw capture of the session for NatNetReplay.py
+                if cfg.get("capture_path"):
+                    client.start_capture(cfg["capture_path"])
+                if OUTPUT_FORMAT == "binary":
+                    client.new_frame_with_data_listener = self.binary_frame_handler
+                else:
+                    client.new_frame_with_data_listener = self.frame_handler
+                client.set_print_level(0)
+                try:
+                    is_running = client.run('d')
+                except SystemExit:
+                    is_running = False
+                if not is_running:
+                    raise RuntimeError("Could not start streaming client")
+                self.client = client
+                if STATS_INTERVAL > 0:
+                    threading.Thread(target=self.stats_thread_function, daemon=True).start() #type: ignore  # noqa E501
+            client = self.client
+        if not client.wait_for_server_info(COMMAND_TIMEOUT):
+            # Motive may have been started after the bridge; ask again
+            client.send_request(client.command_socket, client.NAT_CONNECT, "", (client.server_ip_address, client.command_port))
+            if not client.wait_for_server_info(COMMAND_TIMEOUT):
+                raise RuntimeError("Server not responding")
+        return client
+
+    def stats_thread_function(self):
+        while not self.stopped.wait(STATS_INTERVAL):
+            if self.streaming:
+                print(json.dumps(stats_record(self.client)), file=sys.stderr, flush=True)
+
+    def start_stream(self, request):
+        self.get_client()
+        self.streaming = True
+        print(json.dumps({"type":"status","message":"Connected","server_ip":SERVER_IP,"shared_memory_name":SHARED_MEMORY_NAME}), file=sys.stderr, flush=True)
+        return True
+
+    def stop_stream(self, request):
+        self.streaming = False
+        print(json.dumps({"type":"status","message":"Disconnected"}), file=sys.stderr, flush=True)
+        return True
+
+    def command(self, request):
+        command = request.get("command")
+        if not isinstance(command, str) or not command:
+            raise ValueError("Missing command")
+        command_str = ",".join([command] + [str(arg) for arg in request.get("args") or []])
+        client = self.get_client()
+        with self.command_lock:
+            response = client.send_command(command_str, wait=True, timeout=COMMAND_TIMEOUT)
+        if response is None:
+            raise RuntimeError("No response from Motive")
+        # Motive answers most commands with 0 on success
+        if isinstance(response, int) and response != 0:
+            raise RuntimeError(f"Motive returned {response}")
+        return response
+
+    def start_flight_recording(self, request):
+        path = request.get("path")
+        if not isinstance(path, str) or not path:
+            raise ValueError("Missing path")
+        from flight_recorder import FlightRecorder
+        self.get_client()
+        with self.client_lock:
+            if self.recorder is not None:
+                raise RuntimeError(f"Already recording to {self.recorder.path}")
+            self.recorder = FlightRecorder(path)
+        return path
+
+    def stop_flight_recording(self, request):
+        with self.client_lock:
+            recorder = self.recorder
+            self.recorder = None
+        if recorder is None:
+            raise RuntimeError("Not recording")
+        recorder.close()
+        return recorder.get_counts()
+
+    def generate_kml(self, request):
+        if generate_kml_and_plan is None:
+            raise RuntimeError("KML generation unavailable")
+        return generate_kml_and_plan(request.get("params") or {})
+
+    def shutdown(self):
+        self.stopped.set()
+        if self.client is not None:
+            self.client.shutdown()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.ring is not None:
+            self.ring.close()
+
+bridge = Bridge()
+handlers = {
+    "start_stream": bridge.start_stream,
+    "stop_stream": bridge.stop_stream,
+    "command": bridge.command,
+    "generate_kml": bridge.generate_kml,
+    "start_flight_recording": bridge.start_flight_recording,
+    "stop_flight_recording": bridge.stop_flight_recording,
+}
+
+def handle_request(request):
+    request_id = request.get("id")
+    handler = handlers.get(request.get("type"))
+    if handler is None:
+        write_line({"type": "response", "id": request_id, "ok": False, "error": f"Unknown request type: {request.get('type')}"})
+        return
+    try:
+        result = handler(request)
+    except Exception as e:
+        write_line({"type": "response", "id": request_id, "ok": False, "error": str(e)})
+    else:
+        write_line({"type": "response", "id": request_id, "ok": True, "result": result})
+
+print(json.dumps({"type":"status","message":"Bridge ready"}), file=sys.stderr, flush=True)
+
+executor = ThreadPoolExecutor(max_workers=4)
+try:
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            write_line({"type": "response", "id": None, "ok": False, "error": "Invalid JSON request"})
+            continue
+        if not isinstance(request, dict):
+            write_line({"type": "response", "id": None, "ok": False, "error": "Invalid request"})
+            continue
+        executor.submit(handle_request, request)
+except KeyboardInterrupt:
+    pass
+
+executor.shutdown(wait=True)
+bridge.shutdown()
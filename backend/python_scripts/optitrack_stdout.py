@@ -1,17 +1,43 @@
 # optitrack_stdout.py
 import json, sys, time, socket
 from NatNetClient import NatNetClient
+from rigid_body_stream import RigidBodyDecimator, mocap_frame_record, pack_mocap_frame, stats_record
 
 raw = sys.stdin.read() or "{}"
 cfg = json.loads(raw)
 
 SERVER_IP = cfg.get("server_ip")
 USE_MULTICAST = bool(cfg.get("use_multicast", True))
+# "json" lines or "binary" messages, one per frame (see rigid_body_stream.py),
+# or "shared_memory" for no stdout frames at all
+OUTPUT_FORMAT = cfg.get("output_format", "json")
+# shared memory ring of every frame for local consumers (see rigid_body_ring.py)
+SHARED_MEMORY_NAME = cfg.get("shared_memory_name") or ("optitrack_rigid_bodies" if OUTPUT_FORMAT == "shared_memory" else None) #type: ignore  # noqa E501
+# per rigid body decimation before serializing, 0 writes every frame
+decimator = RigidBodyDecimator(float(cfg.get("max_rate_hz", 0)), float(cfg.get("min_position_delta", 0))) #type: ignore  # noqa E501
+# seconds between stats lines on stderr, 0 writes none
+STATS_INTERVAL = float(cfg.get("stats_interval", 0))
+
+if OUTPUT_FORMAT == "binary":
+    # keep NatNetClient prints out of the binary stream
+    binary_out = sys.stdout.buffer
+    sys.stdout = sys.stderr
 
 if not SERVER_IP:
     print(json.dumps({"type":"error","message":"Missing server_ip"}), file=sys.stderr)
     sys.exit(1)
 
+# flight log of every frame for offline evaluation (see flight_recorder.py)
+recorder = None
+if cfg.get("record_path"):
+    from flight_recorder import FlightRecorder
+    recorder = FlightRecorder(cfg["record_path"])
+
+ring = None
+if SHARED_MEMORY_NAME:
+    from rigid_body_ring import RigidBodyRing
+    ring = RigidBodyRing(SHARED_MEMORY_NAME, int(cfg.get("shared_memory_slots", 256)), int(cfg.get("shared_memory_max_rigid_bodies", 64))) #type: ignore  # noqa E501
+
 def infer_local_ip(server_ip):
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
@@ -24,30 +50,67 @@ CLIENT_IP = infer_local_ip(SERVER_IP)
 
 print(json.dumps({"type":"status","message":"Starting","server_ip":SERVER_IP}), file=sys.stderr)
 
-def rigid_body_handler(rigid_body_id, position, rotation):
-    payload = {
-        "id": int(rigid_body_id),
-        "pos": {"x": float(position[0]), "y": float(position[1]), "z": float(position[2])},
-        "rot": {"x": float(rotation[0]), "y": float(rotation[1]), "z": float(rotation[2]), "w": float(rotation[3])},
-        "ts": time.time()
-    }
-    print(json.dumps(payload), flush=True)
+def frame_handler(data_dict):
+    timestamp = time.time()
+    if recorder is not None:
+        recorder.record_mocap_frame(data_dict, timestamp)
+    if ring is not None:
+        ring.write_mocap_frame(data_dict, timestamp)
+    if OUTPUT_FORMAT == "shared_memory":
+        return
+    record = mocap_frame_record(data_dict, timestamp, decimator)
+    if record is not None:
+        # one write per frame with every rigid body
+        sys.stdout.write(json.dumps(record) + "\n")
+        sys.stdout.flush()
+
+def binary_frame_handler(data_dict):
+    timestamp = time.time()
+    if recorder is not None:
+        recorder.record_mocap_frame(data_dict, timestamp)
+    if ring is not None:
+        ring.write_mocap_frame(data_dict, timestamp)
+    message = pack_mocap_frame(data_dict, timestamp, decimator)
+    if message is not None:
+        binary_out.write(message)
+        binary_out.flush()
 
 client = NatNetClient()
 client.set_server_address(SERVER_IP)
 client.set_client_address(CLIENT_IP)
 client.set_use_multicast(USE_MULTICAST)
-client.rigid_body_listener = rigid_body_handler
+client.set_receive_batch_size(int(cfg.get("receive_batch_size", 32)))
+client.set_decode_sections(cfg.get("decode_sections", ["rigid_bodies"]))
+# frames queued between receiving and writing, so a full stdout pipe does not
+# stall the socket (0 writes from the receive thread)
+client.set_frame_queue(int(cfg.get("frame_queue_size", 0)), cfg.get("frame_queue_overflow_policy", "keep_latest_per_body")) #type: ignore  # noqa E501
+if STATS_INTERVAL > 0:
+    client.set_stats_window(int(cfg.get("stats_window", 1000)))
+# raw capture of the session for NatNetReplay.py
+if cfg.get("capture_path"):
+    client.start_capture(cfg["capture_path"])
+if OUTPUT_FORMAT == "binary":
+    client.new_frame_with_data_listener = binary_frame_handler
+else:
+    client.new_frame_with_data_listener = frame_handler
 client.set_print_level(0)
 
 if client.run('d'):
     time.sleep(0.5)
-    print(json.dumps({"type":"status","message":"Connected"}), file=sys.stderr)
+    print(json.dumps({"type":"status","message":"Connected","shared_memory_name":SHARED_MEMORY_NAME}), file=sys.stderr)
+    next_stats_time = time.monotonic() + STATS_INTERVAL
     try:
         while True:
             time.sleep(1/60)
+            if (STATS_INTERVAL > 0) and (time.monotonic() >= next_stats_time):
+                next_stats_time += STATS_INTERVAL
+                print(json.dumps(stats_record(client)), file=sys.stderr, flush=True)
     except KeyboardInterrupt:
         client.shutdown()
+        if ring is not None:
+            ring.close()
+        if recorder is not None:
+            recorder.close()
         print(json.dumps({"type":"status","message":"Disconnected"}), file=sys.stderr)
 else:
     print(json.dumps({"type":"error","message":"Failed to connect"}), file=sys.stderr)
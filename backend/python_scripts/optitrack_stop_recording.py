@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 from NatNetClient import NatNetClient
-import time
 import os, socket
 
 import warnings
@@ -41,10 +40,16 @@ client.set_use_multicast(USE_MULTICAST)
 
 # Connect and stop
 if client.run('c'):  # Command stream only
-    time.sleep(1)  # Wait for connection
-    client.send_command("StopRecording")
-    time.sleep(1)  # Wait for command to process
+    client.wait_for_server_info(2.0)  # Wait for connection
+    response = client.send_command("StopRecording", wait=True, timeout=2.0)  # Wait for command to process
     client.shutdown()
+    if response is None:
+        print("ERROR: No response from Motive")
+        sys.exit(1)
+    # Motive answers with 0 on success, send failures are -1
+    if isinstance(response, int) and response != 0:
+        print(f"ERROR: Motive returned {response}")
+        sys.exit(1)
     print("Recording stopped")
 else:
     print("Failed to connect")
\ No newline at end of file
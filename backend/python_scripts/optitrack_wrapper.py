@@ -15,6 +15,21 @@ cfg = json.loads(raw)
 
 SERVER_IP = cfg.get("server_ip")
 USE_MULTICAST = cfg.get("use_multicast", True)
+# "json" lines or "binary" messages, one per frame (see rigid_body_stream.py),
+# or "shared_memory" for no stdout frames at all
+OUTPUT_FORMAT = cfg.get("output_format", "json")
+# shared memory ring of every frame for local consumers (see rigid_body_ring.py)
+SHARED_MEMORY_NAME = cfg.get("shared_memory_name") or ("optitrack_rigid_bodies" if OUTPUT_FORMAT == "shared_memory" else None)
+# per rigid body decimation before serializing, 0 writes every frame
+MAX_RATE_HZ = float(cfg.get("max_rate_hz", 0))
+MIN_POSITION_DELTA = float(cfg.get("min_position_delta", 0))
+# seconds between stats lines on stderr, 0 writes none
+STATS_INTERVAL = float(cfg.get("stats_interval", 0))
+
+if OUTPUT_FORMAT == "binary":
+    # keep NatNetClient prints out of the binary stream
+    binary_out = sys.stdout.buffer
+    sys.stdout = sys.stderr
 
 if not SERVER_IP:
     print(json.dumps({"type":"error","message":"Missing server_ip"}), file=sys.stderr)
@@ -40,6 +55,11 @@ try:
     with open(os.devnull, 'w') as devnull:
         sys.stderr = devnull
         from NatNetClient import NatNetClient
+        from rigid_body_stream import RigidBodyDecimator, mocap_frame_record, pack_mocap_frame, stats_record
+        if SHARED_MEMORY_NAME:
+            from rigid_body_ring import RigidBodyRing
+        if cfg.get("record_path"):
+            from flight_recorder import FlightRecorder
     sys.stderr = stderr_backup
 except Exception as e:
     print(json.dumps({"type":"error","message":f"Failed to import NatNetClient: {str(e)}"}), file=sys.stderr)
@@ -48,18 +68,48 @@ except Exception as e:
 # Global variable to track if we've received data
 data_received = False
 
-# This is the rigid body callback
-def receive_rigid_body_frame(rigid_body_id, position, rotation):
+decimator = RigidBodyDecimator(MAX_RATE_HZ, MIN_POSITION_DELTA)
+
+# flight log of every frame for offline evaluation (see flight_recorder.py)
+recorder = None
+if cfg.get("record_path"):
+    recorder = FlightRecorder(cfg["record_path"])
+
+ring = None
+if SHARED_MEMORY_NAME:
+    ring = RigidBodyRing(SHARED_MEMORY_NAME, int(cfg.get("shared_memory_slots", 256)), int(cfg.get("shared_memory_max_rigid_bodies", 64)))
+
+# This is the frame callback, one line with every rigid body of the frame
+def receive_rigid_body_frame(data_dict):
     global data_received
-    if rigid_body_id is not None and position is not None and rotation is not None:
+    timestamp = time.time()
+    if recorder is not None:
+        recorder.record_mocap_frame(data_dict, timestamp)
+    if ring is not None:
+        ring.write_mocap_frame(data_dict, timestamp)
+        data_received = True
+    if OUTPUT_FORMAT == "shared_memory":
+        return
+    record = mocap_frame_record(data_dict, timestamp, decimator)
+    if record is not None:
+        data_received = True
+        sys.stdout.write(json.dumps(record) + "\n")
+        sys.stdout.flush()
+
+# This is the frame callback of the binary output format
+def receive_binary_frame(data_dict):
+    global data_received
+    timestamp = time.time()
+    if recorder is not None:
+        recorder.record_mocap_frame(data_dict, timestamp)
+    if ring is not None:
+        ring.write_mocap_frame(data_dict, timestamp)
+        data_received = True
+    message = pack_mocap_frame(data_dict, timestamp, decimator)
+    if message is not None:
         data_received = True
-        payload = {
-            "id": int(rigid_body_id),
-            "pos": {"x": float(position[0]), "y": float(position[1]), "z": float(position[2])},
-            "rot": {"x": float(rotation[0]), "y": float(rotation[1]), "z": float(rotation[2]), "w": float(rotation[3])},
-            "ts": time.time()
-        }
-        print(json.dumps(payload), flush=True)
+        binary_out.write(message)
+        binary_out.flush()
 
 # Suppress stderr completely during NatNetClient operations
 stderr_backup = sys.stderr
@@ -71,9 +121,22 @@ try:
     streaming_client.set_client_address(CLIENT_IP)
     streaming_client.set_server_address(SERVER_IP)
     streaming_client.set_use_multicast(USE_MULTICAST)
+    streaming_client.set_receive_batch_size(int(cfg.get("receive_batch_size", 32)))
+    streaming_client.set_decode_sections(cfg.get("decode_sections", ["rigid_bodies"]))
+    # frames queued between receiving and writing, so a full stdout pipe
+    # does not stall the socket (0 writes from the receive thread)
+    streaming_client.set_frame_queue(int(cfg.get("frame_queue_size", 0)), cfg.get("frame_queue_overflow_policy", "keep_latest_per_body")) #type: ignore  # noqa E501
+    if STATS_INTERVAL > 0:
+        streaming_client.set_stats_window(int(cfg.get("stats_window", 1000)))
+    # raw capture of the session for NatNetReplay.py
+    if cfg.get("capture_path"):
+        streaming_client.start_capture(cfg["capture_path"])
     
-    # Set the rigid body callback
-    streaming_client.rigid_body_listener = receive_rigid_body_frame
+    # Set the frame callback
+    if OUTPUT_FORMAT == "binary":
+        streaming_client.new_frame_with_data_listener = receive_binary_frame
+    else:
+        streaming_client.new_frame_with_data_listener = receive_rigid_body_frame
     
     # Suppress all debug output
     streaming_client.set_print_level(0)
@@ -92,19 +155,27 @@ try:
     # Wait for connection
     time.sleep(2)
     
-    print(json.dumps({"type":"status","message":"Connected"}), file=sys.stderr)
+    print(json.dumps({"type":"status","message":"Connected","shared_memory_name":SHARED_MEMORY_NAME}), file=sys.stderr)
     
     # Suppress stderr again for the main loop
     sys.stderr = open(os.devnull, 'w')
     
-    # Keep running
+    # Keep running, with the stats lines on the real stderr
+    next_stats_time = time.monotonic() + STATS_INTERVAL
     try:
         while True:
             time.sleep(1/60)  # 60 FPS
+            if (STATS_INTERVAL > 0) and (time.monotonic() >= next_stats_time):
+                next_stats_time += STATS_INTERVAL
+                print(json.dumps(stats_record(streaming_client)), file=stderr_backup, flush=True)
     except KeyboardInterrupt:
         sys.stderr.close()
         sys.stderr = stderr_backup
         streaming_client.shutdown()
+        if ring is not None:
+            ring.close()
+        if recorder is not None:
+            recorder.close()
         print(json.dumps({"type":"status","message":"Disconnected"}), file=sys.stderr)
 
 except Exception as e:
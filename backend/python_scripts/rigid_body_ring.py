@@ -0,0 +1,226 @@
+# rigid_body_ring.py
+# Shared memory output of the rigid body streamers, for consumers on the
+# same machine (a recorder, an evaluator, a native addon) that want the
+# latest frames without reading and parsing the stdout stream.
+#
+# "shared_memory_name" in the stdin config of optitrack_stdout.py,
+# optitrack_wrapper.py or optitrack_bridge.py writes every mocap frame into a
+# multiprocessing.shared_memory block of that name, in addition to the
+# stdout stream.  "output_format": "shared_memory" writes no frames to
+# stdout at all.  "shared_memory_slots" and "shared_memory_max_rigid_bodies"
+# size the ring.  The ring is not decimated: writing it serializes nothing,
+# so it always carries every frame.
+#
+# The block is a 64 byte header followed by slot count slots.  Everything
+# is little-endian.
+#   offset  type     field
+#   0       4 bytes  magic b"RBRG"
+#   4       uint32   layout version (1)
+#   8       uint32   slot count
+#   12      uint32   slot size in bytes
+#   16      uint32   max rigid bodies per slot
+#   20      4 bytes  padding
+#   24      uint64   frame count, the number of frames written so far
+#   32      32 bytes reserved
+#
+# Frame n (counting from 1) is in slot (n - 1) % slot count.  A slot is a
+# 32 byte header followed by max rigid bodies records in the 48 byte
+# RIGID_BODY_RECORD layout of rigid_body_stream.py
+#   offset  type     field
+#   0       uint64   sequence: 2n - 1 while frame n is written, 2n after
+#   8       uint32   frame number
+#   12      uint32   rigid body count
+#   16      float64  Motive timestamp of the frame
+#   24      float64  seconds since the epoch when the frame was received
+#
+# Readers use the sequence as a seqlock: read it, copy the slot, and read it
+# again.  The copy is good when both reads are equal and even; otherwise the
+# writer was in the slot and the read is retried, or the frame was already
+# overwritten.  The writer publishes the frame count after the slot.
+# RigidBodyRingReader implements this for Python.
+import struct, sys, time
+from multiprocessing import shared_memory, resource_tracker
+from rigid_body_stream import RIGID_BODY_RECORD
+
+RING_MAGIC = b"RBRG"
+RING_VERSION = 1
+
+RING_HEADER = struct.Struct('<4sIIII4xQ')
+RING_HEADER_SIZE = 64
+FRAME_COUNT = struct.Struct('<Q')
+FRAME_COUNT_OFFSET = 24
+SLOT_HEADER = struct.Struct('<QIIdd')
+SEQUENCE = struct.Struct('<Q')
+
+
+def slot_size(max_rigid_bodies):
+    return SLOT_HEADER.size + max_rigid_bodies * RIGID_BODY_RECORD.size
+
+
+class RigidBodyRing:
+    """Writer side of the ring.  Creates the shared memory block name, or
+    replaces a block left behind by a writer that did not close it."""
+
+    def __init__(self, name, slot_count=256, max_rigid_bodies=64):
+        self.name = name
+        self.slot_count = max(int(slot_count), 1)
+        self.max_rigid_bodies = max(int(max_rigid_bodies), 1)
+        self.slot_size = slot_size(self.max_rigid_bodies)
+        # rigid bodies that did not fit into their slot
+        self.truncated_count = 0
+        self.frame_count = 0
+        size = RING_HEADER_SIZE + self.slot_count * self.slot_size
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        self.buf = self.shm.buf
+        self.buf[:RING_HEADER_SIZE] = bytes(RING_HEADER_SIZE)
+        RING_HEADER.pack_into(self.buf, 0, RING_MAGIC, RING_VERSION, self.slot_count, self.slot_size, self.max_rigid_bodies, 0) #type: ignore  # noqa E501
+
+    def write_frame(self, frame_number, rigid_body_list, motive_timestamp, timestamp): #type: ignore  # noqa E501
+        """Writes the MoCapData.RigidBody objects of one frame as the next
+        frame of the ring"""
+        buf = self.buf
+        frame_count = self.frame_count + 1
+        offset = RING_HEADER_SIZE + ((frame_count - 1) % self.slot_count) * self.slot_size #type: ignore  # noqa E501
+        count = len(rigid_body_list)
+        if count > self.max_rigid_bodies:
+            self.truncated_count += count - self.max_rigid_bodies
+            count = self.max_rigid_bodies
+        SEQUENCE.pack_into(buf, offset, 2 * frame_count - 1)
+        record_offset = offset + SLOT_HEADER.size
+        for i in range(count):
+            rigid_body = rigid_body_list[i]
+            pos = rigid_body.pos
+            rot = rigid_body.rot
+            RIGID_BODY_RECORD.pack_into(buf, record_offset, frame_number, rigid_body.id_num, pos[0], pos[1], pos[2], rot[0], rot[1], rot[2], rot[3], timestamp, 1 if rigid_body.tracking_valid else 0) #type: ignore  # noqa E501
+            record_offset += RIGID_BODY_RECORD.size
+        SLOT_HEADER.pack_into(buf, offset, 2 * frame_count - 1, frame_number, count, motive_timestamp, timestamp) #type: ignore  # noqa E501
+        # The even sequence publishes the slot, so it is the last store
+        SEQUENCE.pack_into(buf, offset, 2 * frame_count)
+        FRAME_COUNT.pack_into(buf, FRAME_COUNT_OFFSET, frame_count)
+        self.frame_count = frame_count
+
+    def write_mocap_frame(self, data_dict, timestamp):
+        """Writes every rigid body of a new_frame_with_data_listener frame"""
+        rigid_body_data = data_dict["mocap_data"].rigid_body_data
+        rigid_body_list = []
+        if rigid_body_data is not None:
+            rigid_body_list = rigid_body_data.rigid_body_list
+        motive_timestamp = data_dict["timestamp"]
+        if motive_timestamp is None:
+            motive_timestamp = -1.0
+        self.write_frame(data_dict["frame_number"], rigid_body_list, motive_timestamp, timestamp) #type: ignore  # noqa E501
+
+    def close(self):
+        """Releases and removes the shared memory block"""
+        if self.shm is None:
+            return
+        self.buf.release()
+        self.buf = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+
+class RigidBodyRingReader:
+    """Reader side of the ring.  Frames are returned as the JSON frame
+    records of rigid_body_stream.py."""
+
+    # Reads that keep colliding with the writer give up after this many
+    # attempts, which only happens when the reader is much slower than the
+    # frame rate
+    MAX_RETRIES = 100
+
+    def __init__(self, name):
+        self.shm = shared_memory.SharedMemory(name)
+        if sys.version_info < (3, 13):
+            # Attaching registers the block with this process' resource
+            # tracker, which would remove it when the reader exits
+            resource_tracker.unregister(self.shm._name, "shared_memory") #type: ignore  # noqa E501
+        self.buf = self.shm.buf
+        magic, version, self.slot_count, self.slot_size, self.max_rigid_bodies = RING_HEADER.unpack_from(self.buf, 0)[:5] #type: ignore  # noqa E501
+        if (magic != RING_MAGIC) or (version != RING_VERSION):
+            self.close()
+            raise ValueError("%s is not a version %d rigid body ring" % (name, RING_VERSION)) #type: ignore  # noqa E501
+
+    def get_frame_count(self):
+        """Number of frames written so far"""
+        return FRAME_COUNT.unpack_from(self.buf, FRAME_COUNT_OFFSET)[0]
+
+    def read(self, index):
+        """Returns frame index (counting from 1), or None when it was not
+        written yet or was already overwritten"""
+        if index < 1:
+            return None
+        buf = self.buf
+        offset = RING_HEADER_SIZE + ((index - 1) % self.slot_count) * self.slot_size #type: ignore  # noqa E501
+        for _ in range(self.MAX_RETRIES):
+            sequence = SEQUENCE.unpack_from(buf, offset)[0]
+            if sequence & 1:
+                if sequence > 2 * index - 1:
+                    return None
+                time.sleep(0)
+                continue
+            if sequence != 2 * index:
+                return None
+            slot = bytes(buf[offset:offset + self.slot_size])
+            if SEQUENCE.unpack_from(buf, offset)[0] == sequence:
+                return self.__unpack_slot(slot)
+        return None
+
+    def read_latest(self):
+        """Returns the newest frame, or None when nothing was written"""
+        for _ in range(self.MAX_RETRIES):
+            frame_count = self.get_frame_count()
+            if frame_count == 0:
+                return None
+            frame = self.read(frame_count)
+            if frame is not None:
+                return frame
+        return None
+
+    def read_since(self, frame_count):
+        """Returns (frames written after the first frame_count frames, new
+        frame count).  Frames that were overwritten before they could be
+        read are skipped."""
+        new_frame_count = self.get_frame_count()
+        first = max(frame_count + 1, new_frame_count - self.slot_count + 1)
+        frames = []
+        for index in range(first, new_frame_count + 1):
+            frame = self.read(index)
+            if frame is not None:
+                frames.append(frame)
+        return frames, new_frame_count
+
+    def __unpack_slot(self, slot):
+        frame_number, count, motive_timestamp, timestamp = SLOT_HEADER.unpack_from(slot, 0)[1:] #type: ignore  # noqa E501
+        rigid_bodies = []
+        for record in RIGID_BODY_RECORD.iter_unpack(slot[SLOT_HEADER.size:SLOT_HEADER.size + count * RIGID_BODY_RECORD.size]): #type: ignore  # noqa E501
+            rigid_bodies.append({
+                "id": record[1],
+                "pos": {"x": record[2], "y": record[3], "z": record[4]},
+                "rot": {"x": record[5], "y": record[6], "z": record[7], "w": record[8]},
+                "valid": record[10] == 1
+            })
+        return {
+            "frame_number": frame_number,
+            "timestamp": motive_timestamp,
+            "ts": timestamp,
+            "rigid_bodies": rigid_bodies
+        }
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.buf.release()
+        self.buf = None
+        self.shm.close()
+        self.shm = None
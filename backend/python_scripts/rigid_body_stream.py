@@ -0,0 +1,204 @@
+# rigid_body_stream.py
+# Output formats of the rigid body stdout streams (optitrack_stdout.py,
+# optitrack_wrapper.py and optitrack_bridge.py).  Both formats write one
+# record per mocap frame with every rigid body of the frame.
+#
+# The default "json" format is one line per frame
+#   {"frame_number": 1234, "timestamp": 12.345, "ts": 1700000000.0,
+#    "rigid_bodies": [{"id": 1, "pos": {"x": ..., "y": ..., "z": ...},
+#                      "rot": {"x": ..., "y": ..., "z": ..., "w": ...},
+#                      "valid": true}, ...]}
+# where timestamp is the Motive timestamp from the frame suffix and ts is
+# when the frame was received, in seconds since the epoch.
+#
+# "output_format": "binary" in the stdin config selects the binary format
+# below.  Everything is little-endian.
+#
+# "max_rate_hz" and "min_position_delta" in the stdin config decimate the
+# stream per rigid body before anything is serialized, see
+# RigidBodyDecimator.
+#
+# "shared_memory_name" in the stdin config also writes the frames into a
+# shared memory ring for local consumers, see rigid_body_ring.py, and
+# "record_path" records them to a flight log, see flight_recorder.py.
+#
+# "stats_interval" (seconds) in the stdin config adds a stats line to
+# stderr every interval, the NatNetClient.get_stats() of the stream over
+# the last "stats_window" frames with "type": "stats", see stats_record.
+#
+# The stream is a sequence of messages, each starting with an 8 byte header
+#   offset  type     field
+#   0       uint32   payload length in bytes (not counting this header)
+#   4       uint16   kind: 1 = rigid body frame, 2 = JSON message
+#   6       uint16   record count (0 for JSON messages)
+#
+# A rigid body frame (kind 1) is one mocap frame; its payload is record
+# count 48 byte records, one per rigid body
+#   offset  type     field
+#   0       uint32   frame number
+#   4       int32    rigid body id
+#   8       float32  position x, y, z (12 bytes)
+#   20      float32  orientation quaternion x, y, z, w (16 bytes)
+#   36      float64  timestamp, seconds since the epoch when the frame was
+#                    received (the "ts" of the JSON lines)
+#   44      uint8    1 when Motive tracked the rigid body in this frame
+#   45      3 bytes  padding
+#
+# A JSON message (kind 2) carries UTF-8 JSON text, which optitrack_bridge.py
+# uses for its request responses.  In Node a message is complete once
+# buffer.length >= 8 + buffer.readUInt32LE(0); records are read with
+# readUInt32LE, readInt32LE, readFloatLE and readDoubleLE at the offsets
+# above.
+import json, struct
+
+KIND_RIGID_BODY_FRAME = 1
+KIND_JSON = 2
+
+MESSAGE_HEADER = struct.Struct('<IHH')
+RIGID_BODY_RECORD = struct.Struct('<Ii7fdB3x')
+
+
+class RigidBodyDecimator:
+    """Picks the rigid bodies of each frame that are worth writing.
+
+    A rigid body is written at most max_rate_hz times per second, measured
+    on the Motive frame timestamp so bursts of frames from the receive
+    batch are spaced as Motive captured them.  Skipped frames are simply
+    not written, and the next written frame carries the latest pose, so the
+    newest value always wins.  With min_position_delta (meters) a rigid
+    body is also skipped until it has moved that far from the last written
+    position, but it is still written every keep_alive_interval seconds so
+    consumers can tell a still rigid body from a lost one.  Zero disables a
+    limit."""
+
+    # Frames this close to the due time are written, so 120 Hz decimated
+    # to 60 Hz keeps every other frame despite float rounding
+    TIME_TOLERANCE = 0.001
+
+    def __init__(self, max_rate_hz=0.0, min_position_delta=0.0, keep_alive_interval=1.0): #type: ignore  # noqa E501
+        self.interval = 0.0
+        if max_rate_hz > 0:
+            self.interval = 1.0 / max_rate_hz
+        self.min_position_delta = min_position_delta
+        self.keep_alive_interval = keep_alive_interval
+        self.skipped_count = 0
+        # rigid body id: (time written, position written, next due time)
+        self.__last_written = {}
+
+    def is_enabled(self):
+        return (self.interval > 0) or (self.min_position_delta > 0)
+
+    def select(self, rigid_body_list, frame_time):
+        """Returns the rigid bodies of rigid_body_list to write at
+        frame_time (seconds)"""
+        if not self.is_enabled():
+            return rigid_body_list
+        selected_list = []
+        min_delta_sq = self.min_position_delta * self.min_position_delta
+        for rigid_body in rigid_body_list:
+            pos = rigid_body.pos
+            last_written = self.__last_written.get(rigid_body.id_num)
+            # Motive timestamps restart with Motive, so a time before the
+            # last write starts over
+            if (last_written is not None) and (frame_time >= last_written[0]):
+                last_time, last_pos, due_time = last_written
+                if frame_time < due_time - self.TIME_TOLERANCE:
+                    self.skipped_count += 1
+                    continue
+                if (min_delta_sq > 0) and (frame_time - last_time < self.keep_alive_interval): #type: ignore  # noqa E501
+                    dx = pos[0] - last_pos[0]
+                    dy = pos[1] - last_pos[1]
+                    dz = pos[2] - last_pos[2]
+                    if dx * dx + dy * dy + dz * dz < min_delta_sq:
+                        self.skipped_count += 1
+                        continue
+                # stay on the frame grid unless the rigid body was gone for
+                # longer than one interval
+                due_time += self.interval
+                if due_time <= frame_time:
+                    due_time = frame_time + self.interval
+            else:
+                due_time = frame_time + self.interval
+            self.__last_written[rigid_body.id_num] = (frame_time, pos, due_time) #type: ignore  # noqa E501
+            selected_list.append(rigid_body)
+        return selected_list
+
+
+def frame_time(data_dict, timestamp):
+    """Motive timestamp of the frame, or the receive time when the frame
+    has none"""
+    motive_timestamp = data_dict["timestamp"]
+    if (motive_timestamp is None) or (motive_timestamp < 0):
+        return timestamp
+    return motive_timestamp
+
+
+def select_rigid_bodies(data_dict, timestamp, decimator=None):
+    """Rigid bodies of a new_frame_with_data_listener frame to write"""
+    rigid_body_data = data_dict["mocap_data"].rigid_body_data
+    if (rigid_body_data is None) or not rigid_body_data.rigid_body_list:
+        return []
+    if decimator is None:
+        return rigid_body_data.rigid_body_list
+    return decimator.select(rigid_body_data.rigid_body_list, frame_time(data_dict, timestamp)) #type: ignore  # noqa E501
+
+
+def mocap_frame_record(data_dict, timestamp, decimator=None):
+    """Returns the JSON record of a new_frame_with_data_listener frame, or
+    None when no rigid body of the frame is written"""
+    rigid_body_list = select_rigid_bodies(data_dict, timestamp, decimator)
+    if not rigid_body_list:
+        return None
+    rigid_bodies = []
+    for rigid_body in rigid_body_list:
+        pos = rigid_body.pos
+        rot = rigid_body.rot
+        rigid_bodies.append({
+            "id": int(rigid_body.id_num),
+            "pos": {"x": float(pos[0]), "y": float(pos[1]), "z": float(pos[2])},
+            "rot": {"x": float(rot[0]), "y": float(rot[1]), "z": float(rot[2]), "w": float(rot[3])},
+            "valid": bool(rigid_body.tracking_valid)
+        })
+    return {
+        "frame_number": data_dict["frame_number"],
+        "timestamp": data_dict["timestamp"],
+        "ts": timestamp,
+        "rigid_bodies": rigid_bodies
+    }
+
+
+def pack_rigid_body_frame(frame_number, rigid_body_list, timestamp):
+    """Packs the MoCapData.RigidBody objects of one frame into a rigid body
+    frame message"""
+    count = len(rigid_body_list)
+    record_size = RIGID_BODY_RECORD.size
+    message = bytearray(MESSAGE_HEADER.size + count * record_size)
+    MESSAGE_HEADER.pack_into(message, 0, count * record_size, KIND_RIGID_BODY_FRAME, count) #type: ignore  # noqa E501
+    offset = MESSAGE_HEADER.size
+    for rigid_body in rigid_body_list:
+        pos = rigid_body.pos
+        rot = rigid_body.rot
+        RIGID_BODY_RECORD.pack_into(message, offset, frame_number, rigid_body.id_num, pos[0], pos[1], pos[2], rot[0], rot[1], rot[2], rot[3], timestamp, 1 if rigid_body.tracking_valid else 0) #type: ignore  # noqa E501
+        offset += record_size
+    return message
+
+
+def pack_mocap_frame(data_dict, timestamp, decimator=None):
+    """Packs the rigid bodies of a new_frame_with_data_listener frame.
+    Returns None when no rigid body of the frame is written."""
+    rigid_body_list = select_rigid_bodies(data_dict, timestamp, decimator)
+    if not rigid_body_list:
+        return None
+    return pack_rigid_body_frame(data_dict["frame_number"], rigid_body_list, timestamp) #type: ignore  # noqa E501
+
+
+def stats_record(client):
+    """Returns the stats line of a NatNetClient with statistics enabled"""
+    record = client.get_stats()
+    record["type"] = "stats"
+    return record
+
+
+def pack_json_message(payload):
+    data = json.dumps(payload).encode('utf-8')
+    return MESSAGE_HEADER.pack(len(data), KIND_JSON, 0) + data
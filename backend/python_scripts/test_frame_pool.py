@@ -0,0 +1,69 @@
+# Decoding with the MoCapData.FramePool of NatNetClient.set_use_object_pool,
+# alone and together with set_use_marker_arrays, on SyntheticFrameGenerator
+# frames of each NatNet version.
+#   python -m pytest test_frame_pool.py
+import contextlib
+import io
+
+import pytest
+
+import MoCapData
+from NatNetClient import NatNetClient
+from NatNetSyntheticServer import SyntheticFrameGenerator, build_server_info
+
+VERSIONS = [(2, 11), (3, 1), (4, 0), (4, 1), (4, 2)]
+
+
+def new_client(version, use_marker_arrays):
+    client = NatNetClient()
+    client.set_print_level(0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        client.process_message(build_server_info(version))
+    assert client.set_use_object_pool(True)
+    if use_marker_arrays:
+        pytest.importorskip("numpy")
+        assert client.set_use_marker_arrays(True)
+    return client
+
+
+@pytest.mark.parametrize("use_marker_arrays", [False, True])
+@pytest.mark.parametrize("version", VERSIONS)
+def test_object_pool(version, use_marker_arrays):
+    client = new_client(version, use_marker_arrays)
+    generator = SyntheticFrameGenerator(version, rigid_body_count=3,
+                                        skeleton_count=1,
+                                        labeled_marker_count=4)
+    frames = []
+
+    def receive_frame(data_dict):
+        mocap_data = data_dict["mocap_data"]
+        rigid_bodies = mocap_data.rigid_body_data.rigid_body_list
+        frames.append((data_dict["frame_number"],
+                       [rigid_body.id_num for rigid_body in rigid_bodies],
+                       type(mocap_data.labeled_marker_data)))
+
+    client.new_frame_with_data_listener = receive_frame
+    for frame_number in range(1, 6):
+        client.process_message(generator.build(frame_number))
+
+    assert [frame[0] for frame in frames] == [1, 2, 3, 4, 5]
+    for frame in frames:
+        assert frame[1] == [1, 2, 3]
+    if use_marker_arrays:
+        labeled_marker_type = MoCapData.LabeledMarkerArrayData
+    else:
+        labeled_marker_type = MoCapData.LabeledMarkerData
+    assert all(frame[2] is labeled_marker_type for frame in frames)
+
+
+def test_recycle_marker_arrays():
+    np = pytest.importorskip("numpy")
+    pool = MoCapData.FramePool()
+    mocap_data = MoCapData.MoCapData()
+    rigid_body_data = MoCapData.RigidBodyData()
+    rigid_body_data.add_rigid_body(pool.new_rigid_body(1, [0.0, 0.0, 0.0], [0.0, 0.0, 0.0, 1.0])) #type: ignore  # noqa E501
+    mocap_data.set_rigid_body_data(rigid_body_data)
+    mocap_data.set_labeled_marker_data(MoCapData.LabeledMarkerArrayData(np.zeros(2, dtype=MoCapData.LABELED_MARKER_DTYPE))) #type: ignore  # noqa E501
+    pool.recycle(mocap_data)
+    assert len(pool.rigid_body_list) == 1
+    assert pool.labeled_marker_list == []
@@ -0,0 +1,54 @@
+# Frames of data that do not fit the NatNet version the client decodes are
+# skipped and counted by NatNetClient.process_message instead of stopping
+# the receive thread.
+#   python -m pytest test_malformed_frame.py
+import contextlib
+import io
+
+from NatNetClient import NatNetClient
+from NatNetSyntheticServer import SyntheticFrameGenerator, build_server_info
+
+
+def new_client(version):
+    client = NatNetClient()
+    client.set_print_level(0)
+    client.set_stats_window(100)
+    with contextlib.redirect_stdout(io.StringIO()):
+        client.process_message(build_server_info(version))
+    return client
+
+
+def test_truncated_frame():
+    client = new_client((4, 1))
+    generator = SyntheticFrameGenerator((4, 1), rigid_body_count=3,
+                                        skeleton_count=1,
+                                        labeled_marker_count=4)
+    frame_numbers = []
+    client.new_frame_listener = lambda data_dict: frame_numbers.append(data_dict["frame_number"]) #type: ignore  # noqa E501
+
+    packet = generator.build(1)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        message_id = client.process_message(packet[:len(packet) // 2])
+    assert message_id == client.NAT_FRAMEOFDATA
+    assert "Malformed frame of data" in out.getvalue()
+
+    client.process_message(generator.build(2))
+    assert frame_numbers == [2]
+    stats = client.get_stats()
+    assert stats["malformed_frames"] == 1
+    assert stats["frames"] == 1
+
+
+def test_frame_of_other_version():
+    # 4.1 frames, e.g. after a Bitstream change, decoded by a 3.1 client
+    client = new_client((3, 1))
+    generator = SyntheticFrameGenerator((4, 1), rigid_body_count=3,
+                                        skeleton_count=1,
+                                        labeled_marker_count=4)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for frame_number in range(1, 4):
+            client.process_message(generator.build(frame_number))
+    stats = client.get_stats()
+    assert stats["frames"] == 0
+    assert stats["malformed_frames"] == 3
@@ -8,6 +8,7 @@ const { spawn } = require('child_process'); // Added for recording scripts
 
 const constants = require('./constants');
 const OptitrackManager = require('./optitrackManager');
+const PythonBridge = require('./PythonBridge');
 const UserService = require('./UserService');
 
 class Server {
@@ -21,7 +22,8 @@ class Server {
 			}
 		});
 		
-		this.optitrackManager = new OptitrackManager();
+		this.pythonBridge = new PythonBridge(); // One Python process for streaming, commands and KML generation
+		this.optitrackManager = new OptitrackManager(this.pythonBridge);
 		this.userService = new UserService(); // Add this line
 		this.setupMiddleware();
 		this.setupRoutes();
@@ -101,7 +103,8 @@ class Server {
 		this.app.post('/api/optitrack/start-recording', async (req, res) => {
 			try {
 				console.log('Starting Optitrack recording...');
-				await this.optitrackManager.startRecording();
+				const takeName = req.body && req.body.takeName;
+				await this.optitrackManager.startRecording(takeName);
 				res.json({ 
 					success: true, 
 					message: 'Recording started successfully'
@@ -406,56 +409,18 @@ class Server {
 					testType: testType || ''
 				};
 
-				// Spawn Python script (updated to use new script)
-				const { spawn } = require('child_process');
-				const pythonProcess = spawn('python', ['-u', './python_scripts/generate_kml_and_plan_api.py'], {
-					stdio: ['pipe', 'pipe', 'pipe']
-				});
-
-				// Send input to Python script
-				pythonProcess.stdin.write(JSON.stringify(pythonInput));
-				pythonProcess.stdin.end();
-
-				let outputData = '';
-				let errorData = '';
-
-				pythonProcess.stdout.on('data', (data) => {
-					outputData += data.toString();
-				});
-
-				pythonProcess.stderr.on('data', (data) => {
-					errorData += data.toString();
-				});
-
-				pythonProcess.on('close', (code) => {
-					if (code !== 0) {
-						console.error('Python script error:', errorData);
-						return res.status(500).json({
-							success: false,
-							error: 'Failed to generate KML and Plan files'
-						});
-					}
-
-					try {
-						const result = JSON.parse(outputData.trim());
-						res.json(result);
-					} catch (parseError) {
-						console.error('Failed to parse Python output:', parseError);
-						res.status(500).json({
-							success: false,
-							error: 'Invalid response from KML/Plan generator'
-						});
-					}
-				});
-
-				// Handle process errors
-				pythonProcess.on('error', (error) => {
-					console.error('Failed to start Python process:', error);
-					res.status(500).json({
+				// Generate in the resident Python bridge
+				let result;
+				try {
+					result = await this.pythonBridge.request('generate_kml', { params: pythonInput });
+				} catch (bridgeError) {
+					console.error('Python bridge error:', bridgeError);
+					return res.status(500).json({
 						success: false,
-						error: 'Failed to start KML/Plan generation process'
+						error: 'Failed to generate KML and Plan files'
 					});
-				});
+				}
+				res.json(result);
 
 			} catch (error) {
 				console.error('KML/Plan generation error:', error);
@@ -480,8 +445,9 @@ class Server {
 				socket.emit('optitrack-data', data);
 			};
 
+			// Stats go on their own event so they don't push status messages out of the client log
 			const statusListener = (status) => {
-				socket.emit('optitrack-status', status);
+				socket.emit(status.type === 'stats' ? 'optitrack-stats' : 'optitrack-status', status);
 			};
 
 			// Add listeners
@@ -561,6 +527,7 @@ class Server {
 		process.on('SIGINT', () => {
 			console.log('\n🛑 Shutting down server...');
 			this.optitrackManager.stopOptitrack();
+			this.pythonBridge.stop();
 			this.server.close(() => {
 				console.log('✅ Server shut down gracefully');
 				process.exit(0);
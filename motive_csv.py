@@ -0,0 +1,189 @@
+# motive_csv.py
+# Loader for the rigid body CSV files exported by Motive, for the flight
+# evaluator in Drones_backend.py.
+#
+# A Motive export starts with 7 header rows before the samples
+#   row 0   metadata: "Format Version,1.23,Take Name,...,Rotation Type,Quaternion,..."
+#   row 1   blank
+#   row 2   ",,Rigid Body,Rigid Body,...,Rigid Body Marker,Marker,..."   column type
+#   row 3   ",,drone,drone,..."                                          asset name
+#   row 4   ",,1,1,..."                                                  asset ID
+#   row 5   ",,Rotation,Rotation,...,Position,...,Mean Marker Error"     quantity
+#   row 6   "Frame,Time (Seconds),X,Y,Z,W,X,Y,Z,..."                     component
+# so a rigid body's columns are found by name in the header instead of by
+# position, which changes with the rotation type and the exported assets.
+# Blank cells, frames where the rigid body was not tracked, load as NaN.
+import csv
+import json
+import os
+import numpy as np
+import pandas as pd
+
+HEADER_ROWS = 7
+
+TYPE_ROW = 2
+NAME_ROW = 3
+ID_ROW = 4
+QUANTITY_ROW = 5
+COMPONENT_ROW = 6
+
+
+def read_header(fileName):
+    """Returns (metadata, header rows) of a Motive CSV export.  metadata maps
+    the key, value pairs of the first row, e.g. "Rotation Type": "Quaternion"."""
+    with open(fileName, 'r', newline='') as f_csv:
+        reader = csv.reader(f_csv)
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) == HEADER_ROWS:
+                break
+    if len(rows) < HEADER_ROWS:
+        raise ValueError("%s has no Motive CSV header" % fileName)
+    metadata = {}
+    first_row = rows[0]
+    for i in range(0, len(first_row) - 1, 2):
+        if first_row[i]:
+            metadata[first_row[i]] = first_row[i + 1]
+    return metadata, rows
+
+
+def find_rigid_body_columns(rows, rigid_body=None):
+    """Returns (rigid body name, time column, {component: column}) of the
+    rigid body named rigid_body, default the first one, in the header rows
+    of read_header.  Position components are "X", "Y", "Z", rotation
+    components "QX", "QY", "QZ", "QW" for quaternion exports and "RX",
+    "RY", "RZ" for euler exports."""
+    types = rows[TYPE_ROW]
+    names = rows[NAME_ROW]
+    quantities = rows[QUANTITY_ROW]
+    components = rows[COMPONENT_ROW]
+
+    time_column = None
+    for column, component in enumerate(components):
+        if component.startswith("Time"):
+            time_column = column
+            break
+    if time_column is None:
+        raise ValueError("Motive CSV header has no time column")
+
+    position = {}
+    rotation = {}
+    for column in range(min(len(types), len(names), len(quantities), len(components))): #type: ignore  # noqa E501
+        if types[column] != "Rigid Body":
+            continue
+        if rigid_body is None:
+            rigid_body = names[column]
+        if names[column] != rigid_body:
+            continue
+        if quantities[column] == "Position":
+            position[components[column]] = column
+        elif quantities[column] == "Rotation":
+            rotation[components[column]] = column
+    if rigid_body is None:
+        raise ValueError("Motive CSV has no rigid body columns")
+
+    columns = {}
+    for component in ("X", "Y", "Z"):
+        if component not in position:
+            raise ValueError("Motive CSV has no %s position column for rigid body %s" % (component, rigid_body)) #type: ignore  # noqa E501
+        columns[component] = position[component]
+    prefix = "Q" if "W" in rotation else "R"
+    for component, column in rotation.items():
+        columns[prefix + component] = column
+    return rigid_body, time_column, columns
+
+
+def load_rigid_body(fileName, rigid_body=None, rotation=False):
+    """Returns a DataFrame with the Time, X, Y and Z columns of rigid body
+    rigid_body, default the first one, of a Motive CSV export, and with
+    rotation its rotation columns.  Only these columns are parsed, straight
+    into float64 columns, with NaN for blank cells."""
+    metadata, rows = read_header(fileName)
+    rigid_body, time_column, columns = find_rigid_body_columns(rows, rigid_body) #type: ignore  # noqa E501
+    names = {time_column: "Time"}
+    for component, column in columns.items():
+        if rotation or component in ("X", "Y", "Z"):
+            names[column] = component
+    usecols = sorted(names)
+    df = pd.read_csv(fileName, skiprows=HEADER_ROWS, header=None,
+                     usecols=usecols, dtype=np.float64, engine="c",
+                     skip_blank_lines=True)
+    df.columns = [names[column] for column in usecols]
+    order = ["Time", "X", "Y", "Z"]
+    order += [component for component in ("QX", "QY", "QZ", "QW", "RX", "RY", "RZ") if component in df.columns] #type: ignore  # noqa E501
+    return df[order]
+
+
+# Sidecar cache of parsed takes.  load_take writes the columns of a parsed
+# take to <take>.csv.npy, a float64 array of one column per component, and
+# its key to <take>.csv.json: the CSV path, size and modification time, the
+# rigid body and the column names.  Later loads of an unchanged take memory
+# map the array instead of parsing the CSV again.
+SIDECAR_VERSION = 1
+
+
+def get_sidecar_paths(fileName):
+    return fileName + ".npy", fileName + ".json"
+
+
+def get_take_key(fileName, rigid_body=None):
+    stat = os.stat(fileName)
+    return {"version": SIDECAR_VERSION,
+            "path": os.path.realpath(fileName),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "rigid_body": rigid_body}
+
+
+def read_sidecar(fileName, rigid_body=None):
+    """Returns the take of fileName as a DataFrame backed by the memory
+    mapped sidecar, or None when there is no sidecar for the current file"""
+    array_path, key_path = get_sidecar_paths(fileName)
+    try:
+        with open(key_path, 'r') as f_key:
+            key = json.load(f_key)
+        columns = key.pop("columns")
+        if key != get_take_key(fileName, rigid_body):
+            return None
+        data = np.load(array_path, mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        return None
+    if data.ndim != 2 or data.shape[1] != len(columns):
+        return None
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+
+def write_sidecar(fileName, df, rigid_body=None):
+    """Writes the sidecar of a take parsed by load_rigid_body.  Returns False
+    when it could not be written, e.g. in a read-only directory."""
+    array_path, key_path = get_sidecar_paths(fileName)
+    key = get_take_key(fileName, rigid_body)
+    key["columns"] = list(df.columns)
+    try:
+        # the key is written last, so a sidecar is only used once complete
+        if os.path.exists(key_path):
+            os.remove(key_path)
+        with open(array_path + ".tmp", 'wb') as f_array:
+            np.save(f_array, np.ascontiguousarray(df.to_numpy(dtype=np.float64))) #type: ignore  # noqa E501
+        os.replace(array_path + ".tmp", array_path)
+        with open(key_path + ".tmp", 'w') as f_key:
+            json.dump(key, f_key)
+        os.replace(key_path + ".tmp", key_path)
+    except OSError:
+        return False
+    return True
+
+
+def load_take(fileName, rigid_body=None, use_sidecar=True):
+    """load_rigid_body with rotation, through the sidecar cache.  The first
+    load of a take parses the CSV and writes the sidecar, later loads of the
+    unchanged file map it read-only."""
+    if use_sidecar:
+        df = read_sidecar(fileName, rigid_body)
+        if df is not None:
+            return df
+    df = load_rigid_body(fileName, rigid_body, rotation=True)
+    if use_sidecar:
+        write_sidecar(fileName, df, rigid_body)
+    return df